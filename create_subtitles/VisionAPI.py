@@ -1,27 +1,89 @@
 import os
 import io
 from google.cloud import vision
+from google.api_core import exceptions
+import rate_limiter
 
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = 'vision_api_key.json'
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", os.path.abspath('vision_api_key.json'))
 
+# client is created once, with the first request
+client = None
 
-def text_detection(file_path):
-    """ Detects text in an image, using Google VisionAPI
+
+def get_client():
+    """ Returns the VisionAPI client, creates it with the first call """
+
+    global client
+    if client is None:
+        client = vision.ImageAnnotatorClient()
+    return client
+
+
+def is_retryable(error):
+    """ Decides if the request that failed with the error should be repeated.
+    Quota rejections, timeouts and server errors are retryable, everything else
+    (bad credentials, bad image, ...) is not.
+
+    Args:
+        error (Exception): Error raised by the request
+
+    Returns:
+        True (bool): If the request should be repeated
+        False (bool): If the error is permanent
+    """
+
+    retryable_errors = (rate_limiter.TransientError, exceptions.ResourceExhausted, exceptions.TooManyRequests,
+                        exceptions.ServiceUnavailable, exceptions.DeadlineExceeded, exceptions.InternalServerError,
+                        exceptions.Aborted, ConnectionError, TimeoutError)
+    return isinstance(error, retryable_errors)
+
+
+def text_detection(file_path, max_retries=6):
+    """ Detects text in an image, using Google VisionAPI. Requests go through the shared
+    rate limiter and transient errors are retried with backoff.
 
     Args:
         file_path (str): Path to the image
+        max_retries (int): How many times a failed request is repeated (default = 6)
 
     Returns:
         words (list): List of words, detected in an image
     """
 
-    client = vision.ImageAnnotatorClient()
-
     with io.open(file_path, 'rb') as image_file:
         content = image_file.read()
+
+    return content_text_detection(content, max_retries)
+
+
+def content_text_detection(content, max_retries=6):
+    """ Detects text in an encoded image (.png, .jpg) that is already in memory, using Google VisionAPI
+
+    Args:
+        content (bytes): Encoded image
+        max_retries (int): How many times a failed request is repeated (default = 6)
+
+    Returns:
+        words (list): List of words, detected in an image
+    """
+
+    return rate_limiter.call_with_retry(request_text_detection, content, max_retries=max_retries,
+                                        is_retryable=is_retryable)
+
+
+def request_text_detection(content):
+    """ Sends one text detection request to Google VisionAPI
+
+    Args:
+        content (bytes): Encoded image
+
+    Returns:
+        words (list): List of words, detected in an image
+    """
+
     image = vision.Image(content=content)
 
-    response = client.text_detection(image=image)
+    response = get_client().text_detection(image=image)
     texts = response.text_annotations
 
     words = []
@@ -32,6 +94,8 @@ def text_detection(file_path):
                      for vertex in text.bounding_poly.vertices])
 
     if response.error.message:
+        if response.error.code in rate_limiter.RETRYABLE_CODES:
+            raise rate_limiter.TransientError(response.error.message)
         raise Exception(
             '{}\nFor more info on error messages, check: '
             'https://cloud.google.com/apis/design/errors'.format(
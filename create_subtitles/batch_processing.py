@@ -0,0 +1,179 @@
+import numpy as np
+import cv2 as cv
+import process_images as pi
+# Preprocessing of a batch of subtitle regions at once. The regions are collected into one contiguous
+# (K, H, W) array and every stage is a single operation over the whole batch, on buffers that are
+# allocated once. Results are the same as of "process_images.apply_parameters()" on every region
+# (regions stay in color, when they are not binarized).
+
+
+# pixels at least this bright are text of the (white) subtitles
+TEXT_THRESHOLD = 200
+
+# regions with fewer text pixels are empty
+TEXT_PIXELS = 20
+
+
+def has_text(roi, threshold=TEXT_THRESHOLD, min_pixels=TEXT_PIXELS):
+    """ Checks if the region contains any bright (text) pixels, the same way as "FrameBatch.has_text()"
+
+    Args:
+        roi (numpy.ndarray): Cropped part of the frame (BGR or grayscale)
+        threshold (int): Brightness from where the pixel is considered text (default = TEXT_THRESHOLD)
+        min_pixels (int): How many text pixels the region needs (default = TEXT_PIXELS)
+    Returns:
+        True (bool): If the region contains text
+        False (bool): If the region is empty
+    """
+
+    if roi.ndim == 3:
+        roi = cv.cvtColor(roi, cv.COLOR_BGR2GRAY)
+    return np.count_nonzero(roi >= threshold) >= min_pixels
+
+
+class FrameBatch:
+    """ Batch of subtitle regions of consecutive sampled frames
+
+    Args:
+        batch_size (int): How many regions the batch holds (K)
+        shape (tuple): Shape of one region (H, W, 3), or (H, W) for grayscale regions (e.g. from ffmpeg_decoder.py)
+    """
+
+    def __init__(self, batch_size, shape):
+        height, width = shape[:2]
+        self.batch_size = batch_size
+        self.height = height
+        self.width = width
+        self.is_gray = len(shape) == 2
+        self.gray = np.empty((batch_size, height, width), np.uint8)
+        # grayscale regions are copied directly into the grayscale buffer
+        self.rois = self.gray if self.is_gray else np.empty((batch_size, height, width, 3), np.uint8)
+        self.output = np.empty((batch_size, height, width), np.uint8)
+        self.color_output = None
+        self.mask = np.empty((batch_size, height, width), bool)
+        self.padded = None
+        self.morphed = None
+        self.items = []
+
+    def add(self, roi, item):
+        """ Copies region into the batch
+
+        Args:
+            roi (numpy.ndarray): Cropped part of the frame
+            item: Information about the frame, returned with the results (e.g. index and time of frame)
+        """
+
+        np.copyto(self.rois[len(self.items)], roi)
+        self.items.append(item)
+
+    def is_full(self):
+        return len(self.items) == self.batch_size
+
+    def clear(self):
+        self.items = []
+
+    def stacked(self, array):
+        """ Returns view of the first n regions of the (n, H, W) array as one tall (n * H, W) image,
+        so one OpenCV call processes the whole batch
+
+        Args:
+            array (numpy.ndarray): Contiguous array of regions
+        """
+
+        n = len(self.items)
+        return array[:n].reshape((n * array.shape[1],) + array.shape[2:])
+
+    def grayscale(self):
+        """ Converts the regions into grayscale
+
+        Returns:
+            gray (numpy.ndarray): Grayscale regions (K, H, W)
+        """
+
+        # OpenCV does not take empty images, e.g. the last batch when the frames filled the batches exactly
+        if not self.is_gray and len(self.items) != 0:
+            cv.cvtColor(self.stacked(self.rois), cv.COLOR_BGR2GRAY, dst=self.stacked(self.gray))
+        return self.gray[:len(self.items)]
+
+    def morphology(self, output, kernel, dilate):
+        """ Dilates or erodes all regions of the output with rectangular kernel, in place.
+        Rows of neutral pixels are put between the regions, so the kernel does not reach
+        from one region into the next one.
+
+        Args:
+            output (numpy.ndarray): Grayscale (K, H, W) or color (K, H, W, 3) output buffer
+            kernel (list): Size of the kernel [rows, columns]
+            dilate (bool): True to dilate, False to erode
+        """
+
+        n = len(self.items)
+        gap = kernel[0] - 1
+        shape = (self.batch_size, self.height + gap) + output.shape[2:]
+        if self.padded is None or self.padded.shape != shape:
+            self.padded = np.empty(shape, np.uint8)
+            self.morphed = np.empty(shape, np.uint8)
+
+        self.padded[:n, :self.height] = output[:n]
+        self.padded[:n, self.height:] = 0 if dilate else 255
+
+        kernel = np.ones(kernel, np.uint8)
+        if dilate:
+            cv.dilate(self.stacked(self.padded), kernel, dst=self.stacked(self.morphed))
+        else:
+            cv.erode(self.stacked(self.padded), kernel, dst=self.stacked(self.morphed))
+        output[:n] = self.morphed[:n, :self.height]
+
+    def process(self, parameters):
+        """ Preprocesses all regions in the batch with the calibrated parameters
+
+        Args:
+            parameters (dict): Preprocessing parameters (see "process_images.apply_parameters()")
+        Returns:
+            images (numpy.ndarray): Preprocessed regions (K, H, W), or (K, H, W, 3) when color regions
+                are not binarized
+        """
+
+        n = len(self.items)
+        self.grayscale()
+        if n == 0:
+            return self.output[:0]
+
+        if parameters["par1"] is not None:
+            output = self.output
+            cv.threshold(self.stacked(self.gray), parameters["par1"], parameters["par2"], cv.THRESH_BINARY,
+                         dst=self.stacked(output))
+        elif self.is_gray:
+            output = self.output
+            output[:n] = self.gray[:n]
+        else:
+            # without the binarization "apply_parameters()" keeps the colors
+            if self.color_output is None:
+                self.color_output = np.empty_like(self.rois)
+            output = self.color_output
+            output[:n] = self.rois[:n]
+
+        # "font_thickness()" inverts the image, dilates/erodes it and inverts it back,
+        # which is the same as eroding/dilating the image itself, without the inversions
+        if parameters["mode"] is not None:
+            self.morphology(output, parameters["kernel"], dilate=parameters["mode"] == 1)
+
+        if parameters["angle"]:
+            for i in range(n):
+                output[i] = pi.rotateImage(output[i], -1.0 * parameters["angle"])
+
+        return output[:n]
+
+    def has_text(self, threshold=TEXT_THRESHOLD, min_pixels=TEXT_PIXELS):
+        """ Checks which regions contain any bright (text) pixels, so the OCR of empty regions can be skipped.
+        Needs "grayscale()" or "process()" to be called first.
+
+        Args:
+            threshold (int): Brightness from where the pixel is considered text (default = TEXT_THRESHOLD)
+            min_pixels (int): How many text pixels the region needs (default = TEXT_PIXELS)
+        Returns:
+            text (numpy.ndarray): Boolean for every region of the batch
+        """
+
+        n = len(self.items)
+        np.greater_equal(self.gray[:n], threshold, out=self.mask[:n])
+        return np.count_nonzero(self.mask[:n], axis=(1, 2)) >= min_pixels
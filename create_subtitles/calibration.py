@@ -0,0 +1,198 @@
+import os
+import json
+import cv2 as cv
+import numpy as np
+import create_srt
+import detect_words as det
+import process_images as pi
+import roi_cache
+# Per-video calibration of the preprocessing parameters. A few dozen frames are sampled once,
+# every candidate is scored by how well the OCR agrees with the transcript and the best
+# parameters are cached next to the video. One track is calibrated (its region and transcript),
+# with more tracks its parameters are used for all of them.
+
+
+# candidates for the binarization [par1, par2], [None, None] is the raw crop
+THRESHOLDS = [[None, None], [150, 255], [180, 255], [200, 230], [220, 255]]
+
+# candidates for the font thickness [mode, kernel], mode None keeps the thickness
+THICKNESS = [[None, [2, 2]], [0, [2, 2]], [1, [2, 2]], [0, [3, 3]], [1, [3, 3]]]
+
+
+def calibration_path(video_path):
+    """ Returns path of the calibration file, that belongs to the video
+
+    Args:
+        video_path (str): Path to the video
+    """
+
+    return video_path + ".calibration.json"
+
+
+def sample_rois(video_path, samples=32, roi=None):
+    """ Crops the subtitle part of frames, evenly spaced over the whole video
+
+    Args:
+        video_path (str): Path to the video
+        samples (int): How many frames are sampled (default = 32)
+        roi (list): Region [x, y, w, h] as fractions of the frame, None for the default region at the bottom
+    Returns:
+        rois (list): List of cropped parts of the frames
+    """
+
+    video = cv.VideoCapture(video_path)
+    total = create_srt.count_frames(video)
+    rois = []
+    for i in range(samples):
+        video.set(cv.CAP_PROP_POS_FRAMES, int((i + 0.5) * total / samples))
+        ret, frame = video.read()
+        if ret:
+            rois.append(det.crop_roi(frame, roi))
+    video.release()
+    return rois
+
+
+def agreement(ocr_text, clear_subtitles):
+    """ Determines how well the OCR text agrees with the transcript. As it is not known which subtitle
+    is displayed, the most similar one is used.
+
+    Args:
+        ocr_text (list): Words found by the OCR, the first element is the whole text
+        clear_subtitles (list): List of clear subtitles
+    Returns:
+        how_similar (float): Percentage of how similar the OCR is to the most similar subtitle
+    """
+
+    clear_ocr = create_srt.solo_clear_ocr(ocr_text[1:])
+    how_similar = 0
+    for subtitle in clear_subtitles:
+        if len(subtitle) != 0:
+            how_similar = max(how_similar, create_srt.how_similar_ocr(clear_ocr, subtitle))
+    return how_similar
+
+
+def score(rois, parameters, clear_subtitles):
+    """ Returns average agreement of the OCR with the transcript, when the parameters are used
+
+    Args:
+        rois (list): List of cropped parts of the frames
+        parameters (dict): Preprocessing parameters
+        clear_subtitles (list): List of clear subtitles
+    """
+
+    total = 0
+    for roi in rois:
+        total += agreement(det.ocr_roi(roi, parameters), clear_subtitles)
+    return total / len(rois)
+
+
+def skew_angle(rois):
+    """ Finds the skew angle of the subtitles, as a median of angles of the sampled frames
+
+    Args:
+        rois (list): List of cropped parts of the frames
+    Returns:
+        angle (float): Skew angle, 0 if it is too small to matter
+    """
+
+    angles = []
+    for roi in rois:
+        try:
+            angles.append(pi.getSkewAngle(roi, save_boxes=False))
+        except IndexError:
+            # no contours, the frame is blank
+            pass
+
+    if len(angles) == 0:
+        return 0
+    angle = float(np.median(angles))
+    if abs(angle) < 0.5:
+        return 0
+    return angle
+
+
+def calibrate(video_path, subtitles, samples=32, roi=None):
+    """ Finds the preprocessing parameters, for which the OCR agrees best with the transcript.
+    The parameters are searched one after another (threshold, font thickness, deskew angle),
+    so the number of OCR calls stays at a few per sampled frame.
+
+    Args:
+        video_path (str): Path to the video
+        subtitles (list): list of individual words from the sentences of the track
+        samples (int): How many frames are sampled (default = 32)
+        roi (list): Region of the track [x, y, w, h] as fractions of the frame, None for the default region
+    Returns:
+        parameters (dict): Preprocessing parameters for "process_images.apply_parameters()"
+    """
+
+    clear_subtitles = [create_srt.solo_clear_ocr(subtitle) for subtitle in subtitles]
+    parameters = {"par1": None, "par2": None, "mode": None, "kernel": [2, 2], "angle": 0}
+
+    # keeps only frames, where the raw crop contains some of the subtitles
+    rois = []
+    best_score = 0
+    for region in sample_rois(video_path, samples, roi):
+        how_similar = agreement(det.ocr_roi(region), clear_subtitles)
+        if how_similar > 0:
+            rois.append(region)
+            best_score += how_similar
+    if len(rois) == 0:
+        return parameters
+    best_score = best_score / len(rois)
+
+    for par1, par2 in THRESHOLDS[1:]:
+        candidate = dict(parameters, par1=par1, par2=par2)
+        candidate_score = score(rois, candidate, clear_subtitles)
+        if candidate_score > best_score:
+            best_score = candidate_score
+            parameters = candidate
+
+    for mode, kernel in THICKNESS[1:]:
+        candidate = dict(parameters, mode=mode, kernel=kernel)
+        candidate_score = score(rois, candidate, clear_subtitles)
+        if candidate_score > best_score:
+            best_score = candidate_score
+            parameters = candidate
+
+    angle = skew_angle(rois)
+    if angle != 0:
+        candidate = dict(parameters, angle=angle)
+        if score(rois, candidate, clear_subtitles) > best_score:
+            parameters = candidate
+
+    return parameters
+
+
+def load_or_calibrate(video_path, subtitles, samples=32, roi=None):
+    """ Returns cached parameters of the video. If the video was not calibrated yet (or it changed,
+    or another region was calibrated), runs the calibration and caches the result.
+
+    Args:
+        video_path (str): Path to the video
+        subtitles (list): list of individual words from the sentences of the track
+        samples (int): How many frames are sampled (default = 32)
+        roi (list): Region of the track [x, y, w, h] as fractions of the frame, None for the default region
+    Returns:
+        parameters (dict): Preprocessing parameters for "process_images.apply_parameters()"
+    """
+
+    video_id = roi_cache.video_id(video_path)
+    path = calibration_path(video_path)
+
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf8") as file:
+            cached = json.load(file)
+        if cached["video"] == video_id and cached.get("roi") == roi:
+            return cached["parameters"]
+
+    parameters = calibrate(video_path, subtitles, samples, roi)
+    with open(path, "w", encoding="utf8") as file:
+        json.dump({"video": video_id, "roi": roi, "parameters": parameters}, file, indent=4)
+    return parameters
+
+
+if __name__ == "__main__":
+    test_video = "subtitles/film_test.mp4"
+    test_subtitles = "subtitles/subtitles.txt"
+    subtitles, native_subtitles = create_srt.load_subtitles(test_subtitles)
+    create_srt.main(test_video, test_subtitles, parameters=load_or_calibrate(test_video, subtitles))
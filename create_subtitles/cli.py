@@ -0,0 +1,212 @@
+import sys
+import logging
+import argparse
+# Command-line entry point. Modules of the pipeline are imported only by the subcommand that needs them,
+# so e.g. "recover" does not import OpenCV or google-cloud-vision.
+#
+#   python cli.py run subtitles/film_test.mp4 subtitles/subtitles.txt --calibrate --refine
+#   python cli.py run film.mp4 --track bottom german.txt --track top english.txt
+#   python cli.py recover subtitles/recovery_file.txt subtitles/subtitles.txt
+#   python cli.py bench
+#   python cli.py coordinate film.mp4 subtitles.txt --local-workers 4
+#   python cli.py work http://coordinator:8765
+#   python cli.py watch inbox outbox --workers 4
+
+
+def parse_roi(value):
+    """ Converts region from the command line ("top", "bottom" or "x,y,w,h" as fractions of the frame)
+
+    Args:
+        value (str): Region from the command line
+    Returns:
+        roi (list): Region [x, y, w, h], None for the default region at the bottom
+    """
+
+    import detect_words as det
+
+    if value == "bottom":
+        return None
+    if value == "top":
+        return det.TOP_ROI
+    roi = [float(part) for part in value.split(",")]
+    if len(roi) != 4:
+        raise ValueError("region has to be top, bottom or x,y,w,h")
+    return roi
+
+
+def run(args):
+    """ Finds the subtitles in the video and creates .srt file (one per track) """
+
+    import create_srt
+
+    if args.track:
+        tracks = [[parse_roi(roi), subtitles_path] for roi, subtitles_path in args.track]
+    elif args.subtitles:
+        tracks = [[parse_roi(args.roi), args.subtitles]]
+    else:
+        print("run: subtitles or at least one --track is needed", file=sys.stderr)
+        return 2
+
+    parameters = None
+    if args.calibrate:
+        import calibration
+        # the first track is calibrated, its parameters are used for all tracks
+        roi, subtitles_path = tracks[0]
+        subtitles, native_subtitles = create_srt.load_subtitles(subtitles_path)
+        parameters = calibration.load_or_calibrate(args.video, subtitles, roi=roi)
+
+    options = create_srt.Options(args.requests_per_minute, stream=args.stream, latency_budget=args.latency_budget,
+                                 parameters=parameters, refine_timing=args.refine, batch_size=args.batch_size,
+                                 use_cache=args.cache, verify=args.verify, budget=args.budget,
+                                 local_engine=args.local_engine, schedule=args.schedule, decoder=args.decoder,
+                                 fuzzy=args.fuzzy, escalate=args.escalate,
+                                 max_escalations=args.max_escalations, skip_empty=args.skip_empty,
+                                 decode_scale=args.decode_scale)
+    create_srt.main_tracks(args.video, tracks, options)
+    return 0
+
+
+def recover(args):
+    """ Creates .srt file from the recovery file, without any OCR """
+
+    import recovery
+
+    recovery.recover(args.recovery_file, args.subtitles, args.video, args.fuzzy)
+    return 0
+
+
+def bench(args):
+    """ Runs the offline regression cases, reports timing errors and runtime """
+
+    import regression
+
+    return 0 if regression.main(args.regression_dir, args.max_error) else 1
+
+
+def coordinate(args):
+    """ Splits the video into segments for the workers and creates .srt file from their results """
+
+    import job_service
+
+    job_service.run_coordinator(args.video, args.subtitles, args.host, args.port, args.segment_frames,
+                                args.lease_timeout, args.local_workers, parse_roi(args.roi),
+                                requests_per_minute=args.requests_per_minute)
+    return 0
+
+
+def work(args):
+    """ Processes segments of the video for the coordinator """
+
+    import job_service
+
+    job_service.run_worker(args.coordinator, retry_timeout=args.retry_timeout,
+                           requests_per_minute=args.requests_per_minute)
+    return 0
+
+
+def watch(args):
+    """ Watches the inbox for videos with subtitles and processes them by a pool of warm workers """
+
+    import watch_service
+
+    watch_service.run_service(args.inbox, args.outbox, args.workers, args.poll_interval, args.stop_when_idle,
+                              args.requests_per_minute)
+    return 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Synchronisation of film subtitles, using OCR")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="find the subtitles in the video and create .srt file")
+    run_parser.add_argument("video", help="path to the video (or named pipe / URL with --stream)")
+    run_parser.add_argument("subtitles", nargs="?", help="path to subtitle text file")
+    run_parser.add_argument("--roi", default="bottom", help="region of the subtitles: top, bottom or x,y,w,h")
+    run_parser.add_argument("--track", nargs=2, action="append", metavar=("ROI", "SUBTITLES"),
+                            help="subtitle track, can be repeated for bilingual releases")
+    run_parser.add_argument("--requests-per-minute", type=float, default=1800, help="ceiling of OCR requests")
+    run_parser.add_argument("--stream", action="store_true", help="process live video in real time")
+    run_parser.add_argument("--latency-budget", type=float, default=2, help="maximum latency in stream mode (s)")
+    run_parser.add_argument("--calibrate", action="store_true", help="calibrate preprocessing of the video")
+    run_parser.add_argument("--refine", action="store_true", help="refine the timing to the exact frame")
+    run_parser.add_argument("--batch-size", type=int, help="preprocess regions of this many frames at once")
+    run_parser.add_argument("--cache", action="store_true", help="read regions from the cache of decoded frames")
+    run_parser.add_argument("--verify", action="store_true",
+                            help="compare regions with the rendered subtitles, use OCR only when unclear")
+    run_parser.add_argument("--budget", type=float, help="maximum OCR cost in USD, sampling gets sparser near it")
+    run_parser.add_argument("--local-engine", action="store_true",
+                            help="continue with Tesseract after the budget is spent, instead of stopping")
+    run_parser.add_argument("--schedule", action="store_true",
+                            help="OCR mostly near the expected end of subtitles, predicted from their length")
+    run_parser.add_argument("--decoder", choices=["opencv", "ffmpeg"], default="opencv",
+                            help="ffmpeg decodes only the cropped grayscale regions (needs ffmpeg on PATH)")
+    run_parser.add_argument("--decode-scale", type=float, default=1,
+                            help="scale of the regions decoded by ffmpeg, e.g. 0.5 for half the resolution")
+    run_parser.add_argument("--fuzzy", action="store_true",
+                            help="match OCR words within a small edit distance of the subtitle words")
+    run_parser.add_argument("--escalate", action="store_true",
+                            help="OCR unclear regions again with heavier preprocessing")
+    run_parser.add_argument("--max-escalations", type=int, default=100,
+                            help="how many unclear regions of every track are escalated")
+    run_parser.add_argument("--skip-empty", action="store_true",
+                            help="do not OCR regions without bright text pixels (white subtitles)")
+    run_parser.set_defaults(function=run)
+
+    recover_parser = subparsers.add_parser("recover", help="create .srt file from the recovery file, without OCR")
+    recover_parser.add_argument("recovery_file", help="path to the recovery file")
+    recover_parser.add_argument("subtitles", help="path to subtitle text file")
+    recover_parser.add_argument("--video", help="look the times up in the index of the video instead")
+    recover_parser.add_argument("--fuzzy", action="store_true",
+                                help="match OCR words within a small edit distance of the subtitle words")
+    recover_parser.set_defaults(function=recover)
+
+    bench_parser = subparsers.add_parser("bench", help="run the offline regression cases and report timing")
+    bench_parser.add_argument("--regression-dir", help="directory with the cases (default: regression/ next to cli.py)")
+    bench_parser.add_argument("--max-error", type=float, default=0.1, help="maximum accepted timing error (s)")
+    bench_parser.set_defaults(function=bench)
+
+    coordinate_parser = subparsers.add_parser("coordinate", help="hand out segments of the video to the workers")
+    coordinate_parser.add_argument("video", help="path to the video, readable by the workers")
+    coordinate_parser.add_argument("subtitles", help="path to subtitle text file")
+    coordinate_parser.add_argument("--roi", default="bottom", help="region of the subtitles: top, bottom or x,y,w,h")
+    coordinate_parser.add_argument("--host", default="localhost", help="address to listen on")
+    coordinate_parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    coordinate_parser.add_argument("--segment-frames", type=int, default=2000, help="number of frames in one segment")
+    coordinate_parser.add_argument("--lease-timeout", type=float, default=300,
+                                   help="seconds after which unfinished segment is handed out again")
+    coordinate_parser.add_argument("--local-workers", type=int, default=0, help="worker processes on this machine")
+    coordinate_parser.add_argument("--requests-per-minute", type=float, default=1800,
+                                   help="ceiling of OCR requests, shared by the local workers")
+    coordinate_parser.set_defaults(function=coordinate)
+
+    work_parser = subparsers.add_parser("work", help="process segments of the video for the coordinator")
+    work_parser.add_argument("coordinator", help="address of the coordinator, e.g. http://localhost:8765")
+    work_parser.add_argument("--retry-timeout", type=float, default=600,
+                             help="how long failed requests to the coordinator are repeated (s)")
+    work_parser.add_argument("--requests-per-minute", type=float, default=1800,
+                             help="ceiling of OCR requests of this worker, its share of the quota of all workers")
+    work_parser.set_defaults(function=work)
+
+    watch_parser = subparsers.add_parser("watch", help="process videos with subtitles arriving in the inbox")
+    watch_parser.add_argument("inbox", help="directory with the arriving videos and subtitle text files")
+    watch_parser.add_argument("outbox", help="directory for the results")
+    watch_parser.add_argument("--workers", type=int, default=2, help="worker processes")
+    watch_parser.add_argument("--poll-interval", type=float, default=2, help="how often the inbox is scanned (s)")
+    watch_parser.add_argument("--stop-when-idle", action="store_true",
+                              help="stop when the inbox has no jobs and all jobs are finished")
+    watch_parser.add_argument("--requests-per-minute", type=float, default=1800,
+                              help="ceiling of OCR requests, shared by the workers")
+    watch_parser.set_defaults(function=watch)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # summaries of the OCR usage and warnings of the modules
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return args.function(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
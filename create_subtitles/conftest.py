@@ -0,0 +1,102 @@
+import os
+import cv2 as cv
+import numpy as np
+import pytest
+import detect_words as det
+# Shared fixtures of the tests. The synthetic video shows the subtitles in the default region at the bottom,
+# with a gray marker in the top left corner of the region, whose brightness tells the index of the displayed
+# subtitle. The fake OCR backend reads the marker instead of the text, so the tests know what a perfect
+# OCR would find, without any OCR engine or network.
+
+FPS = 25
+SIZE = [320, 180]
+
+# subtitles of the video and the times they are displayed [start, end] in seconds
+CUES = ["first line of the test", "second subtitle here", "the third one is longer than the others",
+        "fourth", "fifth subtitle of the video", "and the last one"]
+TIMES = [[1.0, 2.4], [2.8, 4.0], [4.6, 7.0], [7.4, 8.2], [8.8, 10.4], [11.0, 12.6]]
+LENGTH = 13.5
+
+
+def marker_value(index):
+    return 60 + 10 * index
+
+
+def write_video(path, cues=CUES, times=TIMES, length=LENGTH, fps=FPS, size=SIZE, fourcc="MJPG"):
+    """ Writes the synthetic video
+
+    Args:
+        path (str): Path to the video (.avi)
+        cues (list): Subtitles of the video
+        times (list): list of [start, end] in seconds of every subtitle
+        length (float): Length of the video in seconds
+        fps (int): Frames per second
+        size (list): [width, height] of the video
+        fourcc (str): Codec of the video (default = "MJPG")
+    """
+
+    width, height = size
+    x, y, w, h = det.roi_box([height, width])
+    writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    for frame_index in range(int(length * fps)):
+        frame = np.full((height, width, 3), 50, np.uint8)
+        for index, (start, end) in enumerate(times):
+            if start <= frame_index / fps < end:
+                cv.putText(frame, cues[index], (x + 12, y + h // 2), cv.FONT_HERSHEY_SIMPLEX, 0.4,
+                           (255, 255, 255), 1)
+                frame[y + 2:y + 9, x + 2:x + 9] = marker_value(index)
+        writer.write(frame)
+    writer.release()
+
+
+class FakeOcr:
+    """ OCR backend, that reads the index of the subtitle from the marker
+
+    Args:
+        cues (list): Subtitles of the video
+    """
+
+    def __init__(self, cues=CUES):
+        self.cues = cues
+        self.calls = 0
+
+    def __call__(self, content):
+        self.calls += 1
+        img = cv.imdecode(np.frombuffer(content, np.uint8), cv.IMREAD_GRAYSCALE)
+        index = int(round((float(np.median(img[3:7, 3:7])) - marker_value(0)) / 10))
+        if not 0 <= index < len(self.cues):
+            return []
+        return [self.cues[index]] + self.cues[index].split()
+
+
+@pytest.fixture
+def synthetic_video(tmp_path, monkeypatch):
+    """ Synthetic video and its subtitle text file in a temporary working directory """
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("subtitles")
+    with open("subtitles/subtitles.txt", "w", encoding="utf8") as file:
+        file.write("\n\n".join(CUES) + "\n")
+    write_video("video.avi")
+    return {"video": "video.avi", "subtitles": "subtitles/subtitles.txt", "cues": CUES, "times": TIMES}
+
+
+@pytest.fixture
+def fake_ocr():
+    """ Fake OCR backend, the previous backend is restored after the test """
+
+    previous_backend = det.backend
+    backend = FakeOcr()
+    det.set_backend(backend)
+    yield backend
+    det.set_backend(previous_backend)
+
+
+def timing_errors(frame_info, times=TIMES):
+    """ Returns differences of the found start and end times from the real ones in seconds """
+
+    errors = []
+    for start, end, text_index, content, frames in frame_info:
+        errors.append(abs(start[0] + start[1] / 1000000 - times[text_index][0]))
+        errors.append(abs(end[0] + end[1] / 1000000 - times[text_index][1]))
+    return errors
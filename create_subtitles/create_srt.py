@@ -1,10 +1,27 @@
 import cv2 as cv
 import detect_words as det
-import os
+import logging
 from alive_progress import alive_bar
-import datetime
-import srt
-from pathlib import Path
+import rate_limiter
+import srt_writer
+import video_stream
+import refine
+import batch_processing
+import roi_cache
+import template_matching
+import ocr_accounting
+import scheduler
+import ffmpeg_decoder
+import timestamp_index
+import ocr_timeline
+import fuzzy_match
+import escalation
+
+
+logger = logging.getLogger(__name__)
+
+# every n-th frame of a finished video is sampled
+STRIDE = 2
 
 
 def count_frames(video):
@@ -41,18 +58,17 @@ def get_time(video):
     return time
 
 
-def save_frame(frame, index):
-    """ Saves frame in a folder and returns filename
+def frame_name(index):
+    """ Returns name of the frame for the recovery file. The frame is not saved, the OCR gets the region
+    from memory, the name only tells the index of the frame ("recovery.frame_index()")
 
     Args:
-        frame (numpy.ndarray): information about frame (cv2)
         index (int): index of frame
     Returns:
-        name (str): name of frame file
+        name (str): name of frame
     """
 
     name = f'./frames_from_video/frame{str(index)}.jpg'
-    cv.imwrite(name, frame)
     return name
 
 
@@ -204,12 +220,13 @@ def text_prep(ocr_text, subtitles, text_index):
     return clear_current, clear_next, clear_ocr
 
 
-def how_similar_ocr(clear_ocr_text, current_sub):
+def how_similar_ocr(clear_ocr_text, current_sub, fuzzy=None):
     """ Determines how similar the OCR text is to the current subtitle
 
     Args:
         clear_ocr_text (list): List of current OCR text
         current_sub (list): List of current subtitle text
+        fuzzy (fuzzy_match.FuzzyIndex): Matches words within a small edit distance, None for exact match
     Returns:
         how_similar (float): Percentage of how similar the OCR is to the subtitle
     """
@@ -217,7 +234,10 @@ def how_similar_ocr(clear_ocr_text, current_sub):
     temp_ocr = list(clear_ocr_text)
     similar_words = 0
     for element in current_sub:
-        if element in temp_ocr:
+        if fuzzy is not None:
+            if fuzzy.remove_match(element, temp_ocr):
+                similar_words += 1
+        elif element in temp_ocr:
             temp_ocr.remove(element)
             similar_words += 1
     how_similar = (similar_words * 100) / len(current_sub)
@@ -245,7 +265,7 @@ def how_similar_next(current_sub, next_sub):
     return how_similar
 
 
-def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
+def is_similar(ocr_text, text_index, subtitles, acceptable_value=50, fuzzy=None):
     """ Decides if the OCR is similar to the current subtitle.
     If current subtitle is not similar to next one - decides based only on similarity.
     If current subtitle is similar to next one - decides based on similarity and keywords.
@@ -256,6 +276,8 @@ def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
         text_index (int): Index of current subtitle
         subtitles (list): List of all subtitles
         acceptable_value (int): Percentage from where the OCR text is considered similar to subtitle
+        fuzzy (fuzzy_match.FuzzyIndex): Matches the OCR words within a small edit distance of the words
+            of the subtitles (precomputed for all subtitles), None for exact match
     Returns:
         True (bool): If similar and (keywords are in the current subtitle)
         False (bool: If not similar or (no keywords in the current subtitle)
@@ -266,14 +288,17 @@ def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
     key_word = key_words(current_sub, next_sub)
 
     # finds how similar the OCR is to the subtitle and how similar the current subtitle is to the next one
-    how_similar_to_ocr = how_similar_ocr(clear_ocr_text, current_sub)
+    how_similar_to_ocr = how_similar_ocr(clear_ocr_text, current_sub, fuzzy)
     how_similar_to_next = how_similar_next(current_sub, next_sub)
 
     # counts how many keywords appear in the OCR
     keys_in_ocr = 0
     temp_ocr = list(clear_ocr_text)
     for word in key_word:
-        if word in temp_ocr:
+        if fuzzy is not None:
+            if fuzzy.remove_match(word, temp_ocr):
+                keys_in_ocr += 1
+        elif word in temp_ocr:
             temp_ocr.remove(word)
             keys_in_ocr += 1
 
@@ -289,34 +314,22 @@ def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
             return False
 
 
-def create_srt(frame_info):
-    """ Creates srt file, from collected frame info
+def similarity_score(ocr_text, text_index, subtitles, fuzzy=None):
+    """ Returns how similar the OCR text is to the subtitle, the score that "is_similar()" compares
+    with the acceptable value
 
     Args:
-        frame_info (list): list of information about start and end frames
+        ocr_text (list): Current OCR text
+        text_index (int): Index of current subtitle
+        subtitles (list): List of all subtitles
+        fuzzy (fuzzy_match.FuzzyIndex): Matches words within a small edit distance, None for exact match
+    Returns:
+        how_similar (float): Percentage of how similar the OCR is to the subtitle
     """
 
-    file = open("subtitles/Finished_subtitles.txt", "w+", encoding="utf8")
-    subtitles = []
-
-    for element in frame_info:
-        start = datetime.timedelta(seconds=element[0][0], microseconds=element[0][1])
-        end = datetime.timedelta(seconds=element[1][0], microseconds=element[1][1])
-        index = element[2]
-        content = element[3]
-
-        subtitle = srt.Subtitle(index=index, start=start, end=end, content=content)
-        subtitles.append(subtitle)
-
-    text = srt.compose(subtitles)
-    file.write(text)
-    file.close()
-
-    if os.path.exists("subtitles/Finished_subtitles.srt"):
-        os.remove("subtitles/Finished_subtitles.srt")
-    p = Path("subtitles/Finished_subtitles.txt")
-    p.rename(p.with_suffix('.srt'))
-    file.close()
+    current_sub, next_sub, clear_ocr_text = text_prep(ocr_text, subtitles, text_index)
+    key_words(current_sub, next_sub)
+    return how_similar_ocr(clear_ocr_text, current_sub, fuzzy)
 
 
 def save_recovery(recovery_file, text_index, ocr_text, name_of_frame, time):
@@ -340,54 +353,479 @@ def save_recovery(recovery_file, text_index, ocr_text, name_of_frame, time):
     recovery_file.write("\n")
 
 
-def main(video_path, subtitles_path):
-    video = cv.VideoCapture(video_path)
-    subtitles, native_subtitles = load_subtitles(subtitles_path)
-    recovery_file = open("subtitles/recovery_file.txt", "w+", encoding="utf8")
+def read_frames(video, stride=2, index=None, times=None):
+    """ Yields every stride-th frame of a finished video. Frames that are skipped are only
+    grabbed, not decoded into image.
 
-    if not os.path.exists('frames_from_video'):
-        os.makedirs('frames_from_video')
+    Args:
+        video (cv2.VideoCapture): Video loaded via cv2
+        stride (int): Every n-th frame is yielded (default = 2)
+        index (timestamp_index.FrameIndex): Index of the video, the times are looked up in it, None to ask OpenCV
+        times (list): Receives the time of every frame in microseconds (to create the index), None to skip it
+
+    Yields:
+        frame_index (int): Index of frame
+        frame (numpy.ndarray): Frame
+        time (list): Time of frame [seconds, microseconds]
+    """
 
-    with alive_bar(count_frames(video), force_tty=True) as bar:
-        frame_index = 0
-        text_index = 0
-        time_of_frame = []
-        frame_info = []
-        while True:
+    frame_index = 0
+    while True:
+        if frame_index % stride == 0:
             ret, frame = video.read()
-            time = get_time(video)
             if not ret:
                 break
-            if frame_index % 2 == 0:
-                name_of_frame = save_frame(frame, frame_index)
-                ocr_text = det.ocr(name_of_frame)
+            if times is not None:
+                times.append(round(video.get(cv.CAP_PROP_POS_MSEC) * 1000))
+            time = get_time(video) if index is None else index.time(frame_index)
+            yield frame_index, frame, time
+        else:
+            if not video.grab():
+                break
+            if times is not None:
+                times.append(round(video.get(cv.CAP_PROP_POS_MSEC) * 1000))
+        frame_index += 1
 
-                if len(ocr_text) != 0:
-                    del ocr_text[0]
 
-                    if text_index + 1 < len(subtitles):
-                        similar = is_similar(ocr_text, text_index, subtitles)
+class Matcher:
+    """ Matches OCR text of consecutive frames to the subtitles of one track. Keeps the index of
+    the current subtitle and the times of frames in which it is displayed. When the subtitle
+    disappears, its start and end time is added to frame info and written to the .srt file.
 
-                    save_recovery(recovery_file, text_index, solo_clear_ocr(ocr_text), name_of_frame, time)
+    Args:
+        subtitles_path (str): path to subtitle text file
+        srt_path (str): Path to the output .srt file
+        recovery_path (str): Path to the recovery file
+        fuzzy (bool): Match the OCR words within a small edit distance (fuzzy_match.py) (default = False)
+    """
 
-                    if similar is True:
-                        time_of_frame.append(time)
-                    elif len(time_of_frame) != 0:
-                        frame_info.append([time_of_frame[0], time_of_frame[-1], text_index, native_subtitles[text_index]])
-                        time_of_frame = []
-                        text_index += 1
+    def __init__(self, subtitles_path, srt_path="subtitles/Finished_subtitles.srt",
+                 recovery_path="subtitles/recovery_file.txt", fuzzy=False):
+        self.subtitles, self.native_subtitles = load_subtitles(subtitles_path)
+        self.fuzzy = fuzzy_match.FuzzyIndex(self.subtitles) if fuzzy else None
+        self.writer = srt_writer.SrtWriter(srt_path)
+        self.recovery_file = open(recovery_path, "w+", encoding="utf8")
+        self.timeline = ocr_timeline.TimelineWriter(ocr_timeline.timeline_path(recovery_path))
+        self.text_index = 0
+        self.time_of_frame = []
+        self.frames_of_subtitle = []
+        self.frame_before = None
+        self.previous_frame = None
+        self.frame_info = []
+        self.similar = False
+
+    def feed(self, ocr_text, name_of_frame, time, frame_index=None):
+        """ Processes OCR text of the next sampled frame
+
+        Args:
+            ocr_text (list): Text that the OCR found, the first element is the whole text
+            name_of_frame (str): name of frame file
+            time (list): Time of frame [seconds, microseconds]
+            frame_index (int): Index of frame, used for the refinement of the timing (refine.py)
+        """
+
+        if len(ocr_text) == 0:
+            self.previous_frame = frame_index
+            return
+        ocr_text = ocr_text[1:]
+
+        if self.text_index + 1 < len(self.subtitles):
+            self.similar = is_similar(ocr_text, self.text_index, self.subtitles, fuzzy=self.fuzzy)
+
+        clear_ocr_text = solo_clear_ocr(ocr_text)
+        save_recovery(self.recovery_file, self.text_index, clear_ocr_text, name_of_frame, time)
+        self.timeline.add(clear_ocr_text, time, frame_index)
+
+        if self.similar is True:
+            self.add_frame(time, frame_index)
+        elif len(self.time_of_frame) != 0:
+            # frames: last sampled frame before the subtitle, first and last frame with the subtitle,
+            # first sampled frame after the subtitle
+            frames = [self.frame_before, self.frames_of_subtitle[0], self.frames_of_subtitle[-1], frame_index]
+            self.frame_info.append([self.time_of_frame[0], self.time_of_frame[-1], self.text_index,
+                                    self.native_subtitles[self.text_index], frames])
+            self.writer.write(self.frame_info[-1])
+            self.time_of_frame = []
+            self.frames_of_subtitle = []
+            self.text_index += 1
+
+            if self.text_index + 1 < len(self.subtitles):
+                self.similar = is_similar(ocr_text, self.text_index, self.subtitles, fuzzy=self.fuzzy)
+            if self.similar is True:
+                self.add_frame(time, frame_index)
+
+        self.previous_frame = frame_index
+
+    def score(self, ocr_text, text_index=None):
+        """ Returns how similar the OCR text is to the subtitle (percentage),
+        None for the last subtitle (it is not compared)
+
+        Args:
+            ocr_text (list): Text that the OCR found, the first element is the whole text
+            text_index (int): Index of the subtitle, None for the current subtitle
+        """
+
+        if text_index is None:
+            text_index = self.text_index
+        if text_index + 1 >= len(self.subtitles):
+            return None
+        return similarity_score(ocr_text[1:], text_index, self.subtitles, self.fuzzy)
+
+    def add_frame(self, time, frame_index):
+        """ Adds frame to the frames in which the current subtitle is displayed
+
+        Args:
+            time (list): Time of frame [seconds, microseconds]
+            frame_index (int): Index of frame
+        """
+
+        if len(self.time_of_frame) == 0:
+            self.frame_before = self.previous_frame
+        self.time_of_frame.append(time)
+        self.frames_of_subtitle.append(frame_index)
+
+    def close(self):
+        self.writer.close()
+        self.recovery_file.close()
+        self.timeline.close()
+
+
+def verified_feed(verifier, matcher, roi, ocr, name_of_frame, time, frame_index):
+    """ Classifies the region by the rendered subtitles and passes the result to the matcher,
+    the OCR is called only if the classification is not clear
 
-                        if text_index + 1 < len(subtitles):
-                            similar = is_similar(ocr_text, text_index, subtitles)
-                        if similar is True:
-                            time_of_frame.append(time)
+    Args:
+        verifier (template_matching.TemplateVerifier): Verifier of the track
+        matcher (Matcher): Matcher of the track
+        roi (numpy.ndarray): Cropped part of the frame
+        ocr (callable): Returns OCR text of the region
+        name_of_frame (str): name of frame file
+        time (list): Time of frame [seconds, microseconds]
+        frame_index (int): Index of frame
+    """
+
+    text_index = verifier.classify(roi, matcher.text_index)
+    if text_index is not None:
+        matcher.feed(verifier.ocr_text(text_index), name_of_frame, time, frame_index)
+        return
+
+    matcher.feed(ocr(), name_of_frame, time, frame_index)
+    # frame confirmed by the OCR calibrates the font size of the rendered subtitles
+    if matcher.frames_of_subtitle[-1:] == [frame_index]:
+        verifier.calibrate(roi, matcher.text_index)
+
+
+def process_batches(batches, matchers, parameters, verifiers=None, escalations=None, skip_empty=False):
+    """ Preprocesses the collected batches of regions and passes them to OCR and to the matchers
+
+    Args:
+        batches (list): batch_processing.FrameBatch of every track
+        matchers (list): Matcher of every track
+        parameters (dict): Preprocessing parameters, None to OCR the raw crop
+        verifiers (list): template_matching.TemplateVerifier of every track, None to OCR every region
+        escalations (list): escalation.TieredOcr of every track, None to OCR every region only once
+        skip_empty (bool): Regions without any text pixels are not sent to OCR (default = False)
+    """
 
-            bar()
-            frame_index += 1
+    for track, (batch, matcher) in enumerate(zip(batches, matchers)):
+        if len(batch.items) == 0:
+            continue
+        if parameters is None:
+            batch.grayscale()
+            images = batch.rois
+        else:
+            images = batch.process(parameters)
+        text = batch.has_text() if skip_empty else None
+
+        for i, (name_of_frame, time, frame_index) in enumerate(batch.items):
+            ocr = lambda: det.ocr_roi(images[i])
+            if escalations is not None:
+                ocr = lambda: escalations[track].ocr(batch.rois[i], matcher, ocr_text=det.ocr_roi(images[i]))
+            if verifiers is not None:
+                verified_feed(verifiers[track], matcher, batch.rois[i], ocr, name_of_frame, time, frame_index)
+                continue
+            ocr_text = ocr() if text is None or text[i] else []
+            matcher.feed(ocr_text, name_of_frame, time, frame_index)
+        batch.clear()
+
+
+class Options:
+    """ Options of processing the video, shared by "main()", "main_tracks()" and the command line
+
+    Args:
+        requests_per_minute (float): Ceiling of OCR requests per minute
+        stream (bool): Process live video (growing file, named pipe or URL) in real time (default = False)
+        latency_budget (float): Maximum latency behind the live video in seconds, stream mode only (default = 2)
+        parameters (dict): Preprocessing parameters from "calibration.load_or_calibrate()", None to OCR the raw crop
+        refine_timing (bool): Move start and end of subtitles to the exact frame, finished video only (default = False)
+        batch_size (int): Preprocess regions of this many sampled frames at once, None to process every frame alone
+        use_cache (bool): Read the subtitle regions from the cache (roi_cache.py) instead of decoding the video,
+            the cache is created by the first run with use_cache. Only the exact regions of the tracks are cached,
+            a run with other regions decodes the video again. Finished video only (default = False)
+        verify (bool): Classify the regions by the rendered current and next subtitle (template_matching.py)
+            and use the OCR only when the classification is not clear (default = False)
+        budget (float): Maximum OCR cost in USD, sampling gets sparser as it is spent (ocr_accounting.py),
+            None for no limit
+        local_engine (bool): After the budget is spent, continue with Tesseract instead of stopping (default = False)
+        schedule (bool): Process only the frames near the expected end of the displayed subtitle, predicted from
+            its length and the reading speed (scheduler.py), best with refine_timing, not with batch_size
+            (default = False)
+        decoder (str): "opencv", or "ffmpeg" to decode only the cropped grayscale regions by an ffmpeg
+            subprocess (ffmpeg_decoder.py), finished video without use_cache only (default = "opencv")
+        fuzzy (bool): Match the OCR words within a small edit distance of the words of the subtitles,
+            so single misread characters do not drop the similarity (fuzzy_match.py) (default = False)
+        escalate (bool): Send the regions with unclear similarity to the OCR again, preprocessed by heavier
+            tiers (escalation.py) (default = False)
+        max_escalations (int): How many frames of every track can be escalated, None for no limit (default = 100)
+        skip_empty (bool): Do not send the regions without bright text pixels to the OCR, for white
+            subtitles only ("batch_processing.has_text()") (default = False)
+        decode_scale (float): Scale of the regions decoded by ffmpeg, e.g. 0.5 for half the resolution,
+            decoder="ffmpeg" only (default = 1)
+    """
+
+    def __init__(self, requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE, stream=False,
+                 latency_budget=2, parameters=None, refine_timing=False, batch_size=None, use_cache=False,
+                 verify=False, budget=None, local_engine=False, schedule=False, decoder="opencv", fuzzy=False,
+                 escalate=False, max_escalations=100, skip_empty=False, decode_scale=1):
+        self.requests_per_minute = requests_per_minute
+        self.stream = stream
+        self.latency_budget = latency_budget
+        self.parameters = parameters
+        self.refine_timing = refine_timing
+        self.batch_size = batch_size
+        self.use_cache = use_cache
+        self.verify = verify
+        self.budget = budget
+        self.local_engine = local_engine
+        self.schedule = schedule
+        self.decoder = decoder
+        self.fuzzy = fuzzy
+        self.escalate = escalate
+        self.max_escalations = max_escalations
+        self.skip_empty = skip_empty
+        self.decode_scale = decode_scale
+
+    def replace(self, **option_values):
+        """ Returns copy of the options with some of them changed
+
+        Args:
+            **option_values: Changed options, see the arguments of "Options"
+        Returns:
+            options (Options): New options
+        """
+
+        values = dict(vars(self))
+        values.update(option_values)
+        return Options(**values)
+
+
+def get_options(options, option_values):
+    """ Combines the options object and the options given as keyword arguments
+
+    Args:
+        options (Options): Options, None for the defaults
+        option_values (dict): Options given as keyword arguments, they override the options object
+    Returns:
+        options (Options): Combined options
+    """
+
+    if options is None:
+        return Options(**option_values)
+    return options.replace(**option_values)
+
+
+def main_tracks(video_path, tracks, options=None, **option_values):
+    """ Finds the subtitles of several tracks (e.g. bilingual release with one track at the top and
+    one at the bottom) and creates one .srt file per track. Every frame is decoded only once and
+    its subtitle regions are passed to independent matchers.
+
+    With one track the output is "subtitles/Finished_subtitles.srt" and "subtitles/recovery_file.txt",
+    with more tracks the index of the track is added to the names, e.g. "subtitles/Finished_subtitles_1.srt".
+
+    Args:
+        video_path (str): Path to the video. In stream mode also a named pipe or URL
+        tracks (list): list of [roi, subtitles_path] pairs, roi is [x, y, w, h] as fractions of the frame
+            (None for the default region at the bottom)
+        options (Options): Options of processing, None for the defaults
+        **option_values: Single options, e.g. "refine_timing=True", see the arguments of "Options"
+    Returns:
+        frame_info (list): list of frame info of every track
+    """
+
+    options = get_options(options, option_values)
+    # the scheduler decides from the state of the matchers, with batches they are a whole batch behind
+    if options.schedule and options.batch_size is not None:
+        raise ValueError("schedule needs the matchers updated after every frame, it does not combine with batch_size")
+    if options.use_cache and options.stream:
+        raise ValueError("The cache of regions needs the whole video, it does not combine with stream")
+    if options.decode_scale != 1 and (options.decoder != "ffmpeg" or options.stream or options.use_cache):
+        raise ValueError("decode_scale is applied by the ffmpeg decoder, use decoder=\"ffmpeg\"")
+
+    rate_limiter.set_requests_per_minute(options.requests_per_minute)
+
+    matchers = []
+    for index, (roi, subtitles_path) in enumerate(tracks):
+        suffix = "" if len(tracks) == 1 else f"_{index}"
+        matchers.append(Matcher(subtitles_path, f"subtitles/Finished_subtitles{suffix}.srt",
+                                f"subtitles/recovery_file{suffix}.txt", options.fuzzy))
+    verifiers = None
+    if options.verify:
+        verifiers = [template_matching.TemplateVerifier(matcher.native_subtitles) for matcher in matchers]
+
+    # usage of the OCR is saved next to the recovery file
+    previous_backend = det.backend
+    usage = ocr_accounting.OcrUsage(ocr_accounting.usage_path(matchers[0].recovery_file.name))
+    accounting = ocr_accounting.AccountingBackend(det.get_backend(), usage)
+    sampler = None
+    if options.budget is not None:
+        local_backend = det.tesseract_text_detection if options.local_engine else None
+        sampler = ocr_accounting.Budget(accounting, options.budget, local_backend)
+    escalations = None
+    if options.escalate:
+        escalations = [escalation.TieredOcr(max_escalations=options.max_escalations) for matcher in matchers]
+    schedulers = None
+    if options.schedule:
+        schedulers = [scheduler.PredictiveScheduler() for matcher in matchers]
+
+    video = None
+    video_decoder = None
+    index = None
+    index_times = None
+    cache = None
+    cache_writer = None
+    crop = det.crop_roi
+    if options.stream:
+        total = None
+        frames = video_stream.stream_frames(video_path, video_stream.LatencyController(options.latency_budget))
+    else:
+        if options.use_cache and options.decoder == "ffmpeg":
+            raise ValueError("The cache of regions is created from full frames, use decoder=\"opencv\"")
+        if options.use_cache:
+            cache = roi_cache.open_cache(video_path, tracks, STRIDE, roi_cache.is_gray(options.parameters))
+        if cache is not None:
+            total = cache.total
+            frames = cache.read_frames()
+            crop = cache.crop
+        elif options.decoder == "ffmpeg":
+            video_decoder = ffmpeg_decoder.FfmpegDecoder(video_path, tracks, STRIDE, options.decode_scale)
+            total = video_decoder.total
+            frames = video_decoder.read_frames()
+            crop = video_decoder.crop
+        else:
+            video = cv.VideoCapture(video_path)
+            # the index of frame times is recorded by the first run, later runs look the times up
+            index = timestamp_index.load(video_path)
+            if index is None:
+                total = count_frames(video)
+                index_times = []
+                frames = read_frames(video, STRIDE, times=index_times)
+            else:
+                total = index.total
+                frames = read_frames(video, STRIDE, index)
+            if options.use_cache:
+                cache_writer = roi_cache.RoiCacheWriter(video_path, tracks, STRIDE, total,
+                                                        roi_cache.is_gray(options.parameters))
+
+    det.set_backend(accounting)
+    completed = True
+    try:
+        with alive_bar(total, force_tty=True) as bar:
+            last_index = -1
+            batches = []
+            for frame_index, frame, time in frames:
+                # without a local engine nothing is processed after the budget is spent, the rest is not decoded
+                if sampler is not None and sampler.exhausted:
+                    completed = False
+                    break
+                if cache is None:
+                    name_of_frame = frame_name(frame_index)
+                else:
+                    name_of_frame = cache.name_of_frame(frame_index)
+                if cache_writer is not None:
+                    cache_writer.add(frame_index, frame, time)
+                # with more tracks the frame is processed, if any of them needs it
+                scheduled = schedulers is None or any([track_scheduler.sample(time, matcher)
+                                                        for track_scheduler, matcher in zip(schedulers, matchers)])
+                if not scheduled or (sampler is not None and not sampler.sample(frame_index // STRIDE)):
+                    bar(frame_index - last_index)
+                    last_index = frame_index
+                    continue
+
+                if options.batch_size is None:
+                    for track, ((roi, subtitles_path), matcher) in enumerate(zip(tracks, matchers)):
+                        region = crop(frame, roi)
+                        ocr = lambda: det.ocr_roi(region, options.parameters)
+                        if escalations is not None:
+                            ocr = lambda: escalations[track].ocr(region, matcher, options.parameters)
+                        if verifiers is not None:
+                            verified_feed(verifiers[track], matcher, region, ocr, name_of_frame, time, frame_index)
+                            continue
+                        if options.skip_empty and not batch_processing.has_text(region):
+                            matcher.feed([], name_of_frame, time, frame_index)
+                            continue
+                        matcher.feed(ocr(), name_of_frame, time, frame_index)
+                else:
+                    if len(batches) == 0:
+                        batches = [batch_processing.FrameBatch(options.batch_size, crop(frame, roi).shape)
+                                   for roi, subtitles_path in tracks]
+                    for (roi, subtitles_path), batch in zip(tracks, batches):
+                        batch.add(crop(frame, roi), [name_of_frame, time, frame_index])
+                    if batches[0].is_full():
+                        process_batches(batches, matchers, options.parameters, verifiers, escalations,
+                                        options.skip_empty)
+
+                bar(frame_index - last_index)
+                last_index = frame_index
+
+            if len(batches) != 0:
+                process_batches(batches, matchers, options.parameters, verifiers, escalations, options.skip_empty)
+    finally:
+        # the previous backend is restored and ffmpeg is stopped also when the run fails
+        det.set_backend(previous_backend)
+        usage.save()
+        if video_decoder is not None:
+            video_decoder.close()
+        if video is not None:
+            video.release()
+    logger.info(usage.summary())
+    if escalations is not None:
+        for tiered_ocr in escalations:
+            logger.info(tiered_ocr.summary())
+
+    for matcher in matchers:
+        matcher.close()
+    # the cache and the index need the whole video
+    if cache_writer is not None:
+        if completed:
+            cache_writer.close()
+        else:
+            cache_writer.discard()
+    if completed and index_times is not None and len(index_times) != 0:
+        index = timestamp_index.from_times(video_path, index_times)
+        index.save(video_path)
+
+    if options.refine_timing and not options.stream:
+        for (roi, subtitles_path), matcher in zip(tracks, matchers):
+            refine.refine(video_path, matcher.frame_info, roi, index=index)
+            srt_writer.write_srt(matcher.frame_info, matcher.writer.srt_path)
+    return [matcher.frame_info for matcher in matchers]
+
+
+def main(video_path, subtitles_path, roi=None, options=None, **option_values):
+    """ Finds the subtitles in the video and creates .srt file with their timing
+
+    Args:
+        video_path (str): Path to the video. In stream mode also a named pipe or URL
+        subtitles_path (str): Path to subtitle text file
+        roi (list): Region of the subtitles [x, y, w, h] as fractions of the frame, None for the default
+        options (Options): Options of processing, None for the defaults
+        **option_values: Single options, e.g. "refine_timing=True", see the arguments of "Options"
+    Returns:
+        frame_info (list): list of information about start and end frames
+    """
 
-    create_srt(frame_info)
-    recovery_file.close()
-    video.release()
+    frame_info = main_tracks(video_path, [[roi, subtitles_path]], options, **option_values)
+    return frame_info[0]
 
 
 if __name__ == "__main__":
@@ -1,5 +1,94 @@
 import cv2 as cv
-import VisionAPI as Vision
+
+# region of the top subtitle track of bilingual releases [x, y, w, h] as fractions of the frame
+TOP_ROI = [1 / 15, 1 / 50, 13 / 15, 1 / 4.5]
+
+# OCR backend, function that takes encoded image (bytes) and returns list of words, detected in an image.
+# Google VisionAPI is used, unless other backend is set (e.g. replay of recorded responses, see ocr_replay.py)
+backend = None
+
+
+def set_backend(function):
+    """ Sets the OCR backend, used for all following OCR calls
+
+    Args:
+        function (callable): Function that takes encoded image (bytes) and returns list of words
+    """
+
+    global backend
+    backend = function
+
+
+def get_backend():
+    """ Returns the OCR backend. VisionAPI is imported only when it is really used,
+    so runs with other backend do not need google-cloud-vision or the API key.
+    """
+
+    global backend
+    if backend is None:
+        import VisionAPI as Vision
+        backend = Vision.content_text_detection
+    return backend
+
+
+def tesseract_text_detection(content):
+    """ Local OCR backend (Tesseract), that does not use any API quota. Needs pytesseract
+    and the tesseract binary, which are imported only when it is really used.
+
+    Args:
+        content (bytes): Encoded image
+
+    Returns:
+        words (list): List of words, detected in an image, the first element is the whole text
+    """
+
+    import numpy as np
+    import pytesseract
+
+    img = cv.imdecode(np.frombuffer(content, np.uint8), cv.IMREAD_UNCHANGED)
+    text = pytesseract.image_to_string(img).strip()
+    if text == "":
+        return []
+    return [text] + text.split()
+
+
+def roi_box(shape, roi=None):
+    """ Converts the region into pixels of the frame
+
+    Args:
+        shape (tuple): Shape of the frame
+        roi (list): Region [x, y, w, h] as fractions of the frame, None for the default region at the bottom
+    Returns:
+        box (list): Region [x, y, w, h] in pixels
+    """
+
+    img_h, img_w = shape[:2]
+    if roi is None:
+        x = int(img_w / 15)
+        w = int(img_w - 2 * x)
+        y = int(img_h * (7 / 10))
+        h = int(img_h / 4.5)
+    else:
+        x = int(img_w * roi[0])
+        y = int(img_h * roi[1])
+        w = int(img_w * roi[2])
+        h = int(img_h * roi[3])
+    return [x, y, w, h]
+
+
+def crop_roi(img, roi=None):
+    """ Crops the part of the frame, where the subtitles are displayed
+
+    Args:
+        img (numpy.ndarray): Frame loaded into memory
+        roi (list): Region [x, y, w, h] as fractions of the frame, None for the default region at the bottom
+    Returns:
+        roi (numpy.ndarray): Cropped part of the frame
+    """
+
+    x, y, w, h = roi_box(img.shape, roi)
+    roi = img[y:y + h, x:x + w]
+    return roi
 
 
 def crop_image(img_file):
@@ -9,34 +98,49 @@ def crop_image(img_file):
         img_file (str): Path to image
     """
 
-    img = cv.imread(img_file)
-    img_h, img_w, channels = img.shape
-    x = int(img_w / 15)
-    w = int(img_w - 2 * x)
-    y = int(img_h * (7 / 10))
-    h = int(img_h / 4.5)
+    import process_images as pi
 
     img = cv.imread(img_file)
-    roi = img[y:y + h, x:x + w]
-    cv.imwrite(f"temp/box_roi.png", roi)
+    roi = crop_roi(img)
+    cv.imwrite(pi.temp_path("box_roi.png"), roi)
 
     img_file = f"temp/box_roi.png"
     return img_file
 
 
-def ocr(img_file, index=0):
+def ocr_roi(roi, parameters=None):
+    """ Performs OCR on the cropped part of the frame, without saving it to the disk
+
+    Args:
+        roi (numpy.ndarray): Cropped part of the frame
+        parameters (dict): Preprocessing parameters from the calibration, None to send the raw crop
+
+    Returns:
+        words (list): List of words, detected in an image
+    """
+
+    if parameters is not None:
+        import process_images as pi
+        roi = pi.apply_parameters(roi, parameters)
+    ret, content = cv.imencode(".png", roi)
+    words = get_backend()(content.tobytes())
+    return words
+
+
+def ocr(img_file, index=0, parameters=None):
     """ Performs OCR with pre-processing and cropping of image.
 
     Args:
         index: for tests
         img_file (str): Path to image
+        parameters (dict): Preprocessing parameters from the calibration, None to send the raw crop
 
     Returns:
         words (list): List of words, detected in an image
     """
 
-    img = crop_image(img_file, index)
-    words = Vision.text_detection(img)
+    img = cv.imread(img_file)
+    words = ocr_roi(crop_roi(img), parameters)
     return words
 
 
@@ -0,0 +1,131 @@
+import cv2 as cv
+import numpy as np
+import detect_words as det
+import process_images as pi
+# Tiered preprocessing of the regions. Every region is sent to the OCR with the cheap preprocessing first
+# (raw crop, or the calibrated parameters). Only when the result is unclear, the region is preprocessed
+# by heavier tiers and sent again, until the result is clearly similar. The result is unclear, when the similarity
+# to the current subtitle is close to the acceptable value (one misread word decides). A tier that makes the
+# text clearly different is not trusted (noisy preprocessing can turn a near match into a mismatch, and the
+# matcher would end the subtitle too early), then the cheap result is kept. Text far from
+# the acceptable value (e.g. signs or credits) is not escalated, and the number of escalated frames
+# is capped, so the expensive chain of "process_images.py" is used only on the few frames that need it.
+
+
+# binarization of the white subtitles, the same parameters as "process_images.binarization()"
+BINARIZATION = {"par1": 200, "par2": 230, "mode": None, "kernel": [2, 2], "angle": 0}
+
+
+def denoise(image):
+    """ Binarizes the region and removes the noise, like "process_images.noise_removal()" """
+
+    image = pi.apply_parameters(image, BINARIZATION)
+    return cv.medianBlur(image, 3)
+
+
+def thicken(image):
+    """ Denoised region with thicker font (white text on black background), like "process_images.font_thickness()" """
+
+    image = denoise(image)
+    return cv.dilate(image, np.ones((2, 2), np.uint8), iterations=1)
+
+
+def straighten(image):
+    """ Denoised region with thicker font, rotated by the skew angle of the text, like "process_images.deskew()" """
+
+    image = thicken(image)
+    if cv.countNonZero(image) == 0:
+        return image
+    angle = pi.getSkewAngle(cv.cvtColor(cv.bitwise_not(image), cv.COLOR_GRAY2BGR), save_boxes=False)
+    if angle == 0:
+        return image
+    return pi.rotateImage(image, -1.0 * angle)
+
+
+# [name, preprocessing], from the cheapest to the heaviest
+TIERS = [["denoise", denoise], ["thicken", thicken], ["deskew", straighten]]
+
+
+class TieredOcr:
+    """ OCR of the regions of one track, with escalation to heavier preprocessing for unclear frames
+
+    Args:
+        tiers (list): list of [name, preprocessing] from the cheapest to the heaviest (default = TIERS)
+        acceptable_value (int): Percentage from where the OCR text is considered similar to subtitle (default = 50)
+        band (int): Similarity within this distance of the acceptable value is unclear (default = 15)
+        max_escalations (int): How many frames can be escalated, None for no limit (default = None)
+    """
+
+    def __init__(self, tiers=TIERS, acceptable_value=50, band=15, max_escalations=None):
+        self.tiers = tiers
+        self.acceptable_value = acceptable_value
+        self.band = band
+        self.max_escalations = max_escalations
+        self.frames = 0
+        self.unclear_frames = 0
+        self.escalated = {name: 0 for name, preprocessing in tiers}
+
+    def unclear(self, ocr_text, matcher):
+        """ Decides if the OCR text needs heavier preprocessing
+
+        Args:
+            ocr_text (list): Text that the OCR found, the first element is the whole text
+            matcher (create_srt.Matcher): Matcher of the track
+        """
+
+        if len(ocr_text) == 0:
+            return False
+        score = matcher.score(ocr_text)
+        return score is not None and abs(score - self.acceptable_value) <= self.band
+
+    def clearly_similar(self, ocr_text, matcher):
+        """ Decides if the OCR text of a tier is accepted: similar to the current subtitle above the unclear band
+
+        Args:
+            ocr_text (list): Text that the OCR found, the first element is the whole text
+            matcher (create_srt.Matcher): Matcher of the track
+        """
+
+        if len(ocr_text) == 0:
+            return False
+        score = matcher.score(ocr_text)
+        return score is not None and score > self.acceptable_value + self.band
+
+    def ocr(self, roi, matcher, parameters=None, ocr_text=None):
+        """ Returns OCR text of the region, preprocessed by the cheapest tier that makes it clearly similar
+        to the current subtitle, the cheap result if no tier does
+
+        Args:
+            roi (numpy.ndarray): Cropped part of the frame
+            matcher (create_srt.Matcher): Matcher of the track
+            parameters (dict): Preprocessing parameters of the cheap tier, None to send the raw crop
+            ocr_text (list): OCR text of the cheap tier, if the region was already sent (e.g. in a batch)
+        Returns:
+            words (list): List of words, detected in an image
+        """
+
+        self.frames += 1
+        if ocr_text is None:
+            ocr_text = det.ocr_roi(roi, parameters)
+        if not self.unclear(ocr_text, matcher):
+            return ocr_text
+        self.unclear_frames += 1
+        if self.max_escalations is not None and self.unclear_frames > self.max_escalations:
+            return ocr_text
+
+        for name, preprocessing in self.tiers:
+            self.escalated[name] += 1
+            tier_text = det.ocr_roi(preprocessing(roi))
+            # heavier preprocessing can also erase or garble the text, then the cheap result is kept
+            if self.clearly_similar(tier_text, matcher):
+                return tier_text
+        return ocr_text
+
+    def summary(self):
+        """ Returns how many frames were escalated to every tier, as text for the log """
+
+        tiers = ", ".join([f"{name} {count}" for name, count in self.escalated.items()])
+        summary = f"Escalated preprocessing: {tiers} of {self.frames} frames"
+        if self.max_escalations is not None and self.unclear_frames > self.max_escalations:
+            summary += f", {self.unclear_frames - self.max_escalations} unclear frames over the limit"
+        return summary
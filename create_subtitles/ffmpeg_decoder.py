@@ -0,0 +1,245 @@
+import re
+import json
+import queue
+import threading
+import subprocess
+import numpy as np
+import detect_words as det
+# Decoding of a finished video by an ffmpeg subprocess. ffmpeg drops the frames that are not sampled,
+# crops the part of the frame with the subtitles of all tracks, optionally scales it down and converts
+# it to grayscale, so only a small fraction of every frame goes through the pipe. The frames are read
+# into reusable buffers. Decoding runs in the ffmpeg process (in its own threads, outside the GIL).
+# Needs ffmpeg and ffprobe on PATH.
+
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+
+# lines of the "showinfo" filter: time base of the timestamps and the presentation timestamp of every
+# output frame ("pts_time" is printed rounded, so the exact time is computed from pts and the time base)
+TIME_BASE = re.compile(r"\btime_base:\s*(\d+)/(\d+)")
+SHOWINFO = re.compile(r"\bn:\s*(\d+)\s+pts:\s*(-?\d+)")
+
+
+def probe(video_path):
+    """ Finds the size, frame rate and number of frames of the video
+
+    Args:
+        video_path (str): Path to the video
+    Returns:
+        info (dict): width, height, fps and total (number of frames, estimated from the duration if the
+            container does not store it)
+    """
+
+    command = [FFPROBE, "-v", "error", "-select_streams", "v:0", "-show_entries",
+               "stream=width,height,avg_frame_rate,nb_frames,duration:format=duration", "-of", "json", video_path]
+    output = json.loads(subprocess.run(command, capture_output=True, check=True).stdout)
+    stream = output["streams"][0]
+    numerator, denominator = stream["avg_frame_rate"].split("/")
+    fps = float(numerator) / float(denominator) if float(denominator) != 0 else 0
+
+    total = stream.get("nb_frames")
+    if total is None or not str(total).isdigit():
+        duration = stream.get("duration") or output.get("format", {}).get("duration") or 0
+        total = round(float(duration) * fps)
+    return {"width": int(stream["width"]), "height": int(stream["height"]), "fps": fps, "total": int(total)}
+
+
+def region_box(shape, tracks):
+    """ Returns the smallest box [x, y, w, h] in pixels, that contains the regions of all tracks
+
+    Args:
+        shape (tuple): Shape of the frame
+        tracks (list): list of [roi, subtitles_path] pairs
+    """
+
+    boxes = [det.roi_box(shape, roi) for roi, subtitles_path in tracks]
+    x = min(box[0] for box in boxes)
+    y = min(box[1] for box in boxes)
+    right = max(box[0] + box[2] for box in boxes)
+    bottom = max(box[1] + box[3] for box in boxes)
+    return [x, y, right - x, bottom - y]
+
+
+def even_box(box, shape):
+    """ Widens the box to even width and height (some pixel formats and scalers need it), so no row or
+    column of the regions is lost. The box is moved back by one pixel, where it would leave the frame.
+
+    Args:
+        box (list): Box [x, y, w, h] in pixels
+        shape (tuple): Shape of the frame
+    Returns:
+        box (list): Box [x, y, w, h] with even w and h
+    """
+
+    x, y, w, h = box
+    img_h, img_w = shape[:2]
+    if w % 2 != 0:
+        w += 1
+        x = max(0, min(x, img_w - w))
+    if h % 2 != 0:
+        h += 1
+        y = max(0, min(y, img_h - h))
+    # odd size of the whole frame, the box cannot be wider
+    return [x, y, min(w, img_w // 2 * 2), min(h, img_h // 2 * 2)]
+
+
+def read_exactly(stream, buffer):
+    """ Fills the buffer from the pipe
+
+    Returns:
+        True (bool): If the buffer was filled
+        False (bool): If the pipe ended
+    """
+
+    view = memoryview(buffer).cast("B")
+    filled = 0
+    while filled < len(view):
+        read = stream.readinto(view[filled:])
+        if not read:
+            return False
+        filled += read
+    return True
+
+
+class FfmpegDecoder:
+    """ Sampled, cropped frames of a finished video, decoded by ffmpeg
+
+    Args:
+        video_path (str): Path to the video
+        tracks (list): list of [roi, subtitles_path] pairs, the regions of all tracks are decoded
+        stride (int): Every n-th frame is decoded
+        scale (float): Scale of the decoded region, e.g. 0.5 for half the resolution (default = 1)
+        gray (bool): Decode grayscale instead of BGR (default = True)
+        threads (int): Decoding threads of ffmpeg, 0 to choose automatically (default = 0)
+        buffers (int): How many reusable frame buffers are used, a yielded frame stays valid
+            until this many further frames are read (default = 2)
+    """
+
+    def __init__(self, video_path, tracks, stride, scale=1, gray=True, threads=0, buffers=2):
+        self.video_path = video_path
+        self.stride = stride
+        self.scale = scale
+        self.gray = gray
+        self.threads = threads
+
+        info = probe(video_path)
+        self.fps = info["fps"]
+        self.total = info["total"]
+        self.frame_shape = [info["height"], info["width"], 3]
+        self.offset = even_box(region_box(self.frame_shape, tracks), self.frame_shape)
+        self.width = max(2, round(self.offset[2] * scale) // 2 * 2)
+        self.height = max(2, round(self.offset[3] * scale) // 2 * 2)
+
+        shape = (self.height, self.width) if gray else (self.height, self.width, 3)
+        self.buffers = [np.empty(shape, np.uint8) for i in range(buffers)]
+        self.process = None
+
+    def command(self):
+        """ Returns the ffmpeg command line. Frames are selected by their index (not by the fps filter),
+        so the indexes of the decoded frames are exactly every stride-th frame of the video.
+        """
+
+        x, y, w, h = self.offset
+        filters = [f"select='not(mod(n\\,{self.stride}))'", f"crop={w}:{h}:{x}:{y}"]
+        if (self.width, self.height) != (w, h):
+            filters.append(f"scale={self.width}:{self.height}:flags=area")
+        filters.append("format=gray" if self.gray else "format=bgr24")
+        filters.append("showinfo")
+
+        return [FFMPEG, "-hide_banner", "-nostats", "-loglevel", "info", "-threads", str(self.threads),
+                "-i", self.video_path, "-an", "-sn", "-vf", ",".join(filters), "-vsync", "passthrough",
+                "-f", "rawvideo", "-pix_fmt", "gray" if self.gray else "bgr24", "pipe:1"]
+
+    def read_timestamps(self, stderr, timestamps, log):
+        """ Reads presentation times of the output frames from the "showinfo" lines of ffmpeg
+
+        Args:
+            stderr (file): Error output of ffmpeg
+            timestamps (queue.Queue): Receives the time [seconds, microseconds] of every output frame, None at the end
+            log (list): Receives the last other lines, for the error message
+        """
+
+        time_base = None
+        for line in stderr:
+            line = line.decode("utf8", "replace")
+            match = SHOWINFO.search(line)
+            if match is not None and time_base is not None:
+                microseconds = int(match.group(2)) * time_base[0] * 1000000 // time_base[1]
+                seconds, microseconds = divmod(microseconds, 1000000)
+                timestamps.put([seconds, microseconds])
+                continue
+            match = TIME_BASE.search(line)
+            if match is not None and time_base is None and "showinfo" in line.lower():
+                time_base = [int(match.group(1)), int(match.group(2))]
+            log.append(line.rstrip())
+            del log[:-20]
+        timestamps.put(None)
+
+    def read_frames(self):
+        """ Yields the decoded regions, the same way as "create_srt.read_frames()" yields the frames
+
+        Yields:
+            frame_index (int): Index of frame
+            strip (numpy.ndarray): Decoded region of the frame (reusable buffer, valid until further frames are read)
+            time (list): Presentation time of frame [seconds, microseconds]
+        """
+
+        self.process = subprocess.Popen(self.command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        timestamps = queue.Queue()
+        log = []
+        reader = threading.Thread(target=self.read_timestamps, args=(self.process.stderr, timestamps, log),
+                                  daemon=True)
+        reader.start()
+
+        output_index = 0
+        while True:
+            buffer = self.buffers[output_index % len(self.buffers)]
+            if not read_exactly(self.process.stdout, buffer):
+                break
+            time = timestamps.get()
+            if time is None:
+                break
+            yield output_index * self.stride, buffer, time
+            output_index += 1
+
+        self.process.stdout.close()
+        returncode = self.process.wait()
+        reader.join()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed on {self.video_path}:\n" + "\n".join(log))
+
+    def crop(self, strip, roi=None):
+        """ Crops the region of the subtitles from the decoded region
+
+        Args:
+            strip (numpy.ndarray): Decoded region of the frame
+            roi (list): Region [x, y, w, h] as fractions of the frame, None for the default region at the bottom
+        Returns:
+            roi (numpy.ndarray): Cropped part of the frame
+        """
+
+        x, y, w, h = det.roi_box(self.frame_shape, roi)
+        # real scale of the decoded region, its size is rounded to even
+        scale_x = self.width / self.offset[2]
+        scale_y = self.height / self.offset[3]
+        x = round((x - self.offset[0]) * scale_x)
+        y = round((y - self.offset[1]) * scale_y)
+        w = round(w * scale_x)
+        h = round(h * scale_y)
+        return strip[y:y + h, x:x + w]
+
+    def close(self):
+        """ Stops ffmpeg, if the frames were not read to the end """
+
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        if self.process is not None:
+            self.process.stdout.close()
+            self.process.stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
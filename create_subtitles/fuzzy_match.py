@@ -0,0 +1,153 @@
+# Fuzzy matching of the OCR words to the words of the subtitles. A word of the subtitles matches an OCR
+# word within a small edit distance (e.g. "modern" and "rnodern"), so one misread character does not
+# drop the similarity. The words of all subtitles are known before the video is processed, so their
+# bit-parallel patterns (Myers' algorithm) are precomputed once. Distance to an OCR word then takes
+# a few integer operations per character of the OCR word.
+#
+# Short words have to match exactly, longer words allow distance len(word) // 3, at most max_distance.
+
+WRONG_CHAR = [",", ".", "?", "/", "\\", "<", ">", ";", ":", "'", "|", "[", "]", "{", "}", "!",
+              "@", "#", "$", "%", "^", "&", "*", "(", ")", "=", "+", "`", "~", "-"]
+
+
+def clear_words(words):
+    """ Clears the words the same way as "create_srt.text_prep()"
+
+    Args:
+        words (list): Words of a subtitle
+    Returns:
+        clear_words (list): Clear words
+    """
+
+    clear = []
+    for element in words:
+        element = element.lower()
+        if element not in WRONG_CHAR:
+            for char in WRONG_CHAR:
+                element = element.rstrip(char)
+                element = element.lstrip(char)
+            clear.append(element)
+    return clear
+
+
+def pattern(word):
+    """ Returns the bit-parallel pattern of the word: for every character the bit mask of its positions
+
+    Args:
+        word (str): Word
+    Returns:
+        pattern (list): [masks (dict), length of the word]
+    """
+
+    masks = {}
+    for position, char in enumerate(word):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return [masks, len(word)]
+
+
+def edit_distance(word_pattern, text):
+    """ Levenshtein distance of the word (given by its pattern) and the text, Myers' algorithm
+    in the formulation of Hyyrö
+
+    Args:
+        word_pattern (list): Pattern of the word from "pattern()"
+        text (str): Compared text
+    Returns:
+        distance (int): Edit distance
+    """
+
+    masks, length = word_pattern
+    if length == 0:
+        return len(text)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive = full
+    negative = 0
+    distance = length
+    for char in text:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = negative | ~(horizontal | positive)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        # the first row of the distance matrix grows by one with every character of the text
+        horizontal_positive = (horizontal_positive << 1) | 1
+        horizontal_negative = horizontal_negative << 1
+        positive = (horizontal_negative | ~(vertical | horizontal_positive)) & full
+        negative = horizontal_positive & vertical & full
+    return distance
+
+
+class FuzzyIndex:
+    """ Precomputed patterns of all words of the subtitles
+
+    Args:
+        subtitles (list): list of individual words from the sentences ("create_srt.load_subtitles()")
+        max_distance (int): Largest allowed edit distance (default = 2)
+        min_length (int): Shorter words have to match exactly (default = 4)
+    """
+
+    def __init__(self, subtitles, max_distance=2, min_length=4):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.patterns = {}
+        for words in subtitles:
+            for word in clear_words(words):
+                if word not in self.patterns and self.allowed_distance(word) > 0:
+                    self.patterns[word] = pattern(word)
+
+    def allowed_distance(self, word):
+        if len(word) < self.min_length:
+            return 0
+        return min(self.max_distance, len(word) // 3)
+
+    def find(self, word, ocr_words):
+        """ Finds the OCR word that matches the word of the subtitle, exact match first
+
+        Args:
+            word (str): Clear word of the subtitle
+            ocr_words (list): Clear OCR words
+        Returns:
+            index (int): Index of the matching OCR word, None if there is none
+        """
+
+        if word in ocr_words:
+            return ocr_words.index(word)
+        allowed = self.allowed_distance(word)
+        if allowed == 0:
+            return None
+        word_pattern = self.patterns.get(word)
+        if word_pattern is None:
+            word_pattern = self.patterns[word] = pattern(word)
+
+        best = None
+        best_distance = allowed + 1
+        for index, ocr_word in enumerate(ocr_words):
+            if abs(len(ocr_word) - len(word)) >= best_distance:
+                continue
+            distance = edit_distance(word_pattern, ocr_word)
+            if distance < best_distance:
+                best = index
+                best_distance = distance
+        return best
+
+    def remove_match(self, word, ocr_words):
+        """ Removes the OCR word that matches the word of the subtitle, in place
+
+        Args:
+            word (str): Clear word of the subtitle
+            ocr_words (list): Clear OCR words, that are not matched yet
+        Returns:
+            True (bool): If a matching word was found and removed
+            False (bool): If there is no matching word
+        """
+
+        index = self.find(word, ocr_words)
+        if index is None:
+            return False
+        del ocr_words[index]
+        return True
@@ -0,0 +1,335 @@
+import json
+import time
+import logging
+import threading
+import multiprocessing
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import cv2 as cv
+import create_srt
+import detect_words as det
+import ocr_accounting
+import rate_limiter
+import timestamp_index
+# Processing of one video on several machines. The coordinator splits the video into segments and hands
+# them out over HTTP, workers decode, crop and OCR their segment and send back records of the sampled
+# frames. The coordinator merges the records and matches them to the subtitles.
+# The video has to be readable by the workers under the same path (e.g. shared network drive).
+#
+#   coordinator:  POST /task    -> {"task": {...}} or {"task": null, "done": true/false}
+#                 POST /result  <- {"task_id": ..., "records": [[frame_index, ocr_text, name_of_frame, s, ms], ...],
+#                                   "usage": {"calls": ..., "images": ..., "bytes": ..., "cost": ...}}
+#
+# A segment that is not finished within the lease timeout (e.g. the worker died) is handed out again.
+# Workers repeat the requests that fail (coordinator restarting, network down) with exponential backoff,
+# and stop when the coordinator says that all segments are done. Local workers that die are restarted
+# (their segment is handed out again after the lease), the coordinator fails when none of them is left.
+# Every worker has its own rate limiter, so the ceiling of OCR requests has to be split between them
+# (local workers get an equal share, remote workers are started with their share).
+
+
+logger = logging.getLogger(__name__)
+
+# how many times the local workers are restarted in total, before the coordinator gives up
+MAX_RESTARTS = 3
+
+
+class Coordinator:
+    """ Keeps the queue of segments and collects their results
+
+    Args:
+        video_path (str): Path to the video
+        total (int): Number of frames of the video
+        segment_frames (int): Number of frames in one segment (default = 2000)
+        lease_timeout (float): Seconds after which unfinished segment is handed out again (default = 300)
+        roi (list): Region of the subtitles [x, y, w, h] as fractions of the frame, None for the default
+        parameters (dict): Preprocessing parameters, None to OCR the raw crop
+    """
+
+    def __init__(self, video_path, total, segment_frames=2000, lease_timeout=300, roi=None, parameters=None):
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.lease_timeout = lease_timeout
+        self.pending = []
+        self.leased = {}
+        self.results = {}
+        self.usage = ocr_accounting.OcrUsage(ocr_accounting.usage_path("subtitles/recovery_file.txt"))
+
+        for task_id, start in enumerate(range(0, total, segment_frames)):
+            self.pending.append({"task_id": task_id, "video": video_path, "start": start,
+                                 "end": min(start + segment_frames, total), "stride": create_srt.STRIDE,
+                                 "roi": roi, "parameters": parameters})
+        self.tasks = len(self.pending)
+        if self.tasks == 0:
+            self.finished.set()
+
+    def requeue_expired(self):
+        """ Moves segments with expired lease back to the queue """
+
+        now = time.monotonic()
+        for task_id, (task, deadline) in list(self.leased.items()):
+            if deadline < now:
+                del self.leased[task_id]
+                self.pending.insert(0, task)
+
+    def next_task(self):
+        """ Hands out the next segment
+
+        Returns:
+            task (dict): Segment to process, None if there is nothing to hand out right now
+            done (bool): True if all segments are finished
+        """
+
+        with self.lock:
+            self.requeue_expired()
+            if len(self.pending) == 0:
+                return None, self.finished.is_set()
+            task = self.pending.pop(0)
+            self.leased[task["task_id"]] = [task, time.monotonic() + self.lease_timeout]
+            return task, False
+
+    def add_result(self, task_id, records, usage=None):
+        """ Stores records of the finished segment. Late results of re-queued segments are ignored
+        (their OCR usage is counted, it was paid anyway).
+
+        Args:
+            task_id (int): Id of the segment
+            records (list): Records of the sampled frames of the segment
+            usage (dict): OCR usage of the worker for the segment
+        """
+
+        with self.lock:
+            if usage is not None:
+                self.usage.add_run(usage)
+            if task_id in self.results:
+                return
+            self.results[task_id] = records
+            self.leased.pop(task_id, None)
+            self.pending = [task for task in self.pending if task["task_id"] != task_id]
+            if len(self.results) == self.tasks:
+                self.finished.set()
+
+    def records(self):
+        """ Returns records of all segments, ordered by the frame index """
+
+        records = []
+        for task_id in sorted(self.results):
+            records.extend(self.results[task_id])
+        return sorted(records, key=lambda record: record[0])
+
+
+def make_handler(coordinator):
+    """ Creates HTTP request handler of the coordinator
+
+    Args:
+        coordinator (Coordinator): Coordinator that handles the requests
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path == "/task":
+                task, done = coordinator.next_task()
+                response = {"task": task, "done": done}
+            elif self.path == "/result":
+                coordinator.add_result(body["task_id"], body["records"], body.get("usage"))
+                response = {}
+            else:
+                self.send_error(404)
+                return
+
+            content = json.dumps(response).encode("utf8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def process_segment(task):
+    """ Decodes, crops and OCRs the sampled frames of the segment
+
+    Args:
+        task (dict): Segment from the coordinator
+    Returns:
+        records (list): [frame_index, ocr_text, name_of_frame, seconds, microseconds] of every sampled frame
+        usage (dict): OCR usage of the segment
+    """
+
+    backend = det.get_backend()
+    usage = ocr_accounting.OcrUsage(None)
+    det.set_backend(ocr_accounting.AccountingBackend(backend, usage))
+
+    # the index is created by the coordinator, the segment is seeked from the nearest keyframe
+    index = timestamp_index.load(task["video"])
+    video = cv.VideoCapture(task["video"])
+    if index is None:
+        video.set(cv.CAP_PROP_POS_FRAMES, task["start"])
+    else:
+        index.seek(video, task["start"])
+    records = []
+    for frame_index in range(task["start"], task["end"]):
+        if frame_index % task["stride"] == 0:
+            ret, frame = video.read()
+            if not ret:
+                break
+            time_of_frame = create_srt.get_time(video) if index is None else index.time(frame_index)
+            ocr_text = det.ocr_roi(det.crop_roi(frame, task["roi"]), task["parameters"])
+            records.append([frame_index, ocr_text, f"frame{frame_index}", time_of_frame[0], time_of_frame[1]])
+        elif not video.grab():
+            break
+    video.release()
+    det.set_backend(backend)
+    return records, usage.run
+
+
+def post(url, body):
+    """ Sends JSON request and returns JSON response
+
+    Args:
+        url (str): Address of the endpoint
+        body (dict): Request
+    """
+
+    request = urllib.request.Request(url, json.dumps(body).encode("utf8"), {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def post_with_retry(url, body, retry_timeout=600):
+    """ Sends JSON request until it succeeds, failed requests are repeated with exponential backoff.
+    Raises ConnectionError, if the coordinator does not answer for retry_timeout seconds.
+
+    Args:
+        url (str): Address of the endpoint
+        body (dict): Request
+        retry_timeout (float): How long the requests are repeated in seconds (default = 600)
+    """
+
+    deadline = time.monotonic() + retry_timeout
+    attempt = 0
+    while True:
+        try:
+            return post(url, body)
+        except OSError as error:
+            if time.monotonic() >= deadline:
+                raise ConnectionError(f"{url} did not answer for {retry_timeout} s") from error
+            time.sleep(rate_limiter.backoff_delay(attempt))
+            attempt += 1
+
+
+def run_worker(coordinator_url, poll_interval=1, retry_timeout=600,
+               requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE):
+    """ Processes segments from the coordinator, until all segments are finished
+
+    Args:
+        coordinator_url (str): Address of the coordinator, e.g. "http://localhost:8765"
+        poll_interval (float): How long to wait, when there is no segment to process (default = 1)
+        retry_timeout (float): How long failed requests are repeated, before the worker gives up (default = 600)
+        requests_per_minute (float): Ceiling of OCR requests of this worker, its share of the quota (default = 1800)
+    """
+
+    rate_limiter.set_requests_per_minute(requests_per_minute)
+    while True:
+        response = post_with_retry(coordinator_url + "/task", {}, retry_timeout)
+        task = response["task"]
+        if task is None:
+            if response["done"]:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        records, usage = process_segment(task)
+        post_with_retry(coordinator_url + "/result", {"task_id": task["task_id"], "records": records, "usage": usage},
+                        retry_timeout)
+
+
+def start_local_worker(coordinator_url, poll_interval, requests_per_minute):
+    """ Starts worker process on this machine
+
+    Args:
+        coordinator_url (str): Address of the coordinator
+        poll_interval (float): How long the worker waits, when there is no segment to process
+        requests_per_minute (float): Ceiling of OCR requests of the worker
+    Returns:
+        worker (multiprocessing.Process): Worker process
+    """
+
+    worker = multiprocessing.Process(target=run_worker, args=(coordinator_url, poll_interval),
+                                     kwargs={"requests_per_minute": requests_per_minute})
+    worker.start()
+    return worker
+
+
+def run_coordinator(video_path, subtitles_path, host="localhost", port=8765, segment_frames=2000,
+                    lease_timeout=300, local_workers=0, roi=None, parameters=None, poll_interval=1,
+                    requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE):
+    """ Splits the video into segments, waits until the workers process all of them and creates
+    .srt file from the merged records (the same outputs as "create_srt.main()")
+
+    Args:
+        video_path (str): Path to the video, readable by the workers
+        subtitles_path (str): Path to subtitle text file
+        host (str): Address the coordinator listens on (default = "localhost")
+        port (int): Port the coordinator listens on (default = 8765)
+        segment_frames (int): Number of frames in one segment (default = 2000)
+        lease_timeout (float): Seconds after which unfinished segment is handed out again (default = 300)
+        local_workers (int): Number of worker processes started on this machine (default = 0)
+        roi (list): Region of the subtitles [x, y, w, h] as fractions of the frame, None for the default
+        parameters (dict): Preprocessing parameters, None to OCR the raw crop
+        poll_interval (float): How often the workers ask for a segment, when there is none (default = 1)
+        requests_per_minute (float): Ceiling of OCR requests of the local workers, every one gets an equal share
+            (default = 1800)
+    Returns:
+        frame_info (list): list of information about start and end frames
+    """
+
+    total = timestamp_index.load_or_build(video_path).total
+
+    coordinator = Coordinator(video_path, total, segment_frames, lease_timeout, roi, parameters)
+    server = ThreadingHTTPServer((host, port), make_handler(coordinator))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    coordinator_url = f"http://{host}:{server.server_port}"
+    worker_requests = requests_per_minute / max(local_workers, 1)
+    workers = [start_local_worker(coordinator_url, poll_interval, worker_requests) for i in range(local_workers)]
+    restarts = 0
+    try:
+        while not coordinator.finished.wait(poll_interval):
+            for i, worker in enumerate(workers):
+                if worker is None or worker.is_alive():
+                    continue
+                # the worker died, its segment is handed out again when the lease expires
+                if restarts < MAX_RESTARTS:
+                    restarts += 1
+                    logger.warning(f"Local worker died (exit code {worker.exitcode}), restarting it")
+                    workers[i] = start_local_worker(coordinator_url, poll_interval, worker_requests)
+                else:
+                    logger.error(f"Local worker died (exit code {worker.exitcode}), no restarts left")
+                    workers[i] = None
+            if local_workers != 0 and all([worker is None for worker in workers]):
+                raise RuntimeError(f"All local workers died ({MAX_RESTARTS} restarts), "
+                                   f"{coordinator.tasks - len(coordinator.results)} segments are not finished")
+        for worker in workers:
+            if worker is not None:
+                worker.join()
+        # lets the remote workers find out that everything is finished
+        time.sleep(poll_interval)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    matcher = create_srt.Matcher(subtitles_path)
+    for frame_index, ocr_text, name_of_frame, seconds, microseconds in coordinator.records():
+        matcher.feed(ocr_text, name_of_frame, [seconds, microseconds], frame_index)
+    matcher.close()
+    coordinator.usage.save()
+    logger.info(coordinator.usage.summary())
+    return matcher.frame_info
@@ -0,0 +1,222 @@
+import os
+import json
+import logging
+import rate_limiter
+# Accounting of the OCR usage and its cost. Calls, images, bytes and estimated cost are counted for
+# the run and for the whole job (a single run, or all workers of "job_service.py") and saved next
+# to the recovery file. With a budget, sampling of the video gets sparser as the job approaches
+# the budget, and at the budget the OCR is switched to a local engine or stopped. The budget is checked
+# before every OCR call, so it is not exceeded even when many regions are sent at once (batches, tracks).
+# Calls include the retries of failed requests (counted by "rate_limiter.call_with_retry()").
+
+
+logger = logging.getLogger(__name__)
+
+
+# Vision API text detection, USD per 1000 images
+PRICE_PER_1000_IMAGES = 1.5
+
+# [part of the budget that is spent, only every n-th sampled frame is processed]
+BUDGET_STEPS = [[0.5, 2], [0.75, 4], [0.9, 8]]
+
+
+def usage_path(recovery_path):
+    """ Returns path of the usage file, that belongs to the recovery file
+
+    Args:
+        recovery_path (str): Path to the recovery file
+    """
+
+    return os.path.splitext(recovery_path)[0] + "_usage.json"
+
+
+def empty_usage():
+    return {"calls": 0, "images": 0, "bytes": 0, "cost": 0.0}
+
+
+def add_usage(total, usage):
+    """ Adds the usage to the total, in place
+
+    Args:
+        total (dict): Total usage
+        usage (dict): Added usage
+    """
+
+    for key in total:
+        total[key] += usage[key]
+
+
+class OcrUsage:
+    """ Usage of the OCR of one run and of the whole job
+
+    Args:
+        path (str): Path to the usage file, None to keep the usage only in memory (e.g. in a worker)
+        price_per_1000_images (float): Price of the OCR (default = PRICE_PER_1000_IMAGES)
+    """
+
+    def __init__(self, path, price_per_1000_images=PRICE_PER_1000_IMAGES):
+        self.path = path
+        self.price_per_image = price_per_1000_images / 1000
+        self.run = empty_usage()
+        self.job = empty_usage()
+        self.runs = []
+
+    def record(self, content, paid=True, calls=1, recognized=True):
+        """ Counts the OCR calls of one image
+
+        Args:
+            content (bytes): Encoded image
+            paid (bool): False for a local engine, that does not cost anything
+            calls (int): Requests sent for the image, retries included (default = 1)
+            recognized (bool): False if all requests failed, failed requests are not paid (default = True)
+        """
+
+        images = 1 if recognized else 0
+        cost = self.price_per_image if paid and recognized else 0.0
+        usage = {"calls": calls, "images": images, "bytes": calls * len(content), "cost": cost}
+        add_usage(self.run, usage)
+        add_usage(self.job, usage)
+
+    def add_run(self, usage):
+        """ Adds usage of another run of the job (e.g. reported by a worker)
+
+        Args:
+            usage (dict): Calls, images, bytes and cost
+        """
+
+        self.runs.append(usage)
+        add_usage(self.job, usage)
+
+    def save(self):
+        """ Writes the usage file """
+
+        if self.path is None:
+            return
+        with open(self.path, "w", encoding="utf8") as file:
+            json.dump({"run": self.run, "job": self.job, "runs": self.runs}, file, indent=4)
+
+    def summary(self):
+        return (f"OCR: {self.job['calls']} calls, {self.job['images']} images, "
+                f"{self.job['bytes'] / 1e6:.1f} MB, ${self.job['cost']:.2f}")
+
+
+class AccountingBackend:
+    """ OCR backend, that passes the images to another backend and counts them
+
+    Args:
+        backend (callable): Backend that does the OCR, e.g. "VisionAPI.content_text_detection"
+        usage (OcrUsage): Where the calls are counted
+        save_every (int): The usage file is written after every n calls (default = 50)
+    """
+
+    def __init__(self, backend, usage, save_every=50):
+        self.backend = backend
+        self.usage = usage
+        self.save_every = save_every
+        self.paid = True
+        # set by "Budget", checked before every call
+        self.budget = None
+
+    def __call__(self, content):
+        if self.budget is not None and not self.budget.allow_call():
+            return []
+        requests = rate_limiter.requests_sent()
+        try:
+            words = self.backend(content)
+        except Exception:
+            self.count(content, requests, recognized=False)
+            raise
+        self.count(content, requests)
+        return words
+
+    def count(self, content, requests, recognized=True):
+        """ Records the call, the requests sent by the backend since "requests" are its calls
+
+        Args:
+            content (bytes): Encoded image
+            requests (int): "rate_limiter.requests_sent()" before the call
+            recognized (bool): False if the call failed (default = True)
+        """
+
+        # backends that do not use "rate_limiter.call_with_retry()" (local engine, replay) send one request
+        calls = max(1, rate_limiter.requests_sent() - requests)
+        self.usage.record(content, self.paid, calls, recognized)
+        if recognized and self.usage.run["images"] % self.save_every == 0:
+            self.usage.save()
+
+    def switch(self, backend):
+        """ Continues with a local engine, its calls are counted, but not paid
+
+        Args:
+            backend (callable): Local OCR backend
+        """
+
+        self.backend = backend
+        self.paid = False
+
+
+class Budget:
+    """ Limits the cost of the job by sampling fewer frames as the budget is spent,
+    and by refusing the paid OCR calls that would exceed it
+
+    Args:
+        accounting (AccountingBackend): Backend that counts the OCR calls
+        limit (float): Maximum cost of the job in USD
+        local_backend (callable): Local OCR engine used after the budget is spent, None to stop the OCR
+    """
+
+    def __init__(self, accounting, limit, local_backend=None):
+        self.accounting = accounting
+        self.limit = limit
+        self.local_backend = local_backend
+        self.exhausted = False
+        accounting.budget = self
+
+    def spent(self):
+        """ Returns the part of the budget that is spent """
+
+        if self.limit <= 0:
+            return 1
+        return self.accounting.usage.job["cost"] / self.limit
+
+    def allow_call(self):
+        """ Decides if the next OCR call can be sent, switches to the local engine if it would exceed the budget
+
+        Returns:
+            True (bool): If the call is sent
+            False (bool): If the budget is spent and there is no local engine
+        """
+
+        if not self.accounting.paid:
+            return True
+        if self.accounting.usage.job["cost"] + self.accounting.usage.price_per_image <= self.limit:
+            return True
+        if self.local_backend is None:
+            if not self.exhausted:
+                logger.warning(f"OCR budget ${self.limit:.2f} is spent, the rest of the video is not processed")
+            self.exhausted = True
+            return False
+        logger.warning(f"OCR budget ${self.limit:.2f} is spent, continuing with the local OCR engine")
+        self.accounting.switch(self.local_backend)
+        return True
+
+    def sample(self, sample_index):
+        """ Decides if the sampled frame is processed
+
+        Args:
+            sample_index (int): Index of the sampled frame (frame index // stride)
+        Returns:
+            True (bool): If the frame is processed
+            False (bool): If the frame is skipped to save the budget
+        """
+
+        if self.exhausted:
+            return False
+        if not self.accounting.paid:
+            return True
+
+        step = 1
+        for part, every in BUDGET_STEPS:
+            if self.spent() >= part:
+                step = every
+        return sample_index % step == 0
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import cv2 as cv
+import numpy as np
+# Recording and replay of OCR responses. Responses are stored in a fixture file (.json),
+# keyed by the hash of the decoded image, so runs can be repeated offline and deterministically,
+# even when the image is encoded differently (another version of the encoder, other compression).
+
+
+def image_key(content):
+    """ Returns the key of the image in the fixture file, the hash of its pixels and shape
+
+    Args:
+        content (bytes): Encoded image
+    """
+
+    image = cv.imdecode(np.frombuffer(content, np.uint8), cv.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("OCR content is not an image")
+    key = hashlib.sha1(f"{image.shape} {image.dtype}".encode())
+    key.update(np.ascontiguousarray(image).tobytes())
+    return key.hexdigest()
+
+
+def load_responses(fixture_path):
+    """ Loads recorded responses from the fixture file
+
+    Args:
+        fixture_path (str): Path to the fixture file
+    Returns:
+        responses (dict): Words detected in the images, by the key of the image
+    """
+
+    if not os.path.exists(fixture_path):
+        return {}
+    with open(fixture_path, "r", encoding="utf8") as file:
+        responses = json.load(file)
+    return responses
+
+
+class RecordingBackend:
+    """ OCR backend, that passes the images to another backend and records its responses
+
+    Args:
+        fixture_path (str): Path to the fixture file, existing responses are kept
+        backend (callable): Backend that does the OCR, e.g. "VisionAPI.content_text_detection"
+    """
+
+    def __init__(self, fixture_path, backend):
+        self.fixture_path = fixture_path
+        self.backend = backend
+        self.responses = load_responses(fixture_path)
+
+    def __call__(self, content):
+        words = self.backend(content)
+        self.responses[image_key(content)] = list(words)
+        return words
+
+    def save(self):
+        """ Writes the recorded responses to the fixture file """
+
+        with open(self.fixture_path, "w", encoding="utf8") as file:
+            json.dump(self.responses, file, ensure_ascii=False, indent=0, sort_keys=True)
+
+
+class ReplayBackend:
+    """ OCR backend, that returns the recorded responses, without any OCR
+
+    Args:
+        fixture_path (str): Path to the fixture file
+    """
+
+    def __init__(self, fixture_path):
+        self.fixture_path = fixture_path
+        self.responses = load_responses(fixture_path)
+
+    def __call__(self, content):
+        key = image_key(content)
+        if key not in self.responses:
+            raise KeyError(f"Image {key} is not recorded in {self.fixture_path}, record the fixture again")
+        return list(self.responses[key])
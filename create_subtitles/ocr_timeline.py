@@ -0,0 +1,120 @@
+import os
+# Run-length compressed timeline of the OCR. Consecutive sampled frames of one subtitle usually have the
+# same clear OCR text, so the timeline stores spans of frames with the same text instead of every frame:
+#
+#   first frame|last frame|frames|first s|first ms|last s|last ms|clear OCR text
+#
+# The timeline is written next to the recovery file while the video is processed. It is written into
+# "<name>.part" and renamed when it is complete, so a crashed run leaves no timeline and the recovery
+# file is used instead. Replays (recovery.py) evaluate every span once instead of every frame.
+
+
+def timeline_path(recovery_path):
+    """ Returns path of the timeline, that belongs to the recovery file
+
+    Args:
+        recovery_path (str): Path to the recovery file
+    """
+
+    return os.path.splitext(recovery_path)[0] + "_timeline.txt"
+
+
+def span_line(span):
+    first_frame, last_frame, frames, first_time, last_time, tokens = span
+    info = ["" if first_frame is None else first_frame, "" if last_frame is None else last_frame, frames,
+            first_time[0], first_time[1], last_time[0], last_time[1], " ".join(tokens)]
+    return "|".join([str(elem) for elem in info])
+
+
+def parse_span(line):
+    first_frame, last_frame, frames, first_s, first_ms, last_s, last_ms, text = line.rstrip("\n").split("|", 7)
+    return [None if first_frame == "" else int(first_frame), None if last_frame == "" else int(last_frame),
+            int(frames), [float(first_s), float(first_ms)], [float(last_s), float(last_ms)], tuple(text.split(" "))]
+
+
+class TimelineWriter:
+    """ Compresses the clear OCR text of consecutive frames into spans and writes them
+
+    Args:
+        path (str): Path to the timeline
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # timeline of a previous run does not belong to the new recovery file
+        if os.path.exists(path):
+            os.remove(path)
+        self.file = open(path + ".part", "w", encoding="utf8")
+        self.span = None
+        self.spans = 0
+
+    def add(self, tokens, time, frame_index):
+        """ Adds the clear OCR text of the next frame, extends the last span if the text is the same
+
+        Args:
+            tokens (list): Clear OCR text of the frame
+            time (list): Time of frame [seconds, microseconds]
+            frame_index (int): Index of frame
+        """
+
+        tokens = tuple(tokens)
+        if self.span is not None and self.span[5] == tokens:
+            self.span[1] = frame_index
+            self.span[2] += 1
+            self.span[4] = time
+            return
+        self.flush()
+        self.span = [frame_index, frame_index, 1, time, time, tokens]
+
+    def flush(self):
+        if self.span is None:
+            return
+        self.file.write(span_line(self.span))
+        self.file.write("\n")
+        self.spans += 1
+        self.span = None
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        os.replace(self.path + ".part", self.path)
+
+
+def load_timeline(path):
+    """ Loads the spans of the timeline
+
+    Args:
+        path (str): Path to the timeline
+    Returns:
+        spans (list): list of [first frame, last frame, frames, first time, last time, tokens],
+            None if there is no complete timeline
+    """
+
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf8") as file:
+        return [parse_span(line) for line in file if line.strip() != ""]
+
+
+def compress(lines, frame_number):
+    """ Compresses the lines of a recovery file into spans
+
+    Args:
+        lines (list): Split lines of the recovery file [text index, OCR text, name of frame, s, ms]
+        frame_number (callable): Returns index of the frame from its name
+    Returns:
+        spans (list): list of [first frame, last frame, frames, first time, last time, tokens]
+    """
+
+    spans = []
+    for bad_text_index, ocr_text, name_of_frame, s_time, ms_time in lines:
+        tokens = tuple(ocr_text.split(" "))
+        time = [float(s_time), float(ms_time)]
+        frame_index = frame_number(name_of_frame)
+        if len(spans) != 0 and spans[-1][5] == tokens:
+            spans[-1][1] = frame_index
+            spans[-1][2] += 1
+            spans[-1][4] = time
+        else:
+            spans.append([frame_index, frame_index, 1, time, time, tokens])
+    return spans
@@ -1,10 +1,18 @@
 import cv2 as cv
-from matplotlib import pyplot as plt
 import numpy as np
 import os
 
-if not os.path.exists('temp'):
-    os.makedirs('temp')
+
+def temp_path(name):
+    """ Returns path to the file in the "temp" folder, creates the folder if it does not exist
+
+    Args:
+        name (str): name of the file
+    """
+
+    if not os.path.exists('temp'):
+        os.makedirs('temp')
+    return f"temp/{name}"
 
 
 def display(im_path):
@@ -14,6 +22,9 @@ def display(im_path):
         im_path (str): path to the image
     """
 
+    # matplotlib is slow to import and only needed for debugging
+    from matplotlib import pyplot as plt
+
     dpi = 80
     im_data = plt.imread(im_path)
 
@@ -45,7 +56,7 @@ def invert(image_path):
 
     image = cv.imread(image_path)
     inverted_image = cv.bitwise_not(image)
-    cv.imwrite("temp/inverted.png", inverted_image)
+    cv.imwrite(temp_path("inverted.png"), inverted_image)
     return "temp/inverted.png"
 
 
@@ -73,10 +84,10 @@ def binarization(image_path, par1=200, par2=230):
 
     image = grayscale(image_path)
 
-    cv.imwrite("temp/gray.png", image)
+    cv.imwrite(temp_path("gray.png"), image)
 
     thresh, im_bw = cv.threshold(image, par1, par2, cv.THRESH_BINARY)
-    cv.imwrite("temp/bw_image.png", im_bw)
+    cv.imwrite(temp_path("bw_image.png"), im_bw)
     return "temp/bw_image.png"
 
 
@@ -100,7 +111,7 @@ def noise_removal(image_path):
     image = cv.morphologyEx(image, cv.MORPH_CLOSE, kernel)
     image = cv.medianBlur(image, 3)
 
-    cv.imwrite("temp/no_noise.png", image)
+    cv.imwrite(temp_path("no_noise.png"), image)
     return "temp/no_noise.png"
 
 
@@ -137,12 +148,12 @@ def font_thickness(image_path, mode, par1=2, par2=2, iterations=1):
 
     image = cv.bitwise_not(image)
 
-    cv.imwrite("temp/eroded_image.png", image)
+    cv.imwrite(temp_path("eroded_image.png"), image)
     return "temp/eroded_image.png"
 
 
 # https://becominghuman.ai/how-to-automatically-deskew-straighten-a-text-image-using-opencv-a0c30aed83df
-def getSkewAngle(cvImage) -> float:
+def getSkewAngle(cvImage, save_boxes=True) -> float:
     # Prep image, copy, convert to gray scale, blur, and threshold
     newImage = cvImage.copy()
     gray = cv.cvtColor(newImage, cv.COLOR_BGR2GRAY)
@@ -158,20 +169,24 @@ def getSkewAngle(cvImage) -> float:
     # Find all contours
     contours, hierarchy = cv.findContours(dilate, cv.RETR_LIST, cv.CHAIN_APPROX_SIMPLE)
     contours = sorted(contours, key=cv.contourArea, reverse=True)
-    for c in contours:
-        rect = cv.boundingRect(c)
-        x, y, w, h = rect
-        cv.rectangle(newImage, (x, y), (x+w, y+h), (0, 255, 0), 2)
+    if save_boxes:
+        for c in contours:
+            rect = cv.boundingRect(c)
+            x, y, w, h = rect
+            cv.rectangle(newImage, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        cv.imwrite(temp_path("boxes.jpg"), newImage)
 
     # Find largest contour and surround in min area box
     largestContour = contours[0]
-    print(len(contours))
     minAreaRect = cv.minAreaRect(largestContour)
-    cv.imwrite("temp/boxes.jpg", newImage)
-    # Determine the angle. Convert it to the value that was originally used to obtain skewed image
+    # Determine the angle. Convert it to the value that was originally used to obtain skewed image.
+    # OpenCV < 4.5 returns angles in [-90, 0), newer versions (0, 90] for the same box with swapped sides
+    # (a level box is 90), so both are converted into [-45, 45]
     angle = minAreaRect[-1]
     if angle < -45:
         angle = 90 + angle
+    elif angle > 45:
+        angle = angle - 90
     return -1.0 * angle
 
 
@@ -190,10 +205,45 @@ def deskew(image_path):
     cvImage = cv.imread(image_path)
     angle = getSkewAngle(cvImage)
     fixed = rotateImage(cvImage, -1.0 * angle)
-    cv.imwrite("temp/deskewed_image.png", fixed)
+    cv.imwrite(temp_path("deskewed_image.png"), fixed)
     return "temp/deskewed_image.png"
 
 
+def apply_parameters(image, parameters):
+    """ Preprocesses image with fixed parameters, found by the calibration (calibration.py).
+    Does not analyse the image, so it is cheap enough to be used on every frame.
+
+    Args:
+        image (numpy.ndarray): Image loaded into memory, using "cv.imread()" (BGR or grayscale)
+        parameters (dict): Preprocessing parameters
+            par1, par2 (int): Parameters for threshold, None to skip the binarization
+            mode (int): Mode of "font_thickness()", None to keep the thickness
+            kernel (list): Size of the kernel for font thickness
+            angle (float): Skew angle of the text, 0 to skip the deskew
+    Returns:
+        image (numpy.ndarray): Preprocessed image
+    """
+
+    if parameters["par1"] is not None:
+        if image.ndim == 3:
+            image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+        thresh, image = cv.threshold(image, parameters["par1"], parameters["par2"], cv.THRESH_BINARY)
+
+    if parameters["mode"] is not None:
+        image = cv.bitwise_not(image)
+        kernel = np.ones(parameters["kernel"], np.uint8)
+        if parameters["mode"] == 1:
+            image = cv.erode(image, kernel, iterations=1)
+        else:
+            image = cv.dilate(image, kernel, iterations=1)
+        image = cv.bitwise_not(image)
+
+    if parameters["angle"]:
+        image = rotateImage(image, -1.0 * parameters["angle"])
+
+    return image
+
+
 def remove_borders(image_path):
     """ Crops image to remove borders. Use if borders are not defined, otherwise use batch crop
     in editing software.
@@ -208,7 +258,7 @@ def remove_borders(image_path):
     cnt = cntsSorted[-1]
     x, y, w, h = cv.boundingRect(cnt)
     crop = image[y:y+h, x:x+w]
-    cv.imwrite("temp/croped_image.png", crop)
+    cv.imwrite(temp_path("croped_image.png"), crop)
     return "temp/croped_image.png"
 
 
@@ -226,7 +276,7 @@ def add_borders(image_path, width=150, R=255, G=255, B=255):
     top, bottom, left, right = [width]*4
 
     image_with_border = cv.copyMakeBorder(image, top, bottom, left, right, cv.BORDER_CONSTANT, value=color)
-    cv.imwrite("temp/image_with_border.png", image_with_border)
+    cv.imwrite(temp_path("image_with_border.png"), image_with_border)
     return "temp/image_with_border.png"
 
 
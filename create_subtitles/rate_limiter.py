@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+# Shared rate limiting and retry logic for the OCR backend
+
+
+# gRPC status codes that are worth retrying: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED,
+# ABORTED, INTERNAL, UNAVAILABLE
+RETRYABLE_CODES = [4, 8, 10, 13, 14]
+
+# default quota of the Vision API text detection (requests per minute)
+DEFAULT_REQUESTS_PER_MINUTE = 1800
+
+
+class TransientError(Exception):
+    """ Error of the OCR backend that will most likely go away if the request is repeated """
+
+
+class TokenBucket:
+    """ Token bucket rate limiter. Tokens refill at a constant rate and every request
+    takes one token. Requests wait in the order in which they arrived, so concurrent jobs
+    that share the bucket also share the quota fairly.
+
+    Args:
+        requests_per_minute (float): Ceiling of requests per minute
+        burst (int): How many requests can be sent at once after an idle period (default = 1)
+    """
+
+    def __init__(self, requests_per_minute, burst=1):
+        self.lock = threading.Lock()
+        self.rate = requests_per_minute / 60
+        self.capacity = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+
+    def set_rate(self, requests_per_minute):
+        """ Changes the ceiling of requests per minute
+
+        Args:
+            requests_per_minute (float): New ceiling of requests per minute
+        """
+
+        with self.lock:
+            self.refill()
+            self.rate = requests_per_minute / 60
+
+    def refill(self):
+        """ Adds the tokens that were earned since the last refill """
+
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """ Takes one token from the bucket, waits if there are none left
+
+        The lock is held while waiting, so the next caller is only served after
+        the current one got its token (first come, first served).
+        """
+
+        with self.lock:
+            self.refill()
+            if self.tokens < 1:
+                time.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+    def penalize(self, seconds):
+        """ Holds the bucket back after the backend rejected a request, so no job
+        that shares the bucket sends requests for the given time
+
+        Args:
+            seconds (float): For how long the bucket stays empty
+        """
+
+        with self.lock:
+            self.refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+shared_limiter = TokenBucket(DEFAULT_REQUESTS_PER_MINUTE)
+
+# requests sent by "call_with_retry()" in the current thread, retries included
+sent = threading.local()
+
+
+def requests_sent():
+    """ Returns how many requests "call_with_retry()" sent in the current thread, retries included """
+
+    return getattr(sent, "requests", 0)
+
+
+def set_requests_per_minute(requests_per_minute):
+    """ Changes the ceiling of the limiter shared by all OCR calls
+
+    Args:
+        requests_per_minute (float): Ceiling of requests per minute
+    """
+
+    shared_limiter.set_rate(requests_per_minute)
+
+
+def backoff_delay(attempt, base_delay=1, max_delay=32):
+    """ Returns exponential backoff delay with full jitter
+
+    Args:
+        attempt (int): Number of the failed attempt, starting from 0
+        base_delay (float): Delay after the first failure in seconds (default = 1)
+        max_delay (float): Maximum delay in seconds (default = 32)
+
+    Returns:
+        delay (float): Time to wait before the next attempt in seconds
+    """
+
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    return delay
+
+
+def call_with_retry(function, *args, limiter=None, max_retries=6, is_retryable=None, **kwargs):
+    """ Calls the function through the rate limiter. If the call fails with an error that is
+    retryable, the limiter is held back (exponential backoff with jitter) and the call is repeated.
+
+    Args:
+        function (callable): Function that sends a request to the backend
+        limiter (TokenBucket): Limiter used for the requests (default = shared_limiter)
+        max_retries (int): How many times the request is repeated before giving up (default = 6)
+        is_retryable (callable): Function that decides if an error is retryable (default = TransientError only)
+
+    Returns:
+        result: Whatever the function returns
+    """
+
+    if limiter is None:
+        limiter = shared_limiter
+    if is_retryable is None:
+        is_retryable = lambda error: isinstance(error, TransientError)
+
+    attempt = 0
+    while True:
+        limiter.acquire()
+        sent.requests = requests_sent() + 1
+        try:
+            return function(*args, **kwargs)
+        except Exception as error:
+            if attempt >= max_retries or not is_retryable(error):
+                raise
+            limiter.penalize(backoff_delay(attempt))
+            attempt += 1
@@ -1,8 +1,8 @@
-import os
+import re
 from alive_progress import alive_bar
-import datetime
-import srt
-from pathlib import Path
+import srt_writer
+import ocr_timeline
+import fuzzy_match
 # Script for recovery of subtitles, in case of main script error
 
 
@@ -73,33 +73,19 @@ def load_subtitles(subtitles_path):
     return subtitles, native_subtitles
 
 
-def create_srt(frame_info):
-    """ Creates srt file, from collected frame info
+def frame_number(name_of_frame):
+    """ Returns index of the frame from its name in the recovery file (e.g. "./frames_from_video/frame12.jpg")
 
     Args:
-        frame_info (list): list of information about start and end frames
+        name_of_frame (str): name of frame file
+    Returns:
+        frame_index (int): Index of frame, None if the name does not contain it
     """
 
-    file = open("subtitles/Finished_subtitles.txt", "w+", encoding="utf8")
-    subtitles = []
-    for element in frame_info:
-        start = datetime.timedelta(seconds=element[0][0], microseconds=element[0][1])
-        end = datetime.timedelta(seconds=element[1][0], microseconds=element[1][1])
-        index = element[2]
-        content = element[3]
-
-        subtitle = srt.Subtitle(index=index, start=start, end=end, content=content)
-        subtitles.append(subtitle)
-
-    text = srt.compose(subtitles)
-    file.write(text)
-    file.close()
-
-    if os.path.exists("subtitles/Finished_subtitles.srt"):
-        os.remove("subtitles/Finished_subtitles.srt")
-    p = Path("subtitles/Finished_subtitles.txt")
-    p.rename(p.with_suffix('.srt'))
-    file.close()
+    match = re.search(r"(\d+)(\.\w+)?$", name_of_frame)
+    if match is None:
+        return None
+    return int(match.group(1))
 
 
 def key_words(current_sub, next_sub):
@@ -179,12 +165,13 @@ def text_prep(ocr_text, subtitles, text_index):
     return clear_current, clear_next, clear_ocr
 
 
-def how_similar_ocr(clear_ocr_text, current_sub):
+def how_similar_ocr(clear_ocr_text, current_sub, fuzzy=None):
     """ Determines how similar the OCR text is to the current subtitle
 
     Args:
         clear_ocr_text (list): List of current OCR text
         current_sub (list): List of current subtitle text
+        fuzzy (fuzzy_match.FuzzyIndex): Matches words within a small edit distance, None for exact match
 
     Returns:
         how_similar (float): Percentage of how similar the OCR is to the subtitle
@@ -193,7 +180,10 @@ def how_similar_ocr(clear_ocr_text, current_sub):
     temp_ocr = list(clear_ocr_text)
     similar_words = 0
     for element in current_sub:
-        if element in temp_ocr:
+        if fuzzy is not None:
+            if fuzzy.remove_match(element, temp_ocr):
+                similar_words += 1
+        elif element in temp_ocr:
             temp_ocr.remove(element)
             similar_words += 1
     how_similar = (similar_words * 100) / len(current_sub)
@@ -222,7 +212,7 @@ def how_similar_next(current_sub, next_sub):
     return how_similar
 
 
-def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
+def is_similar(ocr_text, text_index, subtitles, acceptable_value=50, fuzzy=None):
     """ Decides if the OCR is similar to the current subtitle.
     If current subtitle is not similar to next one - decides based only on similarity.
     If current subtitle is similar to next one - decides based on similarity and keywords.
@@ -233,6 +223,8 @@ def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
         text_index (int): Index of current subtitle
         subtitles (list): List of all subtitles
         acceptable_value (int): Percentage from where the OCR text is considered similar to subtitle
+        fuzzy (fuzzy_match.FuzzyIndex): Matches the OCR words within a small edit distance of the words
+            of the subtitles (precomputed for all subtitles), None for exact match
 
     Returns:
         True (bool): If similar and (keywords are in the current subtitle)
@@ -244,14 +236,17 @@ def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
     key_word = key_words(current_sub, next_sub)
 
     # finds how similar the OCR is to the subtitle and how similar the current subtitle is to the next one
-    how_similar_to_ocr = how_similar_ocr(clear_ocr_text, current_sub)
+    how_similar_to_ocr = how_similar_ocr(clear_ocr_text, current_sub, fuzzy)
     how_similar_to_next = how_similar_next(current_sub, next_sub)
 
     # counts how many keywords appear in the OCR
     keys_in_ocr = 0
     temp_ocr = list(clear_ocr_text)
     for word in key_word:
-        if word in temp_ocr:
+        if fuzzy is not None:
+            if fuzzy.remove_match(word, temp_ocr):
+                keys_in_ocr += 1
+        elif word in temp_ocr:
             temp_ocr.remove(word)
             keys_in_ocr += 1
 
@@ -267,45 +262,63 @@ def is_similar(ocr_text, text_index, subtitles, acceptable_value=50):
             return False
 
 
-def recover(recovery_path, subtitles_path):
-    """ Creates subtitles based on the information from the recovery file
+def recover(recovery_path, subtitles_path, video_path=None, fuzzy=False):
+    """ Creates subtitles based on the information from the recovery file. Consecutive frames with the same
+    OCR text are evaluated once, as one span of the timeline (ocr_timeline.py). The timeline saved next
+    to the recovery file is used if it is complete, otherwise the recovery file is compressed into spans.
 
     Args:
         recovery_path (str): Path to recovery file
         subtitles_path (str): Path to subtitles
+        video_path (str): Path to the video, if given, the times are looked up in its index of frame times
+            (timestamp_index.py, created if missing) instead of the times in the recovery file
+        fuzzy (bool): Match the OCR words within a small edit distance (fuzzy_match.py) (default = False)
     """
 
+    index = None
+    if video_path is not None:
+        import timestamp_index
+        index = timestamp_index.load_or_build(video_path)
+
     subtitles, native_subtitles = load_subtitles(subtitles_path)
-    recovery_lines = load_recovery(recovery_path)
-    with alive_bar(len(recovery_lines), force_tty=True) as bar:
+    fuzzy_index = fuzzy_match.FuzzyIndex(subtitles) if fuzzy else None
+    spans = ocr_timeline.load_timeline(ocr_timeline.timeline_path(recovery_path))
+    if spans is None:
+        spans = ocr_timeline.compress(load_recovery(recovery_path), frame_number)
+    writer = srt_writer.SrtWriter()
+    with alive_bar(len(spans), force_tty=True) as bar:
         frame_info = []
         text_index = 0
         time_of_frame = []
-        i = 0
-        while i < len(recovery_lines):
-            bad_text_index, ocr_text, name_of_frame, s_time, ms_time = recovery_lines[i]
-            s_time = float(s_time)
-            ms_time = float(ms_time)
-            ocr_text = ocr_text.split(" ")
-
+        similar = False
+        for first_frame, last_frame, frames, first_time, last_time, tokens in spans:
+            if index is not None and first_frame is not None and last_frame is not None:
+                first_time = index.time(first_frame)
+                last_time = index.time(last_frame)
+            ocr_text = list(tokens)
+
+            # the first frame of the span can finish the current subtitle
             if text_index+1 < len(subtitles):
-                similar = is_similar(ocr_text, text_index, subtitles)
+                similar = is_similar(ocr_text, text_index, subtitles, fuzzy=fuzzy_index)
 
             if similar is True:
-                time_of_frame.append([s_time, ms_time])
+                time_of_frame.append(first_time)
             elif len(time_of_frame) != 0:
                 frame_info.append([time_of_frame[0], time_of_frame[-1], text_index, native_subtitles[text_index]])
+                writer.write(frame_info[-1])
                 time_of_frame = []
                 text_index += 1
 
                 if text_index + 1 < len(subtitles):
-                    similar = is_similar(ocr_text, text_index, subtitles)
+                    similar = is_similar(ocr_text, text_index, subtitles, fuzzy=fuzzy_index)
                 if similar is True:
-                    time_of_frame.append([s_time, ms_time])
+                    time_of_frame.append(first_time)
 
-            i += 1
+            # the other frames of the span have the same text and the same subtitle, so the same result
+            if similar is True and frames > 1:
+                time_of_frame.append(last_time)
             bar()
-    create_srt(frame_info)
+    writer.close()
 
 
 if __name__ == "__main__":
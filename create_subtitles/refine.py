@@ -0,0 +1,140 @@
+import cv2 as cv
+import numpy as np
+import detect_words as det
+# Refinement of the subtitle timing to the exact frame, without any further OCR.
+# Between the last sampled frame without the subtitle and the first one with it (and the same at
+# the end), the subtitle regions of all frames are compared with the region of a frame that is
+# known to contain the subtitle.
+
+
+def text_mask(roi, threshold=200):
+    """ Returns mask of the bright pixels (the subtitle text) of the region
+
+    Args:
+        roi (numpy.ndarray): Cropped part of the frame
+        threshold (int): Brightness from where the pixel is considered text (default = 200)
+    Returns:
+        mask (numpy.ndarray): Boolean mask of the text pixels
+    """
+
+    if roi.ndim == 3:
+        roi = cv.cvtColor(roi, cv.COLOR_BGR2GRAY)
+    return roi >= threshold
+
+
+def difference(mask, reference):
+    """ Determines how different two text masks are. The background of the video changes
+    all the time, so only the text pixels are compared.
+
+    Args:
+        mask (numpy.ndarray): Text mask of the compared frame
+        reference (numpy.ndarray): Text mask of the frame with the subtitle
+    Returns:
+        difference (float): 0 for the same text, 1 for completely different text
+    """
+
+    union = np.count_nonzero(mask | reference)
+    if union == 0:
+        return 0
+    return np.count_nonzero(mask ^ reference) / union
+
+
+def frame_time(frame_index, fps):
+    """ Returns the time when the frame is displayed
+
+    Args:
+        frame_index (int): Index of frame
+        fps (float): Frames per second of the video
+    Returns:
+        time (list): list of the seconds and microseconds of the frame
+    """
+
+    seconds, remainder = divmod(frame_index / fps, 1)
+    return [seconds, remainder * 1000000]
+
+
+def read_masks(video, first, last, roi=None, index=None):
+    """ Yields text masks of the frames from first to last (including), one frame at a time,
+    so the caller can stop reading at the first change of the text
+
+    Args:
+        video (cv2.VideoCapture): Video loaded via cv2
+        first (int): Index of the first frame
+        last (int): Index of the last frame
+        roi (list): Region of the subtitles [x, y, w, h] as fractions of the frame, None for the default
+        index (timestamp_index.FrameIndex): Index of the video, to seek from the nearest keyframe
+    Yields:
+        mask (numpy.ndarray): Text mask of the frame
+    """
+
+    if index is None:
+        video.set(cv.CAP_PROP_POS_FRAMES, first)
+    elif not index.seek(video, first):
+        return
+    for i in range(first, last + 1):
+        ret, frame = video.read()
+        if not ret:
+            return
+        yield text_mask(det.crop_roi(frame, roi))
+
+
+def refine(video_path, frame_info, roi=None, max_difference=0.5, index=None):
+    """ Moves start and end of every subtitle to the exact frame, in which the subtitle appears
+    and disappears. Needs frame info from "create_srt.Matcher", with the indexes of frames.
+
+    Args:
+        video_path (str): Path to the video
+        frame_info (list): list of information about start and end frames
+        roi (list): Region of the subtitles [x, y, w, h] as fractions of the frame, None for the default
+        max_difference (float): Maximum difference of the text, for the frame to contain the same subtitle (default = 0.5)
+        index (timestamp_index.FrameIndex): Index of the video, for exact times of variable frame rate video,
+            None to compute the times from the frame rate
+    Returns:
+        frame_info (list): frame info with refined start and end times
+    """
+
+    video = cv.VideoCapture(video_path)
+    fps = video.get(cv.CAP_PROP_FPS)
+
+    for element in frame_info:
+        if len(element) < 5:
+            continue
+        before, first, last, after = element[4]
+        # subtitles of frames without index keep the sampled times
+        if first is None or last is None or after is None:
+            continue
+        if before is None:
+            before = first - 1
+
+        # goes forward to the first frame with the subtitle, the subtitle starts after the last frame
+        # with other text
+        start = first
+        reference = next(read_masks(video, first, first, roi, index), None)
+        if reference is not None:
+            for i, mask in enumerate(read_masks(video, before + 1, first - 1, roi, index)):
+                if difference(mask, reference) > max_difference:
+                    start = first
+                elif start == first:
+                    start = before + 1 + i
+
+        # goes forward from the last frame with the subtitle, while the text stays the same
+        end = last
+        masks = read_masks(video, last, after - 1, roi, index)
+        reference = next(masks, None)
+        if reference is not None:
+            for i, mask in enumerate(masks, start=1):
+                if difference(mask, reference) > max_difference:
+                    break
+                end = last + i
+
+        if index is None:
+            element[0] = frame_time(start, fps)
+            element[1] = frame_time(end + 1, fps)
+        else:
+            element[0] = index.time(start)
+            element[1] = index.time(end + 1)
+        element[4][1] = start
+        element[4][2] = end
+
+    video.release()
+    return frame_info
@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import statistics
+import srt
+import create_srt
+import recovery
+import detect_words as det
+import ocr_replay
+# Offline regression tests of the whole pipeline. Every case is a directory in "regression/" with:
+#   case.json           {"video": "...", "subtitles": "...", "options": {...}}, paths relative to the case directory,
+#                       options are passed to "create_srt.main()"
+#   ocr_responses.json  recorded OCR responses (created by "python regression.py record <case directory>")
+#   reference.srt       reviewed subtitles, that the pipeline should produce
+# The cases are run with the recorded responses, so no API key or network is needed.
+# "regression/synthetic" is a generated clip (lossless FFV1, so every decoder returns the same pixels as the
+# recorded ones), its OCR responses were recorded from the marker-reading OCR of the tests ("conftest.py")
+# and the reference has the times the subtitles were drawn at.
+
+
+REGRESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regression")
+
+
+def load_case(case_dir):
+    """ Loads description of the regression case
+
+    Args:
+        case_dir (str): Path to the case directory
+    Returns:
+        case (dict): Absolute paths to the video, subtitles, fixture and reference, and options of the run
+    """
+
+    case_dir = os.path.abspath(case_dir)
+    with open(os.path.join(case_dir, "case.json"), "r", encoding="utf8") as file:
+        description = json.load(file)
+
+    case = {
+        "name": os.path.basename(case_dir),
+        "video": os.path.join(case_dir, description["video"]),
+        "subtitles": os.path.join(case_dir, description["subtitles"]),
+        "options": description.get("options", {}),
+        "fixture": os.path.join(case_dir, "ocr_responses.json"),
+        "reference": os.path.join(case_dir, "reference.srt"),
+    }
+    return case
+
+
+def load_srt(srt_path):
+    """ Loads subtitles from .srt file
+
+    Args:
+        srt_path (str): Path to .srt file
+    Returns:
+        subtitles (list): list of srt.Subtitle
+    """
+
+    with open(srt_path, "r", encoding="utf8") as file:
+        subtitles = list(srt.parse(file.read()))
+    return subtitles
+
+
+def timing_errors(srt_path, reference_path):
+    """ Compares the produced subtitles with the reference. Subtitles are paired by their content, in order.
+
+    Args:
+        srt_path (str): Path to the produced .srt file
+        reference_path (str): Path to the reference .srt file
+    Returns:
+        errors (list): Absolute errors of start and end times of paired subtitles, in seconds
+        missing (int): How many reference subtitles were not produced
+        extra (int): How many produced subtitles are not in the reference
+    """
+
+    produced = load_srt(srt_path)
+    errors = []
+    missing = 0
+    i = 0
+    for subtitle in load_srt(reference_path):
+        j = i
+        while j < len(produced) and produced[j].content != subtitle.content:
+            j += 1
+        if j == len(produced):
+            missing += 1
+            continue
+        errors.append(abs((produced[j].start - subtitle.start).total_seconds()))
+        errors.append(abs((produced[j].end - subtitle.end).total_seconds()))
+        i = j + 1
+
+    extra = len(produced) - len(errors) // 2
+    return errors, missing, extra
+
+
+def run_in_temp_dir(function, *args, **kwargs):
+    """ Runs the function in an empty working directory, so the outputs of the pipeline
+    ("subtitles/", "frames_from_video/", "temp/") do not overwrite the real ones
+
+    Args:
+        function (callable): Function to run
+    Returns:
+        work_dir (str): Path to the working directory, has to be removed by the caller
+        result: Whatever the function returns
+    """
+
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp()
+    os.chdir(work_dir)
+    os.makedirs("subtitles")
+    os.makedirs("temp")
+    try:
+        result = function(*args, **kwargs)
+    except Exception:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir)
+        raise
+    os.chdir(cwd)
+    return work_dir, result
+
+
+def run_case(case_dir):
+    """ Runs "create_srt.main()" and "recovery.recover()" with recorded OCR responses and
+    compares both outputs with the reference
+
+    Args:
+        case_dir (str): Path to the case directory
+    Returns:
+        results (dict): timing errors, missing and extra subtitles and runtime, for "main" and "recover"
+    """
+
+    case = load_case(case_dir)
+    previous_backend = det.backend
+    det.set_backend(ocr_replay.ReplayBackend(case["fixture"]))
+
+    def run():
+        results = {}
+
+        start = time.perf_counter()
+        create_srt.main(case["video"], case["subtitles"], **case["options"])
+        runtime = time.perf_counter() - start
+        errors, missing, extra = timing_errors("subtitles/Finished_subtitles.srt", case["reference"])
+        results["main"] = {"errors": errors, "missing": missing, "extra": extra, "runtime": runtime}
+
+        start = time.perf_counter()
+        recovery.recover("subtitles/recovery_file.txt", case["subtitles"])
+        runtime = time.perf_counter() - start
+        errors, missing, extra = timing_errors("subtitles/Finished_subtitles.srt", case["reference"])
+        results["recover"] = {"errors": errors, "missing": missing, "extra": extra, "runtime": runtime}
+        return results
+
+    try:
+        work_dir, results = run_in_temp_dir(run)
+    finally:
+        det.set_backend(previous_backend)
+    shutil.rmtree(work_dir)
+    return results
+
+
+def record_case(case_dir):
+    """ Runs "create_srt.main()" with the real OCR backend and records its responses.
+    If the case has no reference yet, the produced subtitles are saved as the reference
+    (they should be reviewed before they are committed).
+
+    Args:
+        case_dir (str): Path to the case directory
+    """
+
+    case = load_case(case_dir)
+    previous_backend = det.backend
+    recording = ocr_replay.RecordingBackend(case["fixture"], previous_backend)
+    det.set_backend(recording)
+
+    try:
+        work_dir, frame_info = run_in_temp_dir(create_srt.main, case["video"], case["subtitles"], **case["options"])
+    finally:
+        det.set_backend(previous_backend)
+        recording.save()
+
+    if not os.path.exists(case["reference"]):
+        shutil.copy(os.path.join(work_dir, "subtitles/Finished_subtitles.srt"), case["reference"])
+    shutil.rmtree(work_dir)
+
+
+def passed(result, max_error):
+    """ Decides if the result of the run matches the reference
+
+    Args:
+        result (dict): Result of the run
+        max_error (float): Maximum accepted timing error in seconds
+    """
+
+    return result["missing"] == 0 and result["extra"] == 0 and max(result["errors"], default=0) <= max_error
+
+
+def report(name, results, max_error):
+    """ Prints timing error statistics and runtime of the case
+
+    Args:
+        name (str): Name of the case
+        results (dict): Results of "run_case()"
+        max_error (float): Maximum accepted timing error in seconds
+    """
+
+    for run, result in results.items():
+        errors = result["errors"] or [0]
+        status = "OK" if passed(result, max_error) else "FAIL"
+        print(f"{status:4} {name}/{run}: mean error {statistics.mean(errors):.3f} s, "
+              f"median {statistics.median(errors):.3f} s, max {max(errors):.3f} s, "
+              f"missing {result['missing']}, extra {result['extra']}, runtime {result['runtime']:.2f} s")
+
+
+def find_cases(regression_dir):
+    """ Returns names of the cases in the directory, sorted
+
+    Args:
+        regression_dir (str): Directory with the cases
+    """
+
+    if not os.path.isdir(regression_dir):
+        return []
+    return [name for name in sorted(os.listdir(regression_dir))
+            if os.path.exists(os.path.join(regression_dir, name, "case.json"))]
+
+
+def main(regression_dir=None, max_error=0.1):
+    """ Runs all regression cases and prints the report
+
+    Args:
+        regression_dir (str): Directory with the cases (default = "regression" next to this file)
+        max_error (float): Maximum accepted timing error in seconds (default = 0.1)
+    Returns:
+        True (bool): If all cases match their reference
+        False (bool): If any case does not (or its fixture misses a response), or there are no cases
+    """
+
+    if regression_dir is None:
+        regression_dir = REGRESSION_DIR
+    names = find_cases(regression_dir)
+    if len(names) == 0:
+        print(f"No regression cases (directories with case.json) in {regression_dir}", file=sys.stderr)
+        return False
+
+    all_passed = True
+    for name in names:
+        case_dir = os.path.join(regression_dir, name)
+        try:
+            results = run_case(case_dir)
+        except KeyError as error:
+            # an image without recorded response, the fixture is outdated
+            print(f"FAIL {name}: {error.args[0]}")
+            all_passed = False
+            continue
+        report(name, results, max_error)
+        all_passed = all_passed and all(passed(result, max_error) for result in results.values())
+    return all_passed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "record":
+        record_case(sys.argv[2])
+    else:
+        sys.exit(0 if main() else 1)
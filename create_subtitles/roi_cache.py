@@ -0,0 +1,228 @@
+import os
+import json
+import cv2 as cv
+import numpy as np
+import detect_words as det
+# Cache of the subtitle regions of sampled frames. The regions of the tracks are decoded once and stored
+# in a raw file next to the recovery file, later runs (with other preprocessing or OCR) read them from
+# the file as memory-mapped array, without opening the video. Only the regions of the tracks are cached,
+# in grayscale when the preprocessing binarizes them anyway (the OCR never gets the colors), so the cache
+# takes a fraction of the frame. Unlike "ffmpeg_decoder.region_box()", which decodes the strip containing
+# all tracks, the cache keeps the exact boxes of the tracks: a run with a region, that is not cached (even
+# a slightly shifted one), does not use the cache and decodes the video again.
+#
+#   subtitles/<video>.rois        regions, uint8 array (count, size of the regions of all tracks)
+#   subtitles/<video>.rois.npy    frame index, seconds and microseconds of every frame
+#   subtitles/<video>.rois.json   description of the cache
+
+
+def cache_paths(video_path, cache_dir="subtitles"):
+    """ Returns paths of the cache files of the video
+
+    Args:
+        video_path (str): Path to the video
+        cache_dir (str): Folder of the cache (default = "subtitles")
+    Returns:
+        rois_path (str): Path to the regions
+        times_path (str): Path to the indexes and times of frames
+        description_path (str): Path to the description
+    """
+
+    base = os.path.join(cache_dir, os.path.basename(video_path) + ".rois")
+    return base, base + ".npy", base + ".json"
+
+
+def video_id(video_path):
+    """ Returns size and modification time of the video, to find out if the cache is still valid
+
+    Args:
+        video_path (str): Path to the video
+    """
+
+    stat = os.stat(video_path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def is_gray(parameters):
+    """ Decides if the regions can be cached in grayscale: the preprocessing binarizes them, so the OCR
+    never gets the colors
+
+    Args:
+        parameters (dict): Preprocessing parameters, None to OCR the raw crop
+    """
+
+    return parameters is not None and parameters["par1"] is not None
+
+
+class RoiCacheWriter:
+    """ Writes the regions of the tracks of every sampled frame, while the video is decoded
+
+    Args:
+        video_path (str): Path to the video
+        tracks (list): list of [roi, subtitles_path] pairs
+        stride (int): Every n-th frame is sampled
+        total (int): Number of frames of the video
+        gray (bool): Cache grayscale regions (default = False)
+        cache_dir (str): Folder of the cache (default = "subtitles")
+    """
+
+    def __init__(self, video_path, tracks, stride, total, gray=False, cache_dir="subtitles"):
+        self.video_path = video_path
+        self.rois = [roi for roi, subtitles_path in tracks]
+        self.stride = stride
+        self.total = total
+        self.gray = gray
+        self.rois_path, self.times_path, self.description_path = cache_paths(video_path, cache_dir)
+
+        # description is written only when the cache is complete
+        if os.path.exists(self.description_path):
+            os.remove(self.description_path)
+        self.file = open(self.rois_path, "wb")
+        self.frames = []
+        self.frame_shape = None
+        self.boxes = None
+        self.time_type = None
+
+    def add(self, frame_index, frame, time):
+        """ Adds the regions of the frame
+
+        Args:
+            frame_index (int): Index of frame
+            frame (numpy.ndarray): Frame
+            time (list): Time of frame [seconds, microseconds]
+        """
+
+        if self.frame_shape is None:
+            self.frame_shape = list(frame.shape)
+            self.boxes = []
+            for roi in self.rois:
+                box = det.roi_box(frame.shape, roi)
+                if box not in self.boxes:
+                    self.boxes.append(box)
+            self.time_type = type(time[0]).__name__
+        for x, y, w, h in self.boxes:
+            region = frame[y:y + h, x:x + w]
+            if self.gray:
+                region = cv.cvtColor(region, cv.COLOR_BGR2GRAY)
+            self.file.write(np.ascontiguousarray(region).tobytes())
+        self.frames.append([frame_index, time[0], time[1]])
+
+    def close(self):
+        """ Finishes the cache, writes the times and the description """
+
+        self.file.close()
+        np.save(self.times_path, np.array(self.frames, np.float64).reshape(-1, 3))
+        description = {"video": video_id(self.video_path), "stride": self.stride, "total": self.total,
+                       "frame_shape": self.frame_shape, "boxes": self.boxes, "gray": self.gray,
+                       "time_type": self.time_type, "count": len(self.frames)}
+        with open(self.description_path, "w", encoding="utf8") as file:
+            json.dump(description, file, indent=4)
+
+    def discard(self):
+        """ Removes the cache, that was not completed (e.g. the run stopped before the end of the video) """
+
+        self.file.close()
+        for path in [self.rois_path, self.times_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class RoiCache:
+    """ Memory-mapped regions of a video, that was already decoded
+
+    Args:
+        rois_path (str): Path to the regions
+        times_path (str): Path to the indexes and times of frames
+        description (dict): Description of the cache
+    """
+
+    def __init__(self, rois_path, times_path, description):
+        self.rois_path = rois_path
+        self.description = description
+        self.total = description["total"]
+        self.frame_shape = description["frame_shape"]
+        self.boxes = description["boxes"] or []
+        self.times = np.load(times_path)
+        # times are returned as the same type, as the decoded video returned them
+        self.time_type = int if description["time_type"] == "int" else float
+
+        # [start, end, shape] of the region of every box in the record of a frame
+        self.layout = []
+        start = 0
+        for x, y, w, h in self.boxes:
+            shape = (h, w) if description["gray"] else (h, w, 3)
+            self.layout.append([start, start + int(np.prod(shape)), shape])
+            start += int(np.prod(shape))
+        if description["count"] == 0:
+            self.rois = np.empty([0, start], np.uint8)
+        else:
+            self.rois = np.memmap(rois_path, np.uint8, "r", shape=(description["count"], start))
+
+    def read_frames(self):
+        """ Yields the cached regions, the same way as "create_srt.read_frames()" yields the frames
+
+        Yields:
+            frame_index (int): Index of frame
+            record (numpy.ndarray): Cached regions of the frame (view into the memory-mapped file), see "crop()"
+            time (list): Time of frame [seconds, microseconds]
+        """
+
+        for i in range(len(self.times)):
+            frame_index, seconds, microseconds = self.times[i]
+            yield int(frame_index), self.rois[i], [self.time_type(seconds), self.time_type(microseconds)]
+
+    def crop(self, record, roi=None):
+        """ Returns the region of the subtitles from the cached regions of the frame
+
+        Args:
+            record (numpy.ndarray): Cached regions of the frame
+            roi (list): Region [x, y, w, h] as fractions of the frame, None for the default region at the bottom
+        Returns:
+            roi (numpy.ndarray): Cropped part of the frame
+        """
+
+        box = det.roi_box(self.frame_shape, roi)
+        if box not in self.boxes:
+            raise ValueError(f"Region {roi} is not in the cache {self.rois_path}, remove the cache to decode it again")
+        start, end, shape = self.layout[self.boxes.index(box)]
+        return record[start:end].reshape(shape)
+
+    def name_of_frame(self, frame_index):
+        """ Returns name of the frame for the recovery file (the frame is not saved as image)
+
+        Args:
+            frame_index (int): Index of frame
+        """
+
+        return f"{self.rois_path}#{frame_index}"
+
+
+def open_cache(video_path, tracks, stride, gray=False, cache_dir="subtitles"):
+    """ Opens the cache of the video, if it is complete and valid for the tracks
+
+    Args:
+        video_path (str): Path to the video
+        tracks (list): list of [roi, subtitles_path] pairs
+        stride (int): Every n-th frame is sampled
+        gray (bool): Grayscale regions are enough (default = False)
+        cache_dir (str): Folder of the cache (default = "subtitles")
+    Returns:
+        cache (RoiCache): Cache of the video, None if there is no valid cache
+    """
+
+    rois_path, times_path, description_path = cache_paths(video_path, cache_dir)
+    if not os.path.exists(description_path):
+        return None
+    with open(description_path, "r", encoding="utf8") as file:
+        description = json.load(file)
+
+    if description["video"] != video_id(video_path) or description["stride"] != stride:
+        return None
+    # cache of an older version, or with grayscale regions for a run that needs the colors
+    if "boxes" not in description or (description["gray"] and not gray):
+        return None
+    if description["count"] != 0:
+        for roi, subtitles_path in tracks:
+            if det.roi_box(description["frame_shape"], roi) not in description["boxes"]:
+                return None
+    return RoiCache(rois_path, times_path, description)
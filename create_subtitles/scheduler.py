@@ -0,0 +1,125 @@
+import statistics
+# Prediction of the sampled frames, that are worth the OCR. How long a subtitle is displayed depends
+# mostly on its length, so the expected end of the displayed subtitle is estimated from the number of
+# characters and the reading speed (characters per second), which is refined from the already matched
+# subtitles. Far from the expected end only a few frames are processed, near it every sampled frame.
+# When no subtitle is displayed, frames are processed in a fixed interval.
+# The end of a subtitle can be found later than it disappeared (at most by the sampling interval),
+# "refine.py" moves it to the exact frame afterwards.
+# The decisions need the matcher updated after every processed frame, so the scheduler does not combine
+# with batches ("batch_processing.py"), which update it only after a whole batch.
+
+
+# typical reading speed of the subtitles, characters per second
+CHARS_PER_SECOND = 15
+
+
+def seconds(time):
+    """ Converts the time of frame [seconds, microseconds] into seconds """
+
+    return time[0] + time[1] / 1000000
+
+
+class ReadingSpeedModel:
+    """ Estimates how long a subtitle is displayed from its length
+
+    Args:
+        chars_per_second (float): Initial reading speed (default = CHARS_PER_SECOND)
+        min_duration (float): Shortest expected duration in seconds (default = 1)
+        history (int): How many of the last matched subtitles the reading speed is estimated from (default = 20)
+    """
+
+    def __init__(self, chars_per_second=CHARS_PER_SECOND, min_duration=1, history=20):
+        self.chars_per_second = chars_per_second
+        self.min_duration = min_duration
+        self.history = history
+        self.speeds = []
+
+    def duration(self, text):
+        """ Returns the expected duration of the subtitle in seconds
+
+        Args:
+            text (str): Whole subtitle
+        """
+
+        characters = len(text.replace("\n", ""))
+        return max(self.min_duration, characters / self.chars_per_second)
+
+    def update(self, text, duration):
+        """ Refines the reading speed with the duration of a matched subtitle
+
+        Args:
+            text (str): Whole subtitle
+            duration (float): How long the subtitle was displayed in seconds
+        """
+
+        characters = len(text.replace("\n", ""))
+        if duration <= 0 or characters == 0:
+            return
+        self.speeds.append(characters / duration)
+        self.speeds = self.speeds[-self.history:]
+        # median, so a subtitle that was not found on some frames does not spoil the estimate
+        self.chars_per_second = statistics.median(self.speeds)
+
+
+class PredictiveScheduler:
+    """ Decides which sampled frames are processed by the OCR, from the state of the matcher
+
+    Args:
+        model (ReadingSpeedModel): Reading speed model, a new one if None
+        window (float): How many seconds around the expected end every sampled frame is processed (default = 0.5)
+        max_interval (float): Longest interval between processed frames in seconds (default = 2)
+        gap_interval (float): Interval between processed frames when no subtitle is displayed (default = 0.25)
+    """
+
+    def __init__(self, model=None, window=0.5, max_interval=2, gap_interval=0.25):
+        self.model = model if model is not None else ReadingSpeedModel()
+        self.window = window
+        self.max_interval = max_interval
+        self.gap_interval = gap_interval
+        self.last_sample = None
+        self.matched = 0
+
+    def learn(self, matcher):
+        """ Refines the model with the subtitles, that the matcher finished since the last call """
+
+        for start, end, text_index, content, frames in matcher.frame_info[self.matched:]:
+            self.model.update(content, seconds(end) - seconds(start))
+        self.matched = len(matcher.frame_info)
+
+    def interval(self, now, matcher):
+        """ Returns how long after the last processed frame the next one should be processed
+
+        Args:
+            now (float): Time of the frame in seconds
+            matcher (create_srt.Matcher): Matcher of the track
+        """
+
+        if len(matcher.time_of_frame) == 0:
+            return self.gap_interval
+        text = matcher.native_subtitles[matcher.text_index]
+        expected_end = seconds(matcher.time_of_frame[0]) + self.model.duration(text)
+        distance = abs(expected_end - now) - self.window
+        if distance <= 0:
+            return 0
+        # halves the distance to the expected end with every processed frame before it,
+        # and doubles the interval again when the subtitle stays longer than expected
+        return min(self.max_interval, distance / 2)
+
+    def sample(self, time, matcher):
+        """ Decides if the sampled frame is processed
+
+        Args:
+            time (list): Time of frame [seconds, microseconds]
+            matcher (create_srt.Matcher): Matcher of the track
+        Returns:
+            True (bool): If the frame should be processed
+            False (bool): If it can be skipped
+        """
+
+        self.learn(matcher)
+        now = seconds(time)
+        if self.last_sample is not None and now - self.last_sample < self.interval(now, matcher):
+            return False
+        self.last_sample = now
+        return True
@@ -0,0 +1,59 @@
+import os
+import datetime
+import srt
+# Incremental writer of .srt files, so finished subtitles can be checked while the video is still processed
+
+
+class SrtWriter:
+    """ Appends subtitles to .srt file as soon as they are finalized. Every subtitle is written
+    with a single write and flushed to the disk, so the subtitles before the last one are complete
+    even after a crash. The last one can be cut by a crash during its write, "recovery.py" creates
+    the whole file again from the recovery file.
+
+    Args:
+        srt_path (str): Path to the output .srt file (default = "subtitles/Finished_subtitles.srt")
+    """
+
+    def __init__(self, srt_path="subtitles/Finished_subtitles.srt"):
+        self.srt_path = srt_path
+        self.file = open(srt_path, "w", encoding="utf8")
+        self.index = 0
+
+    def write(self, element):
+        """ Appends one subtitle to the file
+
+        Args:
+            element (list): frame info of one subtitle [start time, end time, text index, content]
+        """
+
+        start = datetime.timedelta(seconds=element[0][0], microseconds=element[0][1])
+        end = datetime.timedelta(seconds=element[1][0], microseconds=element[1][1])
+        content = element[3]
+
+        self.index += 1
+        subtitle = srt.Subtitle(index=self.index, start=start, end=end, content=content)
+        self.file.write(subtitle.to_srt())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_srt(frame_info, srt_path="subtitles/Finished_subtitles.srt"):
+    """ Creates srt file, from collected frame info
+
+    Args:
+        frame_info (list): list of information about start and end frames
+        srt_path (str): Path to the output .srt file (default = "subtitles/Finished_subtitles.srt")
+    """
+
+    with SrtWriter(srt_path) as writer:
+        for element in frame_info:
+            writer.write(element)
@@ -0,0 +1,240 @@
+import statistics
+import cv2 as cv
+import numpy as np
+import refine
+# Verification of the expected subtitles without OCR. The transcript says which subtitle should be
+# displayed, so the current and the next subtitle are rendered as text masks and compared with the
+# text mask of the region by normalized cross-correlation. Both masks are cut to the bounding box of
+# the text and blurred, so a short subtitle does not match a part of a longer one and small
+# differences between the rendered font and the font of the video do not matter. The OCR is used
+# only when the comparison is not clear, and for the first frames, which calibrate the font: the scale
+# and the stroke thickness, whose rendered subtitles correlate best with the confirmed frames.
+
+
+FONT = cv.FONT_HERSHEY_SIMPLEX
+
+# result of "TemplateVerifier.classify()" for a region without any text
+NO_TEXT = -1
+
+# font scales tried by the calibration
+SCALES = [0.2 * 1.1 ** i for i in range(35)]
+
+# stroke thicknesses tried by the calibration, relative to the font scale
+STROKES = [1, 2, 3, 4]
+
+# how much the height of the rendered text can differ from the confirmed frames to be tried
+HEIGHT_TOLERANCE = 0.15
+
+
+def pad(image, height, width, border):
+    """ Pads the image with zeros, so it is centered in (height + 2 * border, width + 2 * border)
+
+    Args:
+        image (numpy.ndarray): Image
+        height (int): Height without the border
+        width (int): Width without the border
+        border (int): Additional zeros on every side
+    """
+
+    top = (height - image.shape[0]) // 2 + border
+    left = (width - image.shape[1]) // 2 + border
+    bottom = height - image.shape[0] + 2 * border - top
+    right = width - image.shape[1] + 2 * border - left
+    return cv.copyMakeBorder(image, top, bottom, left, right, cv.BORDER_CONSTANT, value=0)
+
+
+class TemplateVerifier:
+    """ Classifies regions as the current subtitle, the next subtitle or no text
+
+    Args:
+        native_subtitles (list): list of whole sentences
+        accept (float): Minimal correlation of the best subtitle (default = 0.6)
+        margin (float): Minimal difference of the correlations of the current and the next subtitle (default = 0.2)
+        threshold (int): Brightness from where the pixel is considered text (default = 200)
+        min_pixels (int): How many text pixels the region needs to contain any text (default = 20)
+        calibration_frames (int): How many frames confirmed by the OCR calibrate the font size (default = 3)
+        slack (int): How many pixels the text can be shifted against the template (default = 4)
+    """
+
+    def __init__(self, native_subtitles, accept=0.6, margin=0.2, threshold=200, min_pixels=20,
+                 calibration_frames=3, slack=4):
+        self.native_subtitles = native_subtitles
+        self.accept = accept
+        self.margin = margin
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+        self.calibration_frames = calibration_frames
+        self.slack = slack
+        # [text mask, subtitle index] of the frames confirmed by the OCR
+        self.confirmed = []
+        self.scale = None
+        self.stretch = None
+        self.stroke = None
+        self.sigma = None
+        self.templates = {}
+
+    def render(self, text, scale, thickness):
+        """ Renders the subtitle as text mask, lines are centered under each other
+
+        Args:
+            text (str): Whole subtitle
+            scale (float): Font scale of "cv2.putText()"
+            thickness (int): Stroke thickness of "cv2.putText()"
+        Returns:
+            template (numpy.ndarray): uint8 mask of the text, 255 for text pixels
+        """
+
+        lines = text.split("\n")
+        sizes = [cv.getTextSize(line, FONT, scale, thickness) for line in lines]
+        line_height = max(size[1] + size[0][1] for size in sizes)
+        width = max(size[0][0] for size in sizes) + 2 * thickness
+        template = np.zeros((line_height * len(lines) + 2 * thickness, width), np.uint8)
+        for i, (line, ((line_width, text_height), baseline)) in enumerate(zip(lines, sizes)):
+            origin = ((width - line_width) // 2, thickness + i * line_height + text_height)
+            cv.putText(template, line, origin, FONT, scale, 255, thickness, cv.LINE_AA)
+        return template
+
+    def text_box(self, mask):
+        """ Returns the bounding box [x, y, w, h] of the text pixels, None if there are too few of them """
+
+        if np.count_nonzero(mask) < self.min_pixels:
+            return None
+        return cv.boundingRect(mask.astype(np.uint8))
+
+    def calibrate(self, roi, text_index):
+        """ Collects the regions, that the OCR confirmed as the subtitle, and fits the font to them
+
+        Args:
+            roi (numpy.ndarray): Cropped part of the frame
+            text_index (int): Index of the displayed subtitle
+        """
+
+        if self.scale is not None:
+            return
+        mask = refine.text_mask(roi, self.threshold)
+        if self.text_box(mask) is None:
+            return
+        self.confirmed.append([mask, text_index])
+        if len(self.confirmed) == self.calibration_frames:
+            self.fit_font()
+
+    def set_font(self, scale, stretch, stroke):
+        self.scale = scale
+        self.stretch = stretch
+        self.stroke = stroke
+        self.sigma = 1.5 * stroke
+        self.templates = {}
+
+    def fit_font(self):
+        """ Tries the font scales and stroke thicknesses, whose rendered text has about the height
+        of the confirmed frames, and keeps the one with the best mean correlation. If none fits,
+        the confirmed frames are dropped and the calibration starts again.
+        """
+
+        best = None
+        for scale in SCALES:
+            for stroke in sorted({max(1, round(factor * scale)) for factor in STROKES}):
+                heights = []
+                widths = []
+                for mask, text_index in self.confirmed:
+                    box = self.text_box(mask)
+                    rendered = self.text_box(self.render(self.native_subtitles[text_index], scale, stroke) > 0)
+                    heights.append(box[3] / rendered[3])
+                    widths.append(box[2] / rendered[2])
+                if abs(statistics.median(heights) - 1) > HEIGHT_TOLERANCE:
+                    continue
+                # the font of the video is usually wider or narrower than the rendered one
+                self.set_font(scale, statistics.median(widths), stroke)
+                score = statistics.mean(self.correlation(self.prepare(mask), text_index)
+                                        for mask, text_index in self.confirmed)
+                if best is None or score > best[0]:
+                    best = [score, scale, self.stretch, stroke]
+
+        if best is not None:
+            self.set_font(*best[1:])
+        self.confirmed = []
+
+    def prepare(self, mask):
+        """ Cuts the mask to the bounding box of the text and blurs it
+
+        Args:
+            mask (numpy.ndarray): Text mask
+        Returns:
+            mask (numpy.ndarray): float32 blurred text, None if there is no text
+        """
+
+        box = self.text_box(mask)
+        if box is None:
+            return None
+        x, y, w, h = box
+        mask = (mask[y:y + h, x:x + w] > 0).astype(np.float32)
+        return cv.GaussianBlur(mask, (0, 0), self.sigma)
+
+    def template(self, text_index):
+        """ Returns the rendered subtitle. Only the templates of the current and the next subtitle are kept. """
+
+        if text_index not in self.templates:
+            for index in list(self.templates):
+                if index < text_index - 1:
+                    del self.templates[index]
+            template = self.render(self.native_subtitles[text_index], self.scale, self.stroke)
+            width = max(1, round(template.shape[1] * self.stretch))
+            template = cv.resize(template, (width, template.shape[0]), interpolation=cv.INTER_LINEAR)
+            self.templates[text_index] = self.prepare(template)
+        return self.templates[text_index]
+
+    def correlation(self, text, text_index):
+        """ Finds the best normalized cross-correlation of the rendered subtitle and the text of the region,
+        centered on each other and shifted by up to slack pixels
+
+        Args:
+            text (numpy.ndarray): Prepared text mask of the region (see "prepare()")
+            text_index (int): Index of the compared subtitle
+        """
+
+        template = self.template(text_index)
+        height = max(text.shape[0], template.shape[0])
+        width = max(text.shape[1], template.shape[1])
+        template = pad(template, height, width, 0)
+        text = pad(text, height, width, self.slack)
+        result = cv.matchTemplate(text, template, cv.TM_CCOEFF_NORMED)
+        return float(result.max())
+
+    def classify(self, roi, text_index):
+        """ Decides which subtitle the region contains
+
+        Args:
+            roi (numpy.ndarray): Cropped part of the frame
+            text_index (int): Index of the current subtitle
+        Returns:
+            text_index (int): Index of the current or the next subtitle, NO_TEXT for region without text,
+                None if it is not clear (OCR is needed)
+        """
+
+        mask = refine.text_mask(roi, self.threshold)
+        if self.text_box(mask) is None:
+            return NO_TEXT
+        if self.scale is None:
+            return None
+
+        text = self.prepare(mask)
+        candidates = [index for index in [text_index, text_index + 1] if index < len(self.native_subtitles)]
+        scores = [self.correlation(text, index) for index in candidates]
+        best = int(np.argmax(scores))
+        if scores[best] < self.accept:
+            return None
+        if len(scores) == 2 and abs(scores[0] - scores[1]) < self.margin:
+            return None
+        return candidates[best]
+
+    def ocr_text(self, text_index):
+        """ Returns the subtitle in the format of the OCR result (the first element is the whole text)
+
+        Args:
+            text_index (int): Index of the subtitle, or NO_TEXT
+        """
+
+        if text_index == NO_TEXT:
+            return []
+        text = self.native_subtitles[text_index]
+        return [text] + text.split()
@@ -0,0 +1,69 @@
+import numpy as np
+import batch_processing
+import process_images as pi
+import create_srt
+
+PARAMETERS = {"par1": 200, "par2": 230, "mode": 1, "kernel": [2, 2], "angle": 0}
+
+
+def test_empty_batch_is_processed():
+    batch = batch_processing.FrameBatch(4, (40, 120, 3))
+
+    assert batch.grayscale().shape == (0, 40, 120)
+    assert batch.process(PARAMETERS).shape == (0, 40, 120)
+
+
+def test_frames_that_fill_the_batches_exactly(synthetic_video, fake_ocr):
+    # 337 frames, every second one is sampled: 169 = 13 full batches of 13, the last batch is empty
+    frame_info = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], batch_size=13)
+    single = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"])
+
+    assert [info[2:] for info in frame_info] == [info[2:] for info in single]
+    assert np.allclose([info[:2] for info in frame_info], [info[:2] for info in single])
+
+
+def regions(count, color=True):
+    random = np.random.default_rng(1)
+    images = random.integers(0, 120, (count, 40, 120, 3), dtype=np.uint8)
+    images[:, 15:25, 10:100] = random.integers(180, 256, (count, 10, 90, 3), dtype=np.uint8)
+    return images if color else images[..., 0].copy()
+
+
+def test_batch_is_the_same_as_apply_parameters():
+    for color in [True, False]:
+        images = regions(3, color)
+        for par1 in [200, None]:
+            for mode in [1, 2, None]:
+                for angle in [0, 1.5]:
+                    parameters = {"par1": par1, "par2": 230, "mode": mode, "kernel": [3, 2], "angle": angle}
+                    batch = batch_processing.FrameBatch(4, images.shape[1:])
+                    for image in images:
+                        batch.add(image, None)
+
+                    expected = [pi.apply_parameters(image, parameters) for image in images]
+                    assert np.array_equal(batch.process(parameters), expected), parameters
+
+
+def test_empty_regions_are_skipped_the_same_way_in_both_paths(synthetic_video, fake_ocr):
+    calls = {}
+    for skip_empty in [False, True]:
+        for batch_size in [None, 8]:
+            fake_ocr.calls = 0
+            create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], batch_size=batch_size,
+                            skip_empty=skip_empty)
+            calls[skip_empty, batch_size] = fake_ocr.calls
+
+    assert calls[False, None] == calls[False, 8]
+    assert calls[True, None] == calls[True, 8]
+    assert calls[True, None] < calls[False, None]
+
+
+def test_has_text_of_one_region_is_the_same_as_of_the_batch():
+    images = regions(3)
+    images[1] = 30
+    batch = batch_processing.FrameBatch(3, images.shape[1:])
+    for image in images:
+        batch.add(image, None)
+    batch.grayscale()
+
+    assert list(batch.has_text()) == [batch_processing.has_text(image) for image in images] == [True, False, True]
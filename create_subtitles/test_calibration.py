@@ -0,0 +1,68 @@
+import os
+import calibration
+import create_srt
+import detect_words as det
+from conftest import CUES, SIZE
+
+
+class ThresholdOcr:
+    """ OCR, that reads the first subtitle fully only with the threshold 180, and a part of it from the raw crop """
+
+    def __init__(self):
+        self.shapes = []
+
+    def __call__(self, roi, parameters=None):
+        self.shapes.append(roi.shape)
+        words = CUES[0].split()
+        if parameters is None:
+            words = words[:2]
+        elif parameters["par1"] != 180:
+            return []
+        return [" ".join(words)] + words
+
+
+def test_calibration_selects_the_parameters_the_ocr_agrees_with(synthetic_video, monkeypatch):
+    ocr = ThresholdOcr()
+    monkeypatch.setattr(det, "ocr_roi", ocr)
+    subtitles, native_subtitles = create_srt.load_subtitles(synthetic_video["subtitles"])
+
+    parameters = calibration.calibrate(synthetic_video["video"], subtitles, samples=8)
+
+    assert parameters == {"par1": 180, "par2": 255, "mode": None, "kernel": [2, 2], "angle": 0}
+
+
+def test_calibration_uses_the_region_of_the_track(synthetic_video, monkeypatch):
+    ocr = ThresholdOcr()
+    monkeypatch.setattr(det, "ocr_roi", ocr)
+    subtitles, native_subtitles = create_srt.load_subtitles(synthetic_video["subtitles"])
+
+    calibration.calibrate(synthetic_video["video"], subtitles, samples=4, roi=det.TOP_ROI)
+
+    x, y, w, h = det.roi_box([SIZE[1], SIZE[0]], det.TOP_ROI)
+    assert set(ocr.shapes) == {(h, w, 3)}
+
+
+def test_cached_calibration_is_invalidated_by_a_change(synthetic_video, monkeypatch):
+    ocr = ThresholdOcr()
+    monkeypatch.setattr(det, "ocr_roi", ocr)
+    subtitles, native_subtitles = create_srt.load_subtitles(synthetic_video["subtitles"])
+    video = synthetic_video["video"]
+
+    parameters = calibration.load_or_calibrate(video, subtitles, samples=4)
+    assert os.path.exists(calibration.calibration_path(video))
+    calls = len(ocr.shapes)
+    assert calibration.load_or_calibrate(video, subtitles, samples=4) == parameters
+    assert len(ocr.shapes) == calls
+
+    # another region
+    calibration.load_or_calibrate(video, subtitles, samples=4, roi=det.TOP_ROI)
+    assert len(ocr.shapes) > calls
+    calls = len(ocr.shapes)
+    calibration.load_or_calibrate(video, subtitles, samples=4, roi=det.TOP_ROI)
+    assert len(ocr.shapes) == calls
+
+    # the video changed
+    stat = os.stat(video)
+    os.utime(video, (stat.st_atime, stat.st_mtime + 10))
+    calibration.load_or_calibrate(video, subtitles, samples=4, roi=det.TOP_ROI)
+    assert len(ocr.shapes) > calls
@@ -0,0 +1,57 @@
+import os
+import sys
+import subprocess
+import pytest
+import cli
+import detect_words as det
+
+
+def test_run_arguments_are_parsed():
+    args = cli.parse_args(["run", "film.mp4", "subtitles.txt", "--refine", "--batch-size", "8",
+                           "--decoder", "ffmpeg", "--decode-scale", "0.5"])
+
+    assert args.function is cli.run
+    assert [args.video, args.subtitles, args.roi] == ["film.mp4", "subtitles.txt", "bottom"]
+    assert args.refine and not args.stream
+    assert [args.batch_size, args.decoder, args.decode_scale, args.requests_per_minute] == [8, "ffmpeg", 0.5, 1800]
+
+
+def test_tracks_and_subcommands_are_parsed():
+    args = cli.parse_args(["run", "film.mp4", "--track", "bottom", "german.txt", "--track", "top", "english.txt"])
+    assert args.subtitles is None
+    assert args.track == [["bottom", "german.txt"], ["top", "english.txt"]]
+
+    args = cli.parse_args(["watch", "inbox", "outbox", "--workers", "4", "--requests-per-minute", "600"])
+    assert args.function is cli.watch
+    assert [args.workers, args.requests_per_minute, args.stop_when_idle] == [4, 600, False]
+
+    with pytest.raises(SystemExit):
+        cli.parse_args(["run", "film.mp4", "--decoder", "gstreamer"])
+    with pytest.raises(SystemExit):
+        cli.parse_args([])
+
+
+def test_regions_are_parsed():
+    assert cli.parse_roi("bottom") is None
+    assert cli.parse_roi("top") == det.TOP_ROI
+    assert cli.parse_roi("0.1,0.8,0.8,0.15") == [0.1, 0.8, 0.8, 0.15]
+
+
+@pytest.mark.parametrize("value", ["middle", "0.1,0.8,0.8", "0.1,0.8,0.8,0.15,1", "0.1,x,0.8,0.15", ""])
+def test_malformed_region_is_an_error(value):
+    with pytest.raises(ValueError):
+        cli.parse_roi(value)
+
+
+def test_run_without_subtitles_fails(capsys):
+    assert cli.main(["run", "film.mp4"]) == 2
+    assert "subtitles" in capsys.readouterr().err
+
+
+def test_cli_does_not_import_the_pipeline():
+    code = ("import sys, cli; cli.parse_args(['recover', 'recovery_file.txt', 'subtitles.txt']); "
+            "print(sorted(name for name in ['cv2', 'google.cloud', 'numpy'] if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(cli.__file__)))
+
+    assert result.stdout.strip() == "[]"
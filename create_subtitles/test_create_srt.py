@@ -0,0 +1,43 @@
+import os
+import create_srt
+import recovery
+from conftest import timing_errors
+
+
+def test_main_finds_all_subtitles(synthetic_video, fake_ocr):
+    frame_info = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"])
+
+    # the last subtitle is never compared (there is no next one to tell its end), so it is not written
+    assert [info[2] for info in frame_info] == list(range(len(synthetic_video["cues"]) - 1))
+    # frames are sampled with STRIDE, so the times are at most two frames off
+    assert max(timing_errors(frame_info)) < 0.081
+
+
+def test_options_object_and_keyword_options_are_the_same(synthetic_video, fake_ocr):
+    options = create_srt.Options(refine_timing=True)
+    from_object = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], options=options)
+    from_keywords = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], refine_timing=True)
+
+    assert from_object == from_keywords
+    # the end is the last frame with the subtitle, one frame before the real end
+    assert max(timing_errors(from_object)) < 0.041
+
+
+def test_keyword_options_override_the_options_object():
+    options = create_srt.Options(batch_size=4, fuzzy=True)
+    combined = create_srt.get_options(options, {"batch_size": 8})
+
+    assert combined.batch_size == 8
+    assert combined.fuzzy
+    assert options.batch_size == 4
+
+
+def test_frames_are_not_saved_and_their_names_keep_the_index(synthetic_video, fake_ocr):
+    create_srt.main(synthetic_video["video"], synthetic_video["subtitles"])
+
+    assert not os.path.exists("frames_from_video")
+    with open("subtitles/recovery_file.txt", "r", encoding="utf8") as file:
+        names = [line.split("|")[2] for line in file if line.strip() != ""]
+    indexes = [recovery.frame_number(name) for name in names]
+    assert len(indexes) != 0 and indexes == sorted(indexes)
+    assert all([frame_index % create_srt.STRIDE == 0 for frame_index in indexes])
@@ -0,0 +1,32 @@
+import os
+import cv2 as cv
+import numpy as np
+import detect_words as det
+from conftest import CUES, SIZE, marker_value
+
+
+def frame_with_marker(index):
+    width, height = SIZE
+    x, y, w, h = det.roi_box([height, width])
+    frame = np.full((height, width, 3), 50, np.uint8)
+    frame[y + 2:y + 9, x + 2:x + 9] = marker_value(index)
+    return frame
+
+
+def test_ocr_of_an_image_file(tmp_path, monkeypatch, fake_ocr):
+    # ocr() used to pass its index to crop_image(), which does not take it, so every call failed
+    monkeypatch.chdir(tmp_path)
+    cv.imwrite("frame.png", frame_with_marker(2))
+
+    assert det.ocr("frame.png", 5) == [CUES[2]] + CUES[2].split()
+    assert fake_ocr.calls == 1
+
+
+def test_crop_image_saves_the_region(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cv.imwrite("frame.png", frame_with_marker(0))
+    x, y, w, h = det.roi_box([SIZE[1], SIZE[0]])
+
+    assert det.crop_image("frame.png") == "temp/box_roi.png"
+    assert os.path.exists("temp/box_roi.png")
+    assert cv.imread("temp/box_roi.png").shape == (h, w, 3)
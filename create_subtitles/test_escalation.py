@@ -0,0 +1,53 @@
+import numpy as np
+import detect_words as det
+import escalation
+
+# similarity of the OCR texts to the current subtitle
+SCORES = {"unclear": 45, "clear": 100, "credits": 10}
+
+
+class ScoredMatcher:
+    text_index = 0
+
+    def score(self, ocr_text, text_index=None):
+        return SCORES[ocr_text[0]]
+
+
+def tiered_ocr(monkeypatch, tier_text, **arguments):
+    """ TieredOcr with the tiers marking the region, the OCR of a marked region returns tier_text """
+
+    tiers = [[name, lambda roi, value=value: np.full_like(roi, value)]
+             for value, name in enumerate(["denoise", "thicken", "deskew"], start=1)]
+    monkeypatch.setattr(det, "ocr_roi", lambda roi, parameters=None: [tier_text[roi.flat[0]]])
+    return escalation.TieredOcr(tiers, **arguments)
+
+
+def test_unclear_frame_is_escalated_until_it_is_clear(monkeypatch):
+    tiers = tiered_ocr(monkeypatch, {1: "unclear", 2: "clear", 3: "clear"})
+
+    assert tiers.ocr(np.zeros((4, 4), np.uint8), ScoredMatcher(), ocr_text=["unclear"]) == ["clear"]
+    assert tiers.escalated == {"denoise": 1, "thicken": 1, "deskew": 0}
+
+
+def test_tier_that_makes_the_text_different_is_not_trusted(monkeypatch):
+    tiers = tiered_ocr(monkeypatch, {1: "credits", 2: "credits", 3: "credits"})
+
+    assert tiers.ocr(np.zeros((4, 4), np.uint8), ScoredMatcher(), ocr_text=["unclear"]) == ["unclear"]
+    assert tiers.escalated == {"denoise": 1, "thicken": 1, "deskew": 1}
+
+
+def test_text_far_from_the_acceptable_value_is_not_escalated(monkeypatch):
+    tiers = tiered_ocr(monkeypatch, {1: "clear", 2: "clear", 3: "clear"})
+
+    assert tiers.ocr(np.zeros((4, 4), np.uint8), ScoredMatcher(), ocr_text=["credits"]) == ["credits"]
+    assert tiers.ocr(np.zeros((4, 4), np.uint8), ScoredMatcher(), ocr_text=["clear"]) == ["clear"]
+    assert sum(tiers.escalated.values()) == 0
+
+
+def test_escalations_are_capped(monkeypatch):
+    tiers = tiered_ocr(monkeypatch, {1: "unclear", 2: "unclear", 3: "unclear"}, max_escalations=2)
+    for i in range(5):
+        tiers.ocr(np.zeros((4, 4), np.uint8), ScoredMatcher(), ocr_text=["unclear"])
+
+    assert tiers.escalated == {"denoise": 2, "thicken": 2, "deskew": 2}
+    assert tiers.summary().endswith("3 unclear frames over the limit")
@@ -0,0 +1,84 @@
+import shutil
+import cv2 as cv
+import numpy as np
+import pytest
+import create_srt
+import detect_words as det
+import ffmpeg_decoder
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which(ffmpeg_decoder.FFMPEG) is None
+                                  or shutil.which(ffmpeg_decoder.FFPROBE) is None,
+                                  reason="ffmpeg and ffprobe are not on PATH")
+
+
+def test_even_box_is_widened_not_cut():
+    assert ffmpeg_decoder.even_box([21, 126, 277, 39], [180, 320]) == [21, 126, 278, 40]
+    # at the edge of the frame the box is moved back
+    assert ffmpeg_decoder.even_box([43, 141, 277, 39], [180, 320]) == [42, 140, 278, 40]
+
+
+@needs_ffmpeg
+def test_regions_are_the_same_as_from_opencv(synthetic_video):
+    # odd width and height of the region
+    roi = [0.1, 0.7, 0.81, 0.21]
+    video = cv.VideoCapture(synthetic_video["video"])
+    frames = []
+    for frame_index in range(6):
+        ret, frame = video.read()
+        if frame_index % 2 == 0:
+            frames.append(cv.cvtColor(det.crop_roi(frame, roi), cv.COLOR_BGR2GRAY))
+    video.release()
+
+    with ffmpeg_decoder.FfmpegDecoder(synthetic_video["video"], [[roi, None]], 2) as decoder:
+        for (frame_index, strip, time), expected in zip(decoder.read_frames(), frames):
+            region = decoder.crop(strip, roi)
+            assert region.shape == expected.shape
+            assert np.abs(region.astype(int) - expected).mean() < 2
+
+
+@needs_ffmpeg
+def test_scaled_regions_have_the_scaled_size(synthetic_video):
+    x, y, w, h = det.roi_box([180, 320], None)
+
+    with ffmpeg_decoder.FfmpegDecoder(synthetic_video["video"], [[None, None]], 2, scale=0.5) as decoder:
+        frame_index, strip, time = next(decoder.read_frames())
+        region = decoder.crop(strip)
+        assert abs(region.shape[0] - h / 2) <= 1 and abs(region.shape[1] - w / 2) <= 1
+
+
+def test_decode_scale_needs_the_ffmpeg_decoder(synthetic_video, fake_ocr):
+    with pytest.raises(ValueError):
+        create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], decode_scale=0.5)
+    assert fake_ocr.calls == 0
+
+
+@needs_ffmpeg
+def test_close_stops_ffmpeg(synthetic_video):
+    decoder = ffmpeg_decoder.FfmpegDecoder(synthetic_video["video"], [[None, None]], 2)
+    next(decoder.read_frames())
+    decoder.close()
+
+    assert decoder.process.poll() is not None
+
+
+@needs_ffmpeg
+def test_ffmpeg_is_stopped_when_the_run_fails(synthetic_video, monkeypatch):
+    decoders = []
+    original = ffmpeg_decoder.FfmpegDecoder
+
+    def decoder(*args):
+        decoders.append(original(*args))
+        return decoders[-1]
+
+    def failing(content):
+        raise RuntimeError("OCR failed")
+
+    monkeypatch.setattr(ffmpeg_decoder, "FfmpegDecoder", decoder)
+    previous_backend = det.backend
+    det.set_backend(failing)
+    try:
+        with pytest.raises(RuntimeError):
+            create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], decoder="ffmpeg")
+    finally:
+        det.set_backend(previous_backend)
+    assert decoders[0].process.poll() is not None
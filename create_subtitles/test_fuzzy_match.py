@@ -0,0 +1,45 @@
+import random
+import fuzzy_match
+
+
+def levenshtein(a, b):
+    """ Textbook dynamic programming, the reference for Myers' algorithm """
+
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        previous, row[0] = row[0], i
+        for j, char_b in enumerate(b, start=1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (char_a != char_b))
+    return row[-1]
+
+
+def test_distance_is_the_same_as_levenshtein():
+    random_words = random.Random(7)
+    for i in range(2000):
+        # words longer than 64 characters do not fit one machine word
+        word = "".join(random_words.choices("abcd", k=random_words.randint(0, 70)))
+        text = "".join(random_words.choices("abcd", k=random_words.randint(0, 70)))
+        assert fuzzy_match.edit_distance(fuzzy_match.pattern(word), text) == levenshtein(word, text), (word, text)
+
+
+def test_known_distances():
+    assert fuzzy_match.edit_distance(fuzzy_match.pattern("modern"), "rnodern") == 2
+    assert fuzzy_match.edit_distance(fuzzy_match.pattern("kitten"), "sitting") == 3
+    assert fuzzy_match.edit_distance(fuzzy_match.pattern(""), "abc") == 3
+
+
+def test_misread_long_word_matches_short_word_only_exactly():
+    index = fuzzy_match.FuzzyIndex([["The", "modern", "world."]])
+
+    assert index.find("modern", ["the", "rnodern", "world"]) == 1
+    assert index.find("the", ["tha", "rnodern"]) is None
+    assert index.find("world", ["wor1d", "world"]) == 1
+
+
+def test_closest_ocr_word_is_removed():
+    index = fuzzy_match.FuzzyIndex([["subtitles"]])
+    ocr_words = ["sobtitlez", "subtitle", "other"]
+
+    assert index.remove_match("subtitles", ocr_words)
+    assert ocr_words == ["sobtitlez", "other"]
+    assert not index.remove_match("subtitles", ["different"])
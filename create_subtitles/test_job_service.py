@@ -0,0 +1,116 @@
+import os
+import multiprocessing
+import pytest
+import create_srt
+import job_service
+import rate_limiter
+from conftest import timing_errors
+
+needs_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason="the local workers have to inherit the fake OCR backend")
+
+
+class FlakyCoordinator:
+    """ Answers of the coordinator, OSError for the failed requests """
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.requests = []
+
+    def __call__(self, url, body):
+        self.requests.append(url.rsplit("/", 1)[1])
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 0)
+
+
+def test_worker_retries_until_the_coordinator_says_done(monkeypatch, no_backoff):
+    task = {"task_id": 0}
+    coordinator = FlakyCoordinator([ConnectionRefusedError(), {"task": task, "done": False}, TimeoutError(),
+                                    {}, OSError(), {"task": None, "done": True}])
+    monkeypatch.setattr(job_service, "post", coordinator)
+    monkeypatch.setattr(job_service, "process_segment", lambda task: [[], None])
+
+    job_service.run_worker("http://coordinator", poll_interval=0)
+
+    assert coordinator.requests == ["task", "task", "result", "result", "task", "task"]
+
+
+def test_worker_gives_up_when_the_coordinator_does_not_answer(monkeypatch, no_backoff):
+    monkeypatch.setattr(job_service, "post", FlakyCoordinator([OSError()] * 3))
+
+    with pytest.raises(ConnectionError):
+        job_service.run_worker("http://coordinator", retry_timeout=0)
+
+
+# OCR usage of one request
+USAGE = {"calls": 1, "images": 1, "bytes": 100, "cost": 0.0015}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_expired_lease_is_handed_out_again(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_service.time, "monotonic", clock.monotonic)
+    coordinator = job_service.Coordinator("video.avi", 50, segment_frames=20, lease_timeout=10)
+
+    first, done = coordinator.next_task()
+    second, done = coordinator.next_task()
+    clock.now = 5
+    coordinator.add_result(second["task_id"], [[20, [], "frame20", 0, 0]])
+    clock.now = 11
+    # the first segment was not finished in time, it goes before the segments that were never handed out
+    assert coordinator.next_task()[0]["task_id"] == first["task_id"]
+    assert coordinator.next_task()[0]["task_id"] == 2
+    assert coordinator.next_task() == (None, False)
+
+
+def test_late_result_of_a_requeued_segment_is_ignored(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_service.time, "monotonic", clock.monotonic)
+    coordinator = job_service.Coordinator("video.avi", 20, segment_frames=20, lease_timeout=10)
+
+    task, done = coordinator.next_task()
+    clock.now = 11
+    assert coordinator.next_task()[0]["task_id"] == task["task_id"]
+    coordinator.add_result(task["task_id"], [[0, ["late"], "frame0", 0, 0]], USAGE)
+    coordinator.add_result(task["task_id"], [[0, ["again"], "frame0", 0, 0]], USAGE)
+
+    assert coordinator.records() == [[0, ["late"], "frame0", 0, 0]]
+    assert coordinator.next_task() == (None, True)
+    assert coordinator.usage.job["calls"] == 2
+
+
+@needs_fork
+def test_segments_processed_by_local_workers_are_the_same_as_one_run(synthetic_video, fake_ocr):
+    frame_info = job_service.run_coordinator(synthetic_video["video"], synthetic_video["subtitles"], port=0,
+                                             segment_frames=60, local_workers=2, poll_interval=0.05)
+    single = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"])
+
+    assert [info[2] for info in frame_info] == [info[2] for info in single]
+    assert max(timing_errors(frame_info)) < 0.081
+
+
+def crash(task):
+    os._exit(1)
+
+
+@needs_fork
+def test_coordinator_fails_when_the_local_workers_keep_dying(synthetic_video, fake_ocr, monkeypatch):
+    monkeypatch.setattr(job_service, "process_segment", crash)
+
+    with pytest.raises(RuntimeError, match="All local workers died"):
+        job_service.run_coordinator(synthetic_video["video"], synthetic_video["subtitles"], port=0,
+                                    lease_timeout=0, local_workers=1, poll_interval=0.05)
@@ -0,0 +1,101 @@
+import os
+import pytest
+import create_srt
+import detect_words as det
+import ocr_accounting
+import rate_limiter
+import roi_cache
+import timestamp_index
+
+
+def fast_limiter():
+    return rate_limiter.TokenBucket(60000, burst=100)
+
+
+def test_retries_are_counted_as_calls(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 0)
+    limiter = fast_limiter()
+    failures = [rate_limiter.TransientError("quota"), rate_limiter.TransientError("quota")]
+
+    def request(content):
+        if len(failures) != 0:
+            raise failures.pop()
+        return ["text", "text"]
+
+    usage = ocr_accounting.OcrUsage(None)
+    accounting = ocr_accounting.AccountingBackend(
+        lambda content: rate_limiter.call_with_retry(request, content, limiter=limiter), usage)
+
+    assert accounting(b"image") == ["text", "text"]
+    assert usage.run["calls"] == 3
+    assert usage.run["images"] == 1
+    assert usage.run["cost"] == usage.price_per_image
+
+
+def test_failed_call_is_counted_but_not_paid():
+    def request(content):
+        raise ValueError("bad image")
+
+    usage = ocr_accounting.OcrUsage(None)
+    accounting = ocr_accounting.AccountingBackend(
+        lambda content: rate_limiter.call_with_retry(request, content, limiter=fast_limiter()), usage)
+
+    with pytest.raises(ValueError):
+        accounting(b"image")
+    assert usage.run["calls"] == 1
+    assert usage.run["images"] == 0
+    assert usage.run["cost"] == 0
+
+
+def test_budget_is_checked_before_every_call():
+    usage = ocr_accounting.OcrUsage(None)
+    accounting = ocr_accounting.AccountingBackend(lambda content: ["text", "text"], usage)
+    budget = ocr_accounting.Budget(accounting, 3 * usage.price_per_image)
+
+    results = [accounting(b"image") for i in range(5)]
+
+    assert results == [["text", "text"]] * 3 + [[], []]
+    assert usage.job["cost"] <= budget.limit
+    assert budget.exhausted
+    assert not budget.sample(0)
+
+
+def test_budget_switches_to_the_local_engine():
+    usage = ocr_accounting.OcrUsage(None)
+    accounting = ocr_accounting.AccountingBackend(lambda content: ["paid"], usage)
+    ocr_accounting.Budget(accounting, usage.price_per_image, lambda content: ["local"])
+
+    assert [accounting(b"image") for i in range(3)] == [["paid"], ["local"], ["local"]]
+    assert usage.job["images"] == 3
+    assert usage.job["cost"] == usage.price_per_image
+
+
+def test_video_is_not_decoded_after_the_budget_is_spent(synthetic_video, fake_ocr, monkeypatch):
+    decoded = []
+    read_frames = create_srt.read_frames
+
+    def counted_frames(*args, **kwargs):
+        for frame_index, frame, time in read_frames(*args, **kwargs):
+            decoded.append(frame_index)
+            yield frame_index, frame, time
+
+    monkeypatch.setattr(create_srt, "read_frames", counted_frames)
+    budget = 5 * ocr_accounting.PRICE_PER_1000_IMAGES / 1000
+    create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], budget=budget, use_cache=True)
+
+    assert fake_ocr.calls == 5
+    assert len(decoded) < 20
+    # the cache and the index of a part of the video are not kept
+    assert roi_cache.open_cache(synthetic_video["video"], [[None, None]], create_srt.STRIDE) is None
+    assert not os.path.exists(timestamp_index.index_path(synthetic_video["video"]))
+    assert os.path.exists("subtitles/Finished_subtitles.srt")
+
+
+def test_backend_is_restored_when_the_run_fails(synthetic_video, fake_ocr):
+    def failing(content):
+        raise RuntimeError("OCR failed")
+
+    det.set_backend(failing)
+    with pytest.raises(RuntimeError):
+        create_srt.main(synthetic_video["video"], synthetic_video["subtitles"])
+    assert det.backend is failing
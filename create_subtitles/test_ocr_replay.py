@@ -0,0 +1,58 @@
+import cv2 as cv
+import numpy as np
+import pytest
+import ocr_replay
+
+
+def encode(value, extension=".png", params=()):
+    """ Encoded image filled with the value """
+
+    ok, content = cv.imencode(extension, np.full((8, 16), value, np.uint8), list(params))
+    return content.tobytes()
+
+
+def brightness(content):
+    return int(cv.imdecode(np.frombuffer(content, np.uint8), cv.IMREAD_GRAYSCALE)[0, 0])
+
+
+def test_recorded_responses_are_replayed(tmp_path):
+    fixture_path = str(tmp_path / "ocr_responses.json")
+    recording = ocr_replay.RecordingBackend(fixture_path, lambda content: [str(brightness(content)), "word"])
+    assert recording(encode(10)) == ["10", "word"]
+    recording(encode(20))
+    recording.save()
+
+    replay = ocr_replay.ReplayBackend(fixture_path)
+    assert replay(encode(10)) == ["10", "word"]
+    assert replay(encode(20)) == ["20", "word"]
+
+
+def test_recording_keeps_the_existing_responses(tmp_path):
+    fixture_path = str(tmp_path / "ocr_responses.json")
+    recording = ocr_replay.RecordingBackend(fixture_path, lambda content: ["old"])
+    recording(encode(10))
+    recording.save()
+    recording = ocr_replay.RecordingBackend(fixture_path, lambda content: ["new"])
+    recording(encode(20))
+    recording.save()
+
+    replay = ocr_replay.ReplayBackend(fixture_path)
+    assert [replay(encode(10)), replay(encode(20))] == [["old"], ["new"]]
+
+
+def test_key_depends_on_the_pixels_not_on_the_encoding():
+    key = ocr_replay.image_key(encode(10))
+
+    assert ocr_replay.image_key(encode(10, params=[cv.IMWRITE_PNG_COMPRESSION, 9])) == key
+    assert ocr_replay.image_key(encode(10, ".bmp")) == key
+    assert ocr_replay.image_key(encode(11)) != key
+    # the same pixels in another shape
+    ok, content = cv.imencode(".png", np.full((16, 8), 10, np.uint8))
+    assert ocr_replay.image_key(content.tobytes()) != key
+
+
+def test_image_that_was_not_recorded_is_an_error(tmp_path):
+    replay = ocr_replay.ReplayBackend(str(tmp_path / "missing.json"))
+
+    with pytest.raises(KeyError):
+        replay(encode(10))
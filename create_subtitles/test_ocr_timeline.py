@@ -0,0 +1,50 @@
+import os
+import ocr_timeline
+
+FRAMES = [[["first", "line"], [1, 0], 24], [["first", "line"], [1, 80000], 26], [["first", "line"], [1, 160000], 28],
+          [["a|b"], [1, 240000], 30], [["first", "line"], [1, 320000], 32]]
+
+
+def write_timeline(path, frames=FRAMES):
+    writer = ocr_timeline.TimelineWriter(path)
+    for tokens, time, frame_index in frames:
+        writer.add(tokens, time, frame_index)
+    return writer
+
+
+def test_frames_with_the_same_text_are_one_span(tmp_path):
+    path = str(tmp_path / "recovery_file_timeline.txt")
+    write_timeline(path).close()
+
+    assert ocr_timeline.load_timeline(path) == [
+        [24, 28, 3, [1.0, 0.0], [1.0, 160000.0], ("first", "line")],
+        [30, 30, 1, [1.0, 240000.0], [1.0, 240000.0], ("a|b",)],
+        [32, 32, 1, [1.0, 320000.0], [1.0, 320000.0], ("first", "line")]]
+
+
+def test_unfinished_timeline_is_not_loaded(tmp_path):
+    path = str(tmp_path / "recovery_file_timeline.txt")
+    write_timeline(path).close()
+    writer = write_timeline(path)
+
+    # the new run removed the old timeline, its own is complete only after close()
+    assert ocr_timeline.load_timeline(path) is None
+    writer.close()
+    assert len(ocr_timeline.load_timeline(path)) == 3
+    assert not os.path.exists(path + ".part")
+
+
+def test_spans_of_the_recovery_file_are_the_same_as_of_the_writer(tmp_path):
+    path = str(tmp_path / "recovery_file_timeline.txt")
+    write_timeline(path).close()
+    lines = [[0, " ".join(tokens), f"frame{frame_index}.png", time[0], time[1]] for tokens, time, frame_index in FRAMES]
+
+    spans = ocr_timeline.compress(lines, lambda name: int(name[5:-4]))
+    assert spans == ocr_timeline.load_timeline(path)
+
+
+def test_frames_without_index_are_kept(tmp_path):
+    path = str(tmp_path / "recovery_file_timeline.txt")
+    write_timeline(path, [[["text"], [0, 40000], None]]).close()
+
+    assert ocr_timeline.load_timeline(path) == [[None, None, 1, [0.0, 40000.0], [0.0, 40000.0], ("text",)]]
@@ -0,0 +1,23 @@
+import cv2 as cv
+import numpy as np
+import pytest
+import process_images as pi
+
+
+def text_image(tilt):
+    image = np.full((100, 300, 3), 255, np.uint8)
+    cv.putText(image, "SOME SUBTITLE TEXT", (20, 55), cv.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    return pi.rotateImage(image, tilt)
+
+
+@pytest.mark.parametrize("tilt", [-3, 0, 3])
+def test_skew_angle_is_the_tilt_of_the_text(tilt):
+    assert pi.getSkewAngle(text_image(tilt), save_boxes=False) == pytest.approx(tilt, abs=0.5)
+
+
+@pytest.mark.parametrize("rect_angle, skew_angle", [(-90, 0), (-2, 2), (-88, -2), (90, 0), (88, 2), (2, -2)])
+def test_angles_of_old_and_new_opencv_are_the_same_skew(monkeypatch, rect_angle, skew_angle):
+    # the same boxes as OpenCV < 4.5 ([-90, 0)) and newer versions ((0, 90]) return them
+    monkeypatch.setattr(pi.cv, "minAreaRect", lambda contour: ((0, 0), (10, 200), rect_angle))
+
+    assert pi.getSkewAngle(text_image(0), save_boxes=False) == skew_angle
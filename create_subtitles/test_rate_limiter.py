@@ -0,0 +1,93 @@
+import pytest
+import rate_limiter
+
+
+class FakeClock:
+    """ time.monotonic() and time.sleep() of the limiter, sleeping moves the clock forward """
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_requests_are_spaced_by_the_rate(clock):
+    limiter = rate_limiter.TokenBucket(120)
+    for i in range(5):
+        limiter.acquire()
+
+    assert clock.now == pytest.approx(2.0)
+    assert clock.slept == pytest.approx([0.5] * 4)
+
+
+def test_burst_after_an_idle_period(clock):
+    limiter = rate_limiter.TokenBucket(60, burst=3)
+    clock.now = 100
+    for i in range(3):
+        limiter.acquire()
+    assert clock.slept == []
+
+    limiter.acquire()
+    assert clock.slept == pytest.approx([1.0])
+
+
+def test_penalized_bucket_waits_for_the_penalty(clock):
+    limiter = rate_limiter.TokenBucket(60)
+    limiter.acquire()
+    limiter.penalize(5)
+    limiter.acquire()
+
+    assert clock.now == pytest.approx(6.0)
+
+
+def test_set_rate_keeps_the_earned_tokens(clock):
+    limiter = rate_limiter.TokenBucket(60)
+    limiter.acquire()
+    clock.now = 0.5
+    limiter.set_rate(6)
+    limiter.acquire()
+
+    # half a token was earned at the old rate, the other half takes 5 s at the new one
+    assert clock.now == pytest.approx(5.5)
+
+
+def test_retryable_errors_are_repeated_and_counted(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 1)
+    answers = [rate_limiter.TransientError(), rate_limiter.TransientError(), "words"]
+
+    def flaky():
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    before = rate_limiter.requests_sent()
+    assert rate_limiter.call_with_retry(flaky, limiter=rate_limiter.TokenBucket(6000)) == "words"
+    assert rate_limiter.requests_sent() - before == 3
+
+
+def test_other_errors_and_the_last_retry_are_raised(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 0)
+
+    def fail(error):
+        raise error
+
+    with pytest.raises(ValueError):
+        rate_limiter.call_with_retry(fail, ValueError(), limiter=rate_limiter.TokenBucket(6000))
+    with pytest.raises(rate_limiter.TransientError):
+        rate_limiter.call_with_retry(fail, rate_limiter.TransientError(), limiter=rate_limiter.TokenBucket(6000),
+                                     max_retries=2)
@@ -0,0 +1,50 @@
+import cv2 as cv
+import refine
+from conftest import FPS, TIMES
+
+original_capture = cv.VideoCapture
+
+
+class CountingCapture:
+    """ cv2.VideoCapture, that counts the read frames """
+
+    reads = 0
+
+    def __init__(self, path):
+        self.video = original_capture(path)
+
+    def read(self):
+        CountingCapture.reads += 1
+        return self.video.read()
+
+    def __getattr__(self, name):
+        return getattr(self.video, name)
+
+
+def test_timing_is_refined_to_the_exact_frame(synthetic_video):
+    start, end = [round(time * FPS) for time in TIMES[2]]
+    # sampled every 4th frame: the subtitle was first seen 3 frames late and last seen 3 frames early
+    frame_info = [[[0, 0], [0, 0], 2, "", [start - 1, start + 3, end - 4, end]]]
+    refine.refine(synthetic_video["video"], frame_info)
+
+    assert frame_info[0][4][1:3] == [start, end - 1]
+    assert abs(frame_info[0][0][0] + frame_info[0][0][1] / 1000000 - TIMES[2][0]) < 1e-6
+
+
+def test_reading_stops_at_the_first_change(synthetic_video, monkeypatch):
+    monkeypatch.setattr(cv, "VideoCapture", CountingCapture)
+    CountingCapture.reads = 0
+    start, end = [round(time * FPS) for time in TIMES[0]]
+    # the next sampled frame is far after the end of the subtitle
+    frame_info = [[[0, 0], [0, 0], 0, "", [start - 1, start, end - 2, end + 200]]]
+    refine.refine(synthetic_video["video"], frame_info)
+
+    assert frame_info[0][4][2] == end - 1
+    assert CountingCapture.reads < 10
+
+
+def test_subtitles_without_frame_index_keep_their_times(synthetic_video):
+    frame_info = [[[1, 0], [2, 0], 0, "", [None, None, None, None]]]
+    refine.refine(synthetic_video["video"], frame_info)
+
+    assert frame_info == [[[1, 0], [2, 0], 0, "", [None, None, None, None]]]
@@ -0,0 +1,41 @@
+import os
+import shutil
+import detect_words as det
+import regression
+
+
+def test_shipped_cases_match_their_reference(tmp_path, monkeypatch):
+    # a copy, the bench writes the timestamp index next to the video
+    regression_dir = str(tmp_path / "regression")
+    shutil.copytree(regression.REGRESSION_DIR, regression_dir)
+    monkeypatch.chdir(tmp_path)
+    previous_backend = det.backend
+
+    assert "synthetic" in regression.find_cases(regression_dir)
+    assert regression.main(regression_dir)
+    assert det.backend is previous_backend
+
+
+def test_missing_or_empty_regression_dir_fails_without_a_crash(tmp_path):
+    os.makedirs(tmp_path / "empty" / "not_a_case")
+
+    assert not regression.main(str(tmp_path / "missing"))
+    assert not regression.main(str(tmp_path / "empty"))
+
+
+def test_image_missing_in_the_fixture_fails_the_case(tmp_path, monkeypatch, capsys):
+    regression_dir = str(tmp_path / "regression")
+    shutil.copytree(regression.REGRESSION_DIR, regression_dir)
+    with open(os.path.join(regression_dir, "synthetic", "ocr_responses.json"), "w", encoding="utf8") as file:
+        file.write("{}")
+    monkeypatch.chdir(tmp_path)
+
+    assert not regression.main(regression_dir)
+    assert "FAIL synthetic" in capsys.readouterr().out
+
+
+def test_produced_subtitles_are_paired_with_the_reference_by_content():
+    reference = os.path.join(regression.REGRESSION_DIR, "synthetic", "reference.srt")
+    errors, missing, extra = regression.timing_errors(reference, reference)
+
+    assert (max(errors), missing, extra) == (0, 0, 0)
@@ -0,0 +1,52 @@
+import os
+import pytest
+import create_srt
+import detect_words as det
+import roi_cache
+from conftest import SIZE
+
+PARAMETERS = {"par1": 200, "par2": 230, "mode": None, "kernel": [2, 2], "angle": 0}
+
+
+def test_cached_run_is_the_same_as_the_run_that_created_the_cache(synthetic_video, fake_ocr):
+    created = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], use_cache=True)
+    fake_ocr.calls = 0
+    cached = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], use_cache=True)
+
+    assert cached == created
+    assert [type(value) for value in cached[0][0]] == [type(value) for value in created[0][0]]
+    assert fake_ocr.calls != 0
+
+
+def test_only_the_regions_of_the_tracks_are_cached(synthetic_video, fake_ocr):
+    create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], use_cache=True)
+    rois_path, times_path, description_path = roi_cache.cache_paths(synthetic_video["video"])
+    x, y, w, h = det.roi_box([SIZE[1], SIZE[0]])
+
+    sampled = len(roi_cache.open_cache(synthetic_video["video"], [[None, None]], create_srt.STRIDE).times)
+    assert os.path.getsize(rois_path) == sampled * w * h * 3
+
+
+def test_binarized_regions_are_cached_in_grayscale(synthetic_video, fake_ocr):
+    expected = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], parameters=PARAMETERS)
+    create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], parameters=PARAMETERS, use_cache=True)
+    cached = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], parameters=PARAMETERS,
+                             use_cache=True)
+    cache = roi_cache.open_cache(synthetic_video["video"], [[None, None]], create_srt.STRIDE, gray=True)
+
+    assert cache.description["gray"]
+    assert [info[2:] for info in cached] == [info[2:] for info in expected]
+    # the raw crop needs the colors, the grayscale cache cannot be used
+    assert roi_cache.open_cache(synthetic_video["video"], [[None, None]], create_srt.STRIDE) is None
+
+
+def test_cache_without_the_region_of_a_track_is_not_used(synthetic_video, fake_ocr):
+    create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], use_cache=True)
+
+    assert roi_cache.open_cache(synthetic_video["video"], [[det.TOP_ROI, None]], create_srt.STRIDE) is None
+
+
+def test_cache_does_not_combine_with_stream(synthetic_video, fake_ocr):
+    with pytest.raises(ValueError):
+        create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], use_cache=True, stream=True)
+    assert fake_ocr.calls == 0
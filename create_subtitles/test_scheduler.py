@@ -0,0 +1,31 @@
+import pytest
+import create_srt
+import scheduler
+from conftest import timing_errors
+
+
+def test_reading_speed_is_the_median_of_the_matched_subtitles():
+    model = scheduler.ReadingSpeedModel(min_duration=1)
+    for text, duration in [["a" * 30, 2], ["b" * 20, 1], ["c" * 10, 10]]:
+        model.update(text, duration)
+
+    assert model.chars_per_second == 15
+    assert model.duration("d" * 45) == 3
+    assert model.duration("short") == 1
+
+
+def test_scheduled_run_needs_fewer_calls(synthetic_video, fake_ocr):
+    create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], refine_timing=True)
+    every_frame = fake_ocr.calls
+    fake_ocr.calls = 0
+    frame_info = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], schedule=True,
+                                 refine_timing=True)
+
+    assert fake_ocr.calls < every_frame * 0.75
+    assert [info[2] for info in frame_info] == list(range(len(synthetic_video["cues"]) - 1))
+    assert max(timing_errors(frame_info)) < 0.041
+
+
+def test_schedule_does_not_combine_with_batches(synthetic_video, fake_ocr):
+    with pytest.raises(ValueError):
+        create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], schedule=True, batch_size=8)
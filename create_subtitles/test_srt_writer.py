@@ -0,0 +1,41 @@
+import datetime
+import srt
+import srt_writer
+
+FRAME_INFO = [[[1, 40000], [2, 400000], 0, "first subtitle", 12],
+              [[3, 0], [4, 960000], 1, "second\nsubtitle", 20]]
+
+
+def read_srt(srt_path):
+    with open(srt_path, "r", encoding="utf8") as file:
+        return list(srt.parse(file.read()))
+
+
+def test_frame_info_is_written_as_srt(tmp_path):
+    srt_path = str(tmp_path / "out.srt")
+    srt_writer.write_srt(FRAME_INFO, srt_path)
+    subtitles = read_srt(srt_path)
+
+    assert [subtitle.index for subtitle in subtitles] == [1, 2]
+    assert subtitles[0].start == datetime.timedelta(seconds=1.04)
+    assert subtitles[1].end == datetime.timedelta(seconds=4.96)
+    assert [subtitle.content for subtitle in subtitles] == ["first subtitle", "second\nsubtitle"]
+
+
+def test_file_ends_with_a_complete_subtitle_after_every_write(tmp_path):
+    srt_path = str(tmp_path / "out.srt")
+    with srt_writer.SrtWriter(srt_path) as writer:
+        writer.write(FRAME_INFO[0])
+        # read while the writer is still open
+        assert [subtitle.content for subtitle in read_srt(srt_path)] == ["first subtitle"]
+        writer.write(FRAME_INFO[1])
+
+    assert len(read_srt(srt_path)) == 2
+
+
+def test_float_times_of_opencv(tmp_path):
+    srt_path = str(tmp_path / "out.srt")
+    srt_writer.write_srt([[[1.0, 40000.00000000001], [2.0, 399999.9999999999], 0, "text", 1]], srt_path)
+    subtitle = read_srt(srt_path)[0]
+
+    assert (subtitle.start, subtitle.end) == (datetime.timedelta(seconds=1.04), datetime.timedelta(seconds=2.4))
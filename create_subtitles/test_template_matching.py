@@ -0,0 +1,76 @@
+import cv2 as cv
+import numpy as np
+import create_srt
+import template_matching
+from conftest import CUES, timing_errors
+
+
+def region(text=None):
+    """ Subtitle region of a video with a common subtitle size """
+
+    roi = np.full((70, 620, 3), 50, np.uint8)
+    if text is not None:
+        cv.putText(roi, text, (20, 45), cv.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    return roi
+
+
+def calibrated_verifier(subtitles=CUES):
+    verifier = template_matching.TemplateVerifier(subtitles)
+    for i in range(verifier.calibration_frames):
+        verifier.calibrate(region(subtitles[0]), 0)
+    return verifier
+
+
+def test_region_without_text_needs_no_calibration():
+    verifier = template_matching.TemplateVerifier(CUES)
+
+    assert verifier.classify(region(), 0) == template_matching.NO_TEXT
+    assert verifier.classify(region(CUES[0]), 0) is None
+    assert verifier.ocr_text(template_matching.NO_TEXT) == []
+
+
+def test_calibration_measures_the_font_size():
+    verifier = template_matching.TemplateVerifier(CUES)
+    verifier.calibrate(region(), 0)
+    verifier.calibrate(region(CUES[0]), 0)
+    verifier.calibrate(region(CUES[1]), 1)
+    assert verifier.scale is None
+
+    verifier.calibrate(region(CUES[2]), 2)
+    # the region is drawn with scale 0.8 and thickness 2 of the same font
+    assert 0.6 < verifier.scale < 1
+    assert 0.8 < verifier.stretch < 1.25
+    assert verifier.stroke in [2, 3]
+    scale = verifier.scale
+    verifier.calibrate(region("a different font size"), 3)
+    assert verifier.scale == scale
+
+
+def test_current_and_next_subtitle_are_recognized():
+    verifier = calibrated_verifier()
+
+    assert verifier.classify(region(CUES[0]), 0) == 0
+    assert verifier.classify(region(CUES[1]), 0) == 1
+    assert verifier.classify(region(CUES[4]), 4) == 4
+    assert verifier.ocr_text(1) == [CUES[1]] + CUES[1].split()
+
+
+def test_other_or_ambiguous_text_needs_the_ocr():
+    verifier = calibrated_verifier()
+    # neither the current nor the next subtitle
+    assert verifier.classify(region(CUES[3]), 0) is None
+
+    verifier = calibrated_verifier(["the same text here", "the same text here!"])
+    assert verifier.classify(region("the same text here"), 0) is None
+
+
+def test_verify_mode_needs_fewer_ocr_calls(synthetic_video, fake_ocr):
+    frame_info = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"])
+    ocr_calls = fake_ocr.calls
+    fake_ocr.calls = 0
+    verified = create_srt.main(synthetic_video["video"], synthetic_video["subtitles"], verify=True)
+
+    # the frames without text and most of the frames with text are verified without the OCR
+    assert fake_ocr.calls < 0.3 * ocr_calls
+    assert [info[2] for info in verified] == [info[2] for info in frame_info]
+    assert max(timing_errors(verified)) < 0.081
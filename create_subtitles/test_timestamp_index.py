@@ -0,0 +1,87 @@
+import os
+import cv2 as cv
+import numpy as np
+import timestamp_index
+from conftest import FPS
+
+FRAMES = 100
+
+
+def write_counter_video(path):
+    """ Video, whose frames have increasing brightness. Returns the brightness of the decoded frames. """
+
+    writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*"MJPG"), FPS, (64, 48))
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), 20 + 2 * i, np.uint8))
+    writer.release()
+    video = cv.VideoCapture(path)
+    brightness = [video.read()[1].mean() for i in range(FRAMES)]
+    video.release()
+    return np.array(brightness)
+
+
+def next_frame(video, brightness):
+    """ Reads the next frame and returns its index """
+
+    ok, frame = video.read()
+    assert ok
+    return int(np.argmin(np.abs(brightness - frame.mean())))
+
+
+def test_seek_without_keyframes(tmp_path, monkeypatch):
+    path = str(tmp_path / "video.avi")
+    brightness = write_counter_video(path)
+    monkeypatch.setattr(timestamp_index, "keyframe_times", lambda video_path: None)
+    index = timestamp_index.build(path)
+
+    assert index.total == FRAMES
+    assert list(index.keyframes) == list(range(FRAMES))
+    video = cv.VideoCapture(path)
+    for frame_index in [50, 0, 99, 1, 73]:
+        assert index.seek(video, frame_index)
+        assert next_frame(video, brightness) == frame_index
+    video.release()
+
+
+def test_seek_from_the_keyframe_before_the_frame(tmp_path, monkeypatch):
+    path = str(tmp_path / "video.avi")
+    brightness = write_counter_video(path)
+    # a keyframe every second
+    keys = np.arange(0, FRAMES, FPS, dtype=np.int64) * 1000000 // FPS
+    monkeypatch.setattr(timestamp_index, "keyframe_times", lambda video_path: keys)
+    index = timestamp_index.build(path)
+
+    assert list(index.keyframes[[0, 24, 25, 49, 99]]) == [0, 0, 25, 25, 75]
+    video = cv.VideoCapture(path)
+    for frame_index in [60, 25, 26, 3, 99]:
+        assert index.seek(video, frame_index)
+        assert next_frame(video, brightness) == frame_index
+    assert not index.seek(video, FRAMES + 10)
+    video.release()
+
+
+def test_time_after_the_last_frame_continues_with_the_frame_rate():
+    times = np.arange(FRAMES, dtype=np.int64) * 40000
+    index = timestamp_index.FrameIndex(times, np.arange(FRAMES, dtype=np.int32))
+
+    assert index.time(FRAMES - 1) == [3, 960000]
+    assert index.time(FRAMES) == [4, 0]
+    assert index.time(FRAMES + 25) == [5, 0]
+    assert timestamp_index.FrameIndex(np.array([40000]), np.array([0])).time(3) == [0, 40000]
+
+
+def test_index_of_a_changed_video_is_not_loaded(tmp_path, monkeypatch):
+    path = str(tmp_path / "video.avi")
+    write_counter_video(path)
+    monkeypatch.setattr(timestamp_index, "keyframe_times", lambda video_path: None)
+    index = timestamp_index.build(path)
+
+    assert os.path.exists(timestamp_index.index_path(path))
+    loaded = timestamp_index.load(path)
+    assert list(loaded.times) == list(index.times)
+
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert timestamp_index.load(path) is None
+    assert timestamp_index.load_or_build(path).total == FRAMES
+    assert timestamp_index.load(path) is not None
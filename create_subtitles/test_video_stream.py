@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+import video_stream
+
+
+class FakeClock:
+    """ time.monotonic() and time.sleep() of the stream, sleeping moves the clock forward """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = 0
+        self.on_sleep = None
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        self.now += seconds
+        if self.on_sleep is not None:
+            self.on_sleep()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(video_stream.clock, "monotonic", clock.monotonic)
+    monkeypatch.setattr(video_stream.clock, "sleep", clock.sleep)
+    return clock
+
+
+def test_stride_changes_at_most_once_per_latency_budget(clock):
+    controller = video_stream.LatencyController(latency_budget=2, min_stride=2, max_stride=48)
+    strides = []
+    # the processing is three times slower than the video for 10 s, then it catches up
+    for i in range(100):
+        clock.now = i * 0.3
+        controller.update(i * 0.1)
+        strides.append(controller.stride)
+    changes = [i for i in range(1, 100) if strides[i] != strides[i - 1]]
+    # the latency 0.2 s per update gets over the budget after the 10th update
+    assert changes[0] > 10 and strides[-1] > 2
+    assert all([(b - a) * 0.3 >= 2 for a, b in zip(changes, changes[1:])])
+
+    for i in range(100, 300):
+        clock.now = 30 + (i - 100) * 0.1
+        controller.update(10 + (i - 100) * 0.5)
+    assert controller.stride == 2
+
+
+class FakeCapture:
+    """ cv2.VideoCapture of a growing file with frames[0] frames, 25 frames per second """
+
+    def __init__(self, frames, source):
+        self.frames = frames
+        self.position = 0
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return True, np.full((4, 4, 3), self.position, np.uint8)
+
+    def grab(self):
+        if self.position >= self.frames[0]:
+            return False
+        self.position += 1
+        return True
+
+    def set(self, prop, value):
+        self.position = int(value)
+
+    def get(self, prop):
+        return (self.position - 1) * 40.0
+
+    def release(self):
+        pass
+
+
+def stream(monkeypatch, clock, frames, growing, idle_timeout=2):
+    monkeypatch.setattr(video_stream.cv, "VideoCapture", lambda source: FakeCapture(frames, source))
+    monkeypatch.setattr(video_stream, "is_growing_file", lambda source: growing)
+    controller = video_stream.LatencyController(latency_budget=100)
+    return list(video_stream.stream_frames("live.ts", controller, poll_interval=0.5, idle_timeout=idle_timeout))
+
+
+def test_growing_file_is_reopened_at_the_last_position(monkeypatch, clock):
+    frames = [10]
+
+    def write_more():
+        if frames[0] < 20:
+            frames[0] += 10
+
+    clock.on_sleep = write_more
+    sampled = stream(monkeypatch, clock, frames, growing=True)
+
+    assert [frame_index for frame_index, frame, time in sampled] == list(range(0, 20, 2))
+    assert [int(frame[0, 0, 0]) for frame_index, frame, time in sampled] == list(range(1, 21, 2))
+    assert sampled[-1][2] == pytest.approx([0.0, 720000.0])
+    # one wait for the new frames, then waits until nothing new came for idle_timeout
+    assert clock.sleeps == 1 + 2 / 0.5
+
+
+def test_pipe_ends_with_the_first_missing_frame(monkeypatch, clock):
+    sampled = stream(monkeypatch, clock, [10], growing=False)
+
+    assert len(sampled) == 5
+    assert clock.sleeps == 0
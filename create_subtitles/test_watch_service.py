@@ -0,0 +1,115 @@
+import os
+import queue
+import multiprocessing
+import pytest
+import detect_words as det
+import rate_limiter
+import watch_service
+
+needs_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason="the workers have to inherit the patched functions")
+
+
+def write(path, content="x"):
+    with open(path, "w", encoding="utf8") as file:
+        file.write(content)
+
+
+def test_job_is_ready_once_its_files_stop_growing(tmp_path):
+    inbox = watch_service.Inbox(str(tmp_path))
+    write(tmp_path / "film.mp4")
+    write(tmp_path / "film.txt")
+
+    assert inbox.scan() == []
+    write(tmp_path / "film.mp4", "xx")
+    assert inbox.scan() == []
+    assert inbox.scan() == ["film"]
+    assert inbox.jobs == ["film"]
+
+
+def test_caches_and_incomplete_jobs_are_not_jobs(tmp_path):
+    inbox = watch_service.Inbox(str(tmp_path))
+    write(tmp_path / "film.mp4.index.npz")
+    write(tmp_path / "film.mp4.calibration.json")
+    write(tmp_path / "notes.txt")
+    write(tmp_path / "other.mkv")
+    inbox.scan()
+
+    assert inbox.scan() == []
+    assert inbox.jobs == []
+    assert "film.mp4.index.npz" not in inbox.sizes
+
+
+def test_backend_is_loaded_before_the_worker_changes_its_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    directories = []
+    rates = []
+    monkeypatch.setattr(det, "get_backend", lambda: directories.append(os.getcwd()))
+    monkeypatch.setattr(rate_limiter, "set_requests_per_minute", rates.append)
+    watch_service.warm_up(str(tmp_path / "worker"), 600)
+
+    assert directories == [str(tmp_path)]
+    assert os.getcwd() == str(tmp_path / "worker")
+    assert rates == [600]
+
+
+def test_job_cannot_raise_the_requests_of_the_worker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    monkeypatch.setattr(watch_service.create_srt, "main", lambda video, subtitles, **options: calls.append(options))
+    write(tmp_path / "film.mp4")
+    write(tmp_path / "film.txt")
+    write(tmp_path / "film.json", '{"options": {"requests_per_minute": 5000}}')
+    watch_service.process_job(str(tmp_path), "film", 600)
+    write(tmp_path / "film.json", '{"options": {"requests_per_minute": 100}}')
+    watch_service.process_job(str(tmp_path), "film", 600)
+
+    assert [options["requests_per_minute"] for options in calls] == [600, 100]
+
+
+def test_failed_warm_up_is_reported(tmp_path, monkeypatch):
+    def no_backend():
+        raise ImportError("No module named 'google'")
+
+    monkeypatch.setattr(det, "get_backend", no_backend)
+    results = queue.Queue()
+    watch_service.run_worker("0.0", str(tmp_path / "worker"), queue.Queue(), results)
+
+    worker, job_dir, name, outputs, error = results.get_nowait()
+    assert [worker, name] == ["0.0", None]
+    assert "No module named 'google'" in error
+
+
+def fake_job(job_dir, name, requests_per_minute):
+    """ Crashes the worker on the job "crash", otherwise leaves a cache next to the video and the requests
+    of the worker in the job, and returns no outputs
+    """
+
+    if name == "crash":
+        os._exit(1)
+    write(os.path.join(job_dir, "film.mp4.index.npz"))
+    write(os.path.join(job_dir, "requests.txt"), str(requests_per_minute))
+    return []
+
+
+@needs_fork
+def test_worker_that_dies_is_replaced_and_its_job_queued_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_service, "warm_up", lambda work_dir, requests_per_minute: None)
+    monkeypatch.setattr(watch_service, "process_job", fake_job)
+    inbox = tmp_path / "inbox"
+    os.makedirs(inbox)
+    for name in ["crash", "film"]:
+        write(inbox / f"{name}.mp4")
+        write(inbox / f"{name}.txt")
+    write(inbox / "notes.txt")
+
+    watch_service.run_service(str(inbox), str(tmp_path / "outbox"), workers=2, poll_interval=0.05,
+                              stop_when_idle=True, requests_per_minute=1200)
+
+    assert sorted(os.listdir(tmp_path / "outbox" / "film")) == ["film.mp4", "film.txt", "requests.txt"]
+    with open(tmp_path / "outbox" / "film" / "requests.txt", "r", encoding="utf8") as file:
+        assert float(file.read()) == 600
+    with open(tmp_path / "outbox" / "crash" / "error.txt", "r", encoding="utf8") as file:
+        assert f"{watch_service.MAX_ATTEMPTS} times" in file.read()
+    assert os.listdir(tmp_path / "outbox" / ".jobs") == []
+    assert os.listdir(inbox) == ["notes.txt"]
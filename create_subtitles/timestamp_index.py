@@ -0,0 +1,198 @@
+import os
+import shutil
+import subprocess
+import numpy as np
+import cv2 as cv
+import roi_cache
+# Index of the frames of a video: presentation time of every frame and the nearest keyframe before it.
+# The times reported by OpenCV are reliable only while the video is read from the start, and the
+# number of frames in the header is only an estimate for variable frame rate videos. The index is
+# recorded once, while the video is read from the start anyway, and cached next to the video. Later
+# runs look the times up and seek to any frame from the nearest keyframe.
+#
+#   <video>.index.npz   times (int64 microseconds), keyframes (int32 index), video (size, mtime)
+
+
+def index_path(video_path):
+    """ Returns path of the index, that belongs to the video
+
+    Args:
+        video_path (str): Path to the video
+    """
+
+    return video_path + ".index.npz"
+
+
+def keyframe_times(video_path):
+    """ Finds the times of the keyframes, ffprobe decodes only the keyframes
+
+    Args:
+        video_path (str): Path to the video
+    Returns:
+        times (numpy.ndarray): Times of the keyframes in microseconds from the first one,
+            None if ffprobe is not available
+    """
+
+    if shutil.which("ffprobe") is None:
+        return None
+    command = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey", "-show_entries",
+               "frame=best_effort_timestamp_time", "-of", "csv=p=0", video_path]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    times = [float(line.strip(" ,")) for line in result.stdout.splitlines() if line.strip(" ,") not in ("", "N/A")]
+    if len(times) == 0:
+        return None
+    times = np.array(sorted(times))
+    return np.round((times - times[0]) * 1000000).astype(np.int64)
+
+
+class FrameIndex:
+    """ Times and keyframes of all frames of a video
+
+    Args:
+        times (numpy.ndarray): Time of every frame in microseconds, as reported by OpenCV
+        keyframes (numpy.ndarray): Index of the nearest keyframe at or before every frame
+    """
+
+    def __init__(self, times, keyframes):
+        self.times = times
+        self.keyframes = keyframes
+        self.total = len(times)
+
+    def time(self, frame_index):
+        """ Returns the time of the frame [seconds, microseconds]. After the last frame, the time
+        when the last frame stops being displayed.
+
+        Args:
+            frame_index (int): Index of frame
+        """
+
+        if frame_index < self.total:
+            microseconds = int(self.times[frame_index])
+        elif self.total > 1:
+            duration = (self.times[-1] - self.times[0]) / (self.total - 1)
+            microseconds = int(self.times[-1] + duration * (frame_index - self.total + 1))
+        else:
+            microseconds = int(self.times[-1])
+        seconds, microseconds = divmod(microseconds, 1000000)
+        return [seconds, microseconds]
+
+    def frame_at(self, microseconds):
+        """ Returns index of the frame displayed at the time (with tolerance of half a millisecond) """
+
+        return int(np.searchsorted(self.times, microseconds + 500, side="right")) - 1
+
+    def seek(self, video, frame_index):
+        """ Positions the video, so the next "read()" returns the frame. Seeks to the nearest keyframe
+        and grabs the frames from there, without decoding the video from the start.
+
+        Args:
+            video (cv2.VideoCapture): Video loaded via cv2
+            frame_index (int): Index of frame
+        Returns:
+            True (bool): If the video is positioned
+            False (bool): If the frame could not be reached
+        """
+
+        if frame_index <= 0:
+            return video.set(cv.CAP_PROP_POS_FRAMES, 0)
+        if frame_index >= self.total:
+            return False
+
+        target = frame_index - 1
+        key = int(self.keyframes[target])
+        while True:
+            if key == 0:
+                video.set(cv.CAP_PROP_POS_FRAMES, 0)
+            else:
+                video.set(cv.CAP_PROP_POS_MSEC, self.times[key] / 1000)
+            if not video.grab():
+                return False
+            # the container can land the seek a little off, the position is checked on the grabbed frame
+            position = self.frame_at(round(video.get(cv.CAP_PROP_POS_MSEC) * 1000))
+            if position <= target or key == 0:
+                break
+            key = int(self.keyframes[key - 1])
+
+        while position < target:
+            if not video.grab():
+                return False
+            position += 1
+        return True
+
+    def save(self, video_path):
+        np.savez(index_path(video_path), times=self.times, keyframes=self.keyframes,
+                 video=np.array(roi_cache.video_id(video_path), np.float64))
+
+
+def from_times(video_path, times):
+    """ Creates the index from the times of all frames, recorded while the video was read
+
+    Args:
+        video_path (str): Path to the video
+        times (list): Time of every frame in microseconds
+    Returns:
+        index (FrameIndex): Index of the video
+    """
+
+    times = np.array(times, np.int64)
+    keyframes = np.arange(len(times), dtype=np.int32)
+    keys = keyframe_times(video_path)
+    if keys is not None:
+        # every frame gets the last keyframe, that is displayed at or before it
+        key_indexes = np.searchsorted(times, keys + 500, side="right") - 1
+        key_indexes = np.unique(np.clip(key_indexes, 0, len(times) - 1))
+        if len(key_indexes) == 0 or key_indexes[0] != 0:
+            key_indexes = np.concatenate([[0], key_indexes])
+        keyframes = key_indexes[np.searchsorted(key_indexes, np.arange(len(times)), side="right") - 1]
+        keyframes = keyframes.astype(np.int32)
+    # without ffprobe the keyframes are not known, every frame is seeked by its time directly
+    # (OpenCV decodes from the keyframe before it) and the position is checked
+    return FrameIndex(times, keyframes)
+
+
+def build(video_path):
+    """ Reads the whole video once and creates its index
+
+    Args:
+        video_path (str): Path to the video
+    Returns:
+        index (FrameIndex): Index of the video
+    """
+
+    video = cv.VideoCapture(video_path)
+    times = []
+    while video.grab():
+        times.append(round(video.get(cv.CAP_PROP_POS_MSEC) * 1000))
+    video.release()
+    index = from_times(video_path, times)
+    index.save(video_path)
+    return index
+
+
+def load(video_path):
+    """ Loads the index of the video, if it exists and the video did not change
+
+    Args:
+        video_path (str): Path to the video
+    Returns:
+        index (FrameIndex): Index of the video, None if there is no valid index
+    """
+
+    path = index_path(video_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if list(data["video"]) != roi_cache.video_id(video_path):
+            return None
+        return FrameIndex(data["times"], data["keyframes"])
+
+
+def load_or_build(video_path):
+    """ Loads the index of the video, or creates it if there is no valid index """
+
+    index = load(video_path)
+    if index is None:
+        index = build(video_path)
+    return index
@@ -0,0 +1,120 @@
+import os
+import stat
+import time as clock
+import cv2 as cv
+import create_srt
+# Reading of live video (growing file, named pipe or stream URL) in real time
+#
+# Can be tested locally by piping a finished video at 1x speed:
+#   mkfifo live.ts
+#   ffmpeg -re -i subtitles/film_test.mp4 -c copy -f mpegts live.ts
+#   create_srt.main("live.ts", "subtitles/subtitles.txt", stream=True)
+
+
+class LatencyController:
+    """ Keeps the processing of a live video within the latency budget. The latency is the difference
+    between the time that passed since the start and the time of the video that was already processed.
+    When the latency gets over the budget, fewer frames are sampled (the stride is doubled), when it
+    drops under half of the budget, the sampling gets denser again. The stride changes at most once
+    per latency budget, so the effect of the last change shows in the latency before the next one.
+
+    Args:
+        latency_budget (float): Maximum accepted latency in seconds (default = 2)
+        min_stride (int): Densest sampling, every n-th frame (default = 2)
+        max_stride (int): Sparsest sampling, every n-th frame (default = 48)
+    """
+
+    def __init__(self, latency_budget=2, min_stride=2, max_stride=48):
+        self.latency_budget = latency_budget
+        self.min_stride = min_stride
+        self.max_stride = max_stride
+        self.stride = min_stride
+        self.latency = 0
+        self.start_clock = None
+        self.start_video = None
+        self.last_change = None
+
+    def update(self, video_seconds):
+        """ Updates the latency with the time of the last read frame and adjusts the stride
+
+        Args:
+            video_seconds (float): Time of the last read frame in the video, in seconds
+        """
+
+        now = clock.monotonic()
+        if self.start_clock is None:
+            self.start_clock = now
+            self.start_video = video_seconds
+            self.last_change = now
+
+        self.latency = (now - self.start_clock) - (video_seconds - self.start_video)
+        if now - self.last_change < self.latency_budget:
+            return
+        stride = self.stride
+        if self.latency > self.latency_budget:
+            stride = min(self.max_stride, self.stride * 2)
+        elif self.latency < self.latency_budget / 2:
+            stride = max(self.min_stride, self.stride // 2)
+        if stride != self.stride:
+            self.stride = stride
+            self.last_change = now
+
+
+def is_growing_file(source):
+    """ Checks if the source is a regular file, that can still be written to (not a pipe or URL)
+
+    Args:
+        source (str): Path or URL of the video
+    """
+
+    return os.path.exists(source) and not stat.S_ISFIFO(os.stat(source).st_mode)
+
+
+def stream_frames(source, controller, poll_interval=0.5, idle_timeout=10):
+    """ Reads live video and yields the frames that should be processed. Frames that are not sampled
+    are only grabbed (not decoded into image). A growing file is re-opened at the last position when
+    there are no new frames, until nothing new is written for idle_timeout seconds.
+
+    Args:
+        source (str): Path to growing file, named pipe or URL that cv2 can open
+        controller (LatencyController): Decides how densely the frames are sampled
+        poll_interval (float): How long to wait for new frames of a growing file, in seconds (default = 0.5)
+        idle_timeout (float): After how many seconds without new frames the stream ends (default = 10)
+
+    Yields:
+        frame_index (int): Index of frame
+        frame (numpy.ndarray): Frame
+        time (list): Time of frame [seconds, microseconds]
+    """
+
+    growing = is_growing_file(source)
+    video = cv.VideoCapture(source)
+    frame_index = 0
+    idle = 0
+
+    while True:
+        sampled = frame_index % controller.stride == 0
+        if sampled:
+            ret, frame = video.read()
+        else:
+            ret = video.grab()
+
+        if not ret:
+            if not growing or idle >= idle_timeout:
+                break
+            # waits for new data and re-opens the file at the last position
+            clock.sleep(poll_interval)
+            idle += poll_interval
+            video.release()
+            video = cv.VideoCapture(source)
+            video.set(cv.CAP_PROP_POS_FRAMES, frame_index)
+            continue
+
+        idle = 0
+        time = create_srt.get_time(video)
+        controller.update(time[0] + time[1] / 1000000)
+        if sampled:
+            yield frame_index, frame, time
+        frame_index += 1
+
+    video.release()
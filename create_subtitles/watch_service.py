@@ -0,0 +1,422 @@
+import os
+import json
+import time
+import queue
+import logging
+import heapq
+import shutil
+import traceback
+import multiprocessing
+import create_srt
+import detect_words as det
+import calibration
+import roi_cache
+import timestamp_index
+import rate_limiter
+# Long-running service for a steady stream of deliveries. It watches the inbox for a video and its subtitle
+# text file with the same name, and passes the jobs to a pool of worker processes, which stay running
+# between the jobs (OpenCV, the OCR backend and its client are loaded only once). Every worker has its own
+# working directory, because the pipeline writes its outputs to "subtitles/" of the working directory.
+# Jobs with higher priority are processed first, then in the order of arrival.
+#
+#   inbox/film.mp4     video
+#   inbox/film.txt     subtitle text file
+#   inbox/film.json    optional: {"priority": 1, "options": {"refine_timing": true, "roi": [0, 0.7, 1, 0.3]}}
+#                      (options are keyword arguments of "create_srt.main()")
+#
+#   outbox/film/       the inputs, film.srt, recovery file, timeline and OCR usage, or error.txt if the job failed
+#
+# Files are taken once their size did not change for one poll interval, so the optional .json file has to
+# be in the inbox before the video and the subtitles are complete (or the files are moved in by rename).
+# Jobs that were taken, but not finished (the service was stopped), are queued again on the next start.
+# Every worker process has its own rate limiter, so the ceiling of OCR requests is split between the workers.
+# A worker that dies (e.g. killed for its memory) is replaced, its job is queued again, and delivered as failed
+# if it kills the worker again. Caches that the pipeline writes next to the video or to the working directory
+# of the worker (calibration, timestamp index, cached regions) are removed after the job and never delivered.
+
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = [".mp4", ".mkv", ".avi", ".mov", ".ts", ".webm"]
+
+# outputs of "create_srt.main()" in the working directory of the worker, [file, name in the outbox]
+OUTPUTS = [["Finished_subtitles.srt", "{name}.srt"], ["recovery_file.txt", "recovery_file.txt"],
+           ["recovery_file_timeline.txt", "recovery_file_timeline.txt"],
+           ["recovery_file_usage.json", "recovery_file_usage.json"]]
+
+# how many times a job is started, before a job that kills its worker is delivered as failed
+MAX_ATTEMPTS = 2
+
+# caches of a video, next to the video or in "subtitles/" of the working directory
+CACHE_SUFFIXES = [".calibration.json", ".index.npz", ".rois", ".rois.npy", ".rois.json"]
+
+
+def remove_caches(video_path):
+    """ Removes the caches of the video (calibration, timestamp index and cached regions),
+    they are not delivered and not kept between the jobs
+
+    Args:
+        video_path (str): Path to the video
+    """
+
+    paths = [calibration.calibration_path(video_path), timestamp_index.index_path(video_path),
+             *roi_cache.cache_paths(video_path)]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def job_files(directory, name):
+    """ Finds the files of the job
+
+    Args:
+        directory (str): Directory with the files
+        name (str): Name of the job (name of the files without the extension)
+    Returns:
+        files (dict): video, subtitles and options paths, None if the job has no video or subtitles
+    """
+
+    video = None
+    for extension in VIDEO_EXTENSIONS:
+        path = os.path.join(directory, name + extension)
+        if os.path.exists(path):
+            video = path
+    subtitles = os.path.join(directory, name + ".txt")
+    if video is None or not os.path.exists(subtitles):
+        return None
+    options = os.path.join(directory, name + ".json")
+    return {"video": video, "subtitles": subtitles, "options": options if os.path.exists(options) else None}
+
+
+def load_options(options_path):
+    """ Loads priority and options of the job
+
+    Args:
+        options_path (str): Path to the .json file of the job, None for the defaults
+    Returns:
+        priority (int): Priority of the job
+        options (dict): Keyword arguments of "create_srt.main()"
+    """
+
+    if options_path is None:
+        return 0, {}
+    with open(options_path, "r", encoding="utf8") as file:
+        job = json.load(file)
+    return job.get("priority", 0), job.get("options", {})
+
+
+class Inbox:
+    """ Finds complete jobs in the inbox
+
+    Args:
+        path (str): Path to the inbox
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sizes = {}
+        # names of the jobs with the video and the subtitles in the inbox, ready or not
+        self.jobs = []
+
+    def scan(self):
+        """ Returns names of the jobs, whose files did not change since the last scan """
+
+        sizes = {}
+        for entry in os.scandir(self.path):
+            if entry.is_file() and not entry.name.startswith(".") \
+                    and not any([entry.name.endswith(suffix) for suffix in CACHE_SUFFIXES]):
+                sizes[entry.name] = entry.stat().st_size
+
+        names = set()
+        for file_name in sizes:
+            name, extension = os.path.splitext(file_name)
+            if extension.lower() in VIDEO_EXTENSIONS and job_files(self.path, name) is not None:
+                names.add(name)
+
+        ready = []
+        for name in sorted(names):
+            files = [file_name for file_name in sizes if os.path.splitext(file_name)[0] == name]
+            if all([self.sizes.get(file_name) == sizes[file_name] for file_name in files]):
+                ready.append(name)
+        self.sizes = sizes
+        self.jobs = sorted(names)
+        return ready
+
+
+def warm_up(work_dir, requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE):
+    """ Prepares the worker process: the OCR backend with its client, its share of the requests
+    and its own working directory
+
+    Args:
+        work_dir (str): Working directory of the worker
+        requests_per_minute (float): Ceiling of OCR requests of this worker (default = 1800)
+    """
+
+    rate_limiter.set_requests_per_minute(requests_per_minute)
+    # before the change of the directory, VisionAPI finds the key relative to the directory of the service
+    backend = det.get_backend()
+    if getattr(backend, "__module__", None) == "VisionAPI":
+        import VisionAPI
+        VisionAPI.get_client()
+    os.makedirs(os.path.join(work_dir, "subtitles"), exist_ok=True)
+    os.makedirs(os.path.join(work_dir, "temp"), exist_ok=True)
+    os.chdir(work_dir)
+
+
+def process_job(job_dir, name, requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE):
+    """ Runs "create_srt.main()" on the job, in the working directory of the worker
+
+    Args:
+        job_dir (str): Directory with the files of the job
+        name (str): Name of the job
+        requests_per_minute (float): Ceiling of OCR requests of the worker, the job can only lower it
+            (default = 1800)
+    Returns:
+        outputs (list): list of [path of output, name in the outbox]
+    """
+
+    files = job_files(job_dir, name)
+    priority, options = load_options(files["options"])
+    options["requests_per_minute"] = min(options.get("requests_per_minute", requests_per_minute), requests_per_minute)
+    for file_name, output_name in OUTPUTS:
+        if os.path.exists(os.path.join("subtitles", file_name)):
+            os.remove(os.path.join("subtitles", file_name))
+
+    try:
+        create_srt.main(files["video"], files["subtitles"], **options)
+    finally:
+        remove_caches(files["video"])
+    return collect_outputs(name)
+
+
+def collect_outputs(name):
+    """ Returns the outputs of the last job in the working directory of the worker
+
+    Args:
+        name (str): Name of the job
+    Returns:
+        outputs (list): list of [path of output, name in the outbox]
+    """
+
+    # frames of the job are not needed anymore
+    if os.path.exists("frames_from_video"):
+        shutil.rmtree("frames_from_video")
+    outputs = []
+    for file_name, output_name in OUTPUTS:
+        path = os.path.join("subtitles", file_name)
+        if os.path.exists(path):
+            outputs.append([os.path.abspath(path), output_name.format(name=name)])
+    return outputs
+
+
+def run_worker(worker, work_dir, tasks, results, requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE):
+    """ Processes the jobs from its queue, until it gets None
+
+    Args:
+        worker (str): Name of the worker
+        work_dir (str): Working directory of the worker
+        tasks (multiprocessing.Queue): Jobs [job directory, name] for this worker
+        results (multiprocessing.Queue): Receives [worker, job directory, name, outputs, error],
+            [worker, None, None, [], error] when the worker is ready (error is None) or failed to start
+        requests_per_minute (float): Ceiling of OCR requests of this worker (default = 1800)
+    """
+
+    try:
+        warm_up(work_dir, requests_per_minute)
+    except Exception:
+        results.put([worker, None, None, [], traceback.format_exc()])
+        return
+    results.put([worker, None, None, [], None])
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_dir, name = task
+        try:
+            outputs = process_job(job_dir, name, requests_per_minute)
+            results.put([worker, job_dir, name, outputs, None])
+        except Exception:
+            # the recovery file of a failed job is delivered too, "recovery.py" can use it
+            results.put([worker, job_dir, name, collect_outputs(name), traceback.format_exc()])
+
+
+def deliver(job_dir, name, outbox, outputs, error):
+    """ Moves the inputs and outputs of the job to the outbox
+
+    Args:
+        job_dir (str): Directory with the files of the job
+        name (str): Name of the job
+        outbox (str): Path to the outbox
+        outputs (list): list of [path of output, name in the outbox]
+        error (str): Traceback of the failed job, None if it succeeded
+    """
+
+    target = os.path.join(outbox, name)
+    if os.path.exists(target):
+        target = os.path.join(outbox, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(target)
+    for path, output_name in outputs:
+        shutil.move(path, os.path.join(target, output_name))
+    if error is not None:
+        with open(os.path.join(target, "error.txt"), "w", encoding="utf8") as file:
+            file.write(error)
+    for entry in os.listdir(job_dir):
+        if any([entry.endswith(suffix) for suffix in CACHE_SUFFIXES]):
+            os.remove(os.path.join(job_dir, entry))
+        else:
+            shutil.move(os.path.join(job_dir, entry), os.path.join(target, entry))
+    os.rmdir(job_dir)
+
+
+def start_worker(worker, outbox, results, requests_per_minute):
+    """ Starts the worker process
+
+    Args:
+        worker (str): Name of the worker, "<slot>.<start>", workers of the same slot share the working directory
+        outbox (str): Path to the outbox
+        results (multiprocessing.Queue): Queue for the results of all workers
+        requests_per_minute (float): Ceiling of OCR requests of the worker
+    Returns:
+        process (multiprocessing.Process): Worker process
+        tasks (multiprocessing.Queue): Jobs for the worker
+    """
+
+    work_dir = os.path.join(outbox, ".workers", worker.split(".")[0])
+    tasks = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_worker, args=(worker, work_dir, tasks, results, requests_per_minute),
+                                      daemon=True)
+    process.start()
+    return [process, tasks]
+
+
+def run_service(inbox, outbox, workers=2, poll_interval=2, stop_when_idle=False,
+                requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE):
+    """ Watches the inbox and processes the jobs, until it is interrupted
+
+    Args:
+        inbox (str): Path to the inbox
+        outbox (str): Path to the outbox
+        workers (int): Number of worker processes (default = 2)
+        poll_interval (float): How often the inbox is scanned in seconds (default = 2)
+        stop_when_idle (bool): Stop when the inbox has no jobs and all jobs are finished, e.g. for a scheduled
+            run (default = False)
+        requests_per_minute (float): Ceiling of OCR requests of the whole service, every worker gets
+            an equal share (default = 1800)
+    """
+
+    inbox = os.path.abspath(inbox)
+    outbox = os.path.abspath(outbox)
+    jobs_dir = os.path.join(outbox, ".jobs")
+    os.makedirs(jobs_dir, exist_ok=True)
+
+    pending = []
+    arrivals = 0
+    # jobs that were taken by the previous run, but not finished
+    for name in sorted(os.listdir(jobs_dir)):
+        files = job_files(os.path.join(jobs_dir, name), name)
+        if files is not None:
+            priority, options = load_options(files["options"])
+            heapq.heappush(pending, [-priority, arrivals, name])
+            arrivals += 1
+
+    # every worker process has its own limiter
+    worker_requests = requests_per_minute / workers
+    results = multiprocessing.Queue()
+    pool = {}
+    starts = 0
+    for i in range(workers):
+        pool[f"{i}.{starts}"] = start_worker(f"{i}.{starts}", outbox, results, worker_requests)
+    idle = []
+    # [job, start time] of the busy workers, attempts of the jobs that killed their worker
+    running = {}
+    attempts = {}
+    logger.info(f"Watching {inbox}, {workers} workers, {worker_requests:.0f} requests per minute each")
+
+    inbox_files = Inbox(inbox)
+    try:
+        while True:
+            for name in inbox_files.scan():
+                job_dir = os.path.join(jobs_dir, name)
+                if os.path.exists(job_dir):
+                    continue
+                files = job_files(inbox, name)
+                os.makedirs(job_dir)
+                for path in files.values():
+                    if path is not None:
+                        os.replace(path, os.path.join(job_dir, os.path.basename(path)))
+                priority, options = load_options(job_files(job_dir, name)["options"])
+                heapq.heappush(pending, [-priority, arrivals, name])
+                arrivals += 1
+                logger.info(f"Queued {name} (priority {priority})")
+
+            while True:
+                try:
+                    worker, job_dir, name, outputs, error = results.get(timeout=poll_interval)
+                except queue.Empty:
+                    break
+                if name is None:
+                    if error is not None:
+                        logger.error(f"Worker {worker} failed to start:\n{error}")
+                        pool.pop(worker, None)
+                    elif worker in pool:
+                        idle.append(worker)
+                    continue
+                if worker not in pool:
+                    # the worker died before its result was read, the job was already queued again
+                    continue
+                idle.append(worker)
+                entry, started = running.pop(worker)
+                attempts.pop(name, None)
+                deliver(job_dir, name, outbox, outputs, error)
+                status = "failed" if error is not None else "finished"
+                logger.info(f"{name} {status} in {time.monotonic() - started:.0f} s")
+
+            for worker, (process, tasks) in list(pool.items()):
+                if process.is_alive():
+                    continue
+                pool.pop(worker)
+                if worker in idle:
+                    idle.remove(worker)
+                elif worker in running:
+                    entry, started = running.pop(worker)
+                    name = entry[2]
+                    attempts[name] = attempts.get(name, 0) + 1
+                    if attempts[name] < MAX_ATTEMPTS:
+                        heapq.heappush(pending, entry)
+                        logger.warning(f"Worker {worker} died (exit code {process.exitcode}), {name} is queued again")
+                    else:
+                        attempts.pop(name)
+                        deliver(os.path.join(jobs_dir, name), name, outbox, [],
+                                f"Worker process died (exit code {process.exitcode}) {MAX_ATTEMPTS} times\n")
+                        logger.error(f"{name} failed, it killed {MAX_ATTEMPTS} workers")
+                else:
+                    # died before it was ready, a replacement would most likely die the same way
+                    logger.error(f"Worker {worker} died before it was ready (exit code {process.exitcode})")
+                    continue
+                starts += 1
+                replacement = f"{worker.split('.')[0]}.{starts}"
+                pool[replacement] = start_worker(replacement, outbox, results, worker_requests)
+
+            if len(pool) == 0:
+                logger.error("No workers left, unfinished jobs are queued again on the next start")
+                break
+
+            while len(idle) != 0 and len(pending) != 0:
+                entry = heapq.heappop(pending)
+                worker = idle.pop(0)
+                name = entry[2]
+                pool[worker][1].put([os.path.join(jobs_dir, name), name])
+                running[worker] = [entry, time.monotonic()]
+
+            if stop_when_idle and len(pending) == 0 and len(running) == 0 and len(inbox_files.jobs) == 0 \
+                    and len(idle) == len(pool):
+                break
+    except KeyboardInterrupt:
+        logger.info("Stopping, unfinished jobs are queued again on the next start")
+    finally:
+        for process, tasks in pool.values():
+            tasks.put(None)
+        for process, tasks in pool.values():
+            process.join(timeout=poll_interval)
+            if process.is_alive():
+                process.terminate()